@@ -4,15 +4,23 @@ Page d'accueil avec catalogue intégré - Prix en Franc CFA
 VERSION CORRIGÉE
 """
 
+import inspect
 import streamlit as st
 from dotenv import load_dotenv # <-- AJOUTER
 load_dotenv() # <-- AJOUTER
 from config.supabase_client import init_supabase
 from models.product import Product
+from models.catalog import get_suggester, get_facet_index, get_catalog
+from models.reservation import Reservation
+from utils.catalog_store import ProductRecord
+from utils.cache import get_data_version
 from utils.session import (init_session_state, add_to_cart, set_flash_message, 
-                           display_flash_message)
+                           display_flash_message, get_cart_token)
 from utils.formatters import format_price, format_stock_badge
-from utils.styling import load_custom_styling, build_header
+from utils.styling import load_custom_styling, build_header, render_cart_badge
+from utils.display_helpers import CATALOG_PAGE_SIZE, get_current_page, display_pagination
+from utils.facets import FACETS
+from utils.events import track_event, track_visit
 
 # Configuration de la page
 st.set_page_config(
@@ -22,6 +30,205 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+PLACEHOLDER_IMAGE = 'https://via.placeholder.com/300x200?text=No+Image'
+
+# Saisie « live » (versions récentes de Streamlit) : la recherche est relue après
+# une pause de frappe pour proposer des suggestions
+LIVE_SEARCH = 'live' in inspect.signature(st.text_input).parameters
+SEARCH_DEBOUNCE = "300ms"
+
+@st.fragment
+def product_card(product: ProductRecord, image_url: str, available: int, cart_badge):
+    """
+    Carte produit
+
+    Fragment : un clic sur « Ajouter » ne réexécute que cette carte et le
+    compteur du panier, quelle que soit la taille du catalogue. available est
+    le stock moins les réservations des autres paniers.
+    """
+    with st.container():
+        # Image principale
+        st.image(image_url, use_container_width=True)
+        
+        # Nom et type
+        st.markdown(f"**{product.name}**")
+        st.caption(f"🏷️ {product.type}")
+        
+        # Description tronquée
+        if product.description:
+            desc = product.description[:80] + "..." if len(product.description) > 80 else product.description
+            st.caption(desc)
+        
+        # Prix
+        st.markdown(
+            f"<p style='font-size: 1.1rem; font-weight: 700; color: #D4AF37; margin: 0.4rem 0; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);'>{format_price(product.price)}</p>", 
+            unsafe_allow_html=True
+        )
+        
+        # Stock
+        st.markdown(format_stock_badge(available), unsafe_allow_html=True)
+        
+        st.write("")  # Espacement
+        
+        # Boutons
+        col_btn1, col_btn2 = st.columns(2)
+        
+        with col_btn1:
+            if st.button("👁️ Détails", key=f"details_{product.id}", use_container_width=True):
+                # La modale est ouverte au niveau de la page : rerun complet
+                st.session_state['selected_product'] = product.id
+                track_event('view_product', product.id)
+                st.rerun()
+        
+        with col_btn2:
+            if available > 0:
+                if st.button("🛒 Ajouter", key=f"add_{product.id}", use_container_width=True, type="primary"):
+                    product_data = {
+                        'name': product.name,
+                        'price': product.price,
+                        'stock': available,
+                        'image': image_url
+                    }
+                    if add_to_cart(product.id, product_data, 1):
+                        track_event('add_to_cart', product.id, 1, source='carte')
+                        st.toast(f"{product.name} ajouté au panier !", icon="✅")
+                        render_cart_badge(cart_badge)
+                    else:
+                        st.toast("Stock insuffisant", icon="❌")
+            else:
+                st.button("Épuisé", key=f"add_{product.id}", use_container_width=True, disabled=True)
+
+def _submit_search(text: str = None):
+    """Callback : valide la recherche saisie, ou la suggestion choisie"""
+    if text is not None:
+        st.session_state['search_input'] = text
+    st.session_state['search_submitted'] = st.session_state.get('search_input', "").strip()
+
+def _memoized(name: str, key: tuple, loader):
+    """Dernier résultat mémorisé pour la session, rechargé seulement si la clé change"""
+    memo = st.session_state.get(name)
+    if memo is None or memo[0] != key:
+        memo = (key, loader())
+        st.session_state[name] = memo
+    return memo[1]
+
+@st.fragment
+def product_grid(cart_badge):
+    """
+    Recherche, filtres et grille paginée du catalogue
+
+    Fragment : modifier la recherche, une facette ou la page ne réexécute pas
+    le style ni le header. Les facettes (type, prix, disponibilité, nouveautés)
+    et la pagination portent sur le catalogue en cache : aucun aller-retour
+    Supabase. Pendant la frappe, les suggestions viennent de l'index local ;
+    Supabase n'est interrogé que pour la recherche validée (🔍 ou suggestion).
+    """
+    # Barre de recherche et filtres
+    st.markdown("### 🔍 Trouvez votre senteur idéale")
+    
+    col_search, col_go = st.columns([4, 0.4])
+    
+    with col_search:
+        typed = st.text_input(
+            "Rechercher une senteur", 
+            placeholder="Nom, description, notes olfactives...", 
+            label_visibility="collapsed",
+            key="search_input",
+            **({'live': SEARCH_DEBOUNCE} if LIVE_SEARCH else {})
+        ).strip()
+    
+    with col_go:
+        st.button("🔍", key="search_go", use_container_width=True, help="Rechercher",
+                  on_click=_submit_search)
+    
+    # Sans saisie live, chaque validation de la saisie est une recherche
+    if not LIVE_SEARCH or not typed:
+        st.session_state['search_submitted'] = typed
+    search_query = st.session_state.get('search_submitted', "")
+    
+    # Suggestions locales pendant la frappe (aucune requête Supabase)
+    if typed and typed != search_query:
+        suggestions = get_suggester().suggest(typed, limit=6)
+        if suggestions:
+            cols_suggest = st.columns(len(suggestions))
+            for i, (col, suggestion) in enumerate(zip(cols_suggest, suggestions)):
+                with col:
+                    st.button(suggestion, key=f"suggest_{i}", use_container_width=True,
+                              on_click=_submit_search, args=(suggestion,))
+    
+    # Résultats de la recherche validée (IDs classés, mémorisés : la frappe ne relance pas de requête)
+    # Version lue une seule fois : index et catalogue de la même version
+    version = get_data_version('products')
+    facet_index = get_facet_index(version)
+    ranked_ids = _memoized('_catalog_search', (search_query, version),
+                           lambda: Product.search_ids(search_query, version)) if search_query else None
+    base = facet_index.mask_for_ids(ranked_ids) if search_query else None
+    
+    # Facettes : sélection courante, compteurs calculés sur les bitsets
+    selection = {facet: st.session_state.get(f"facet_{facet}") or [] for facet in FACETS}
+    counts = facet_index.counts(selection, base)
+    
+    for col, (facet, label) in zip(st.columns(len(FACETS)), FACETS.items()):
+        with col:
+            st.pills(
+                label,
+                facet_index.options(facet),
+                selection_mode="multi",
+                format_func=lambda value, facet=facet: f"{value} ({counts[facet][value]})",
+                key=f"facet_{facet}"
+            )
+    
+    st.divider()
+    
+    # Intersection recherche x facettes, puis pagination sur le catalogue en cache
+    mask = facet_index.mask(selection, base)
+    if search_query:
+        product_ids = [pid for pid in ranked_ids if facet_index.contains(mask, pid)]
+    else:
+        product_ids = facet_index.ids(mask)
+    total = len(product_ids)
+    
+    page = get_current_page("catalog_page", total, CATALOG_PAGE_SIZE,
+                            reset_on=(search_query, tuple(tuple(v) for v in selection.values())))
+    catalog = get_catalog(version)
+    products = [product for product in (catalog.get(pid) for pid in product_ids[page * CATALOG_PAGE_SIZE:(page + 1) * CATALOG_PAGE_SIZE])
+                if product is not None]
+    
+    if not products:
+        st.info("😢 Aucune senteur trouvée. Essayez d'autres critères de recherche.")
+        return
+    
+    # Nombre de produits trouvés
+    st.markdown(f"""
+    <div style="
+        color: #D4AF37;
+        font-size: 1.1rem;
+        font-weight: 600;
+        margin-bottom: 1.2rem;
+        text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);
+    ">
+        ✨ {total} senteur(s) d'exception
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Stock disponible : réservations des autres paniers déduites (lues en cache)
+    reserved = Reservation.get_reserved_quantities(get_cart_token())
+    
+    # Afficher les produits en grille
+    cols_per_row = 4
+    for i in range(0, len(products), cols_per_row):
+        cols = st.columns(cols_per_row)
+        
+        for j, col in enumerate(cols):
+            idx = i + j
+            if idx < len(products):
+                with col:
+                    product = products[idx]
+                    available = max(product.stock - reserved.get(product.id, 0), 0)
+                    product_card(product, catalog.image_url(product.id, PLACEHOLDER_IMAGE), available, cart_badge)
+    
+    display_pagination("catalog_page", total, CATALOG_PAGE_SIZE)
+
 # Initialisation
 def main():
     """Page d'accueil avec catalogue de senteurs"""
@@ -31,10 +238,11 @@ def main():
     
     # Initialiser la session
     init_session_state()
+    track_visit("catalogue")
     
     # Charger le style et construire le header
     load_custom_styling()
-    build_header()
+    cart_badge = build_header()
     
     # Message de bienvenue
     st.markdown("""
@@ -67,118 +275,16 @@ def main():
     # Afficher les messages flash
     display_flash_message()
     
-    # Barre de recherche et filtres
-    st.markdown("### 🔍 Trouvez votre senteur idéale")
-    
-    col_search, col_filter = st.columns([3, 1])
-    
-    with col_search:
-        search_query = st.text_input(
-            "Rechercher une senteur", 
-            placeholder="Nom, description, notes olfactives...", 
-            label_visibility="collapsed",
-            key="search_input"
-        )
-    
-    with col_filter:
-        filter_type = st.selectbox(
-            "Type", 
-            ["Tous", "Homme", "Femme", "Mixte"], 
-            label_visibility="collapsed",
-            key="type_filter"
-        )
-    
-    st.divider()
-    
-    # Récupérer les produits
-    products = Product.get_all(search=search_query, filter_type=filter_type)
-    
-    if not products:
-        st.info("😢 Aucune senteur trouvée. Essayez d'autres critères de recherche.")
-    else:
-        # Nombre de produits trouvés
-        st.markdown(f"""
-        <div style="
-            color: #D4AF37;
-            font-size: 1.1rem;
-            font-weight: 600;
-            margin-bottom: 1.2rem;
-            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);
-        ">
-            ✨ {len(products)} senteur(s) d'exception
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Afficher les produits en grille
-        cols_per_row = 4
-        for i in range(0, len(products), cols_per_row):
-            cols = st.columns(cols_per_row)
-            
-            for j, col in enumerate(cols):
-                idx = i + j
-                if idx < len(products):
-                    product = products[idx]
-                    
-                    with col:
-                        # Carte produit
-                        with st.container():
-                            # Image principale
-                            images = product.get('product_images', [])
-                            image_url = images[0]['url'] if images else 'https://via.placeholder.com/300x200?text=No+Image'
-                            
-                            st.image(image_url, use_container_width=True)
-                            
-                            # Nom et type
-                            st.markdown(f"**{product['name']}**")
-                            st.caption(f"🏷️ {product['type']}")
-                            
-                            # Description tronquée
-                            if product.get('description'):
-                                desc = product['description'][:80] + "..." if len(product['description']) > 80 else product['description']
-                                st.caption(desc)
-                            
-                            # Prix
-                            st.markdown(
-                                f"<p style='font-size: 1.1rem; font-weight: 700; color: #D4AF37; margin: 0.4rem 0; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);'>{format_price(product['price'])}</p>", 
-                                unsafe_allow_html=True
-                            )
-                            
-                            # Stock
-                            st.markdown(format_stock_badge(product['stock']), unsafe_allow_html=True)
-                            
-                            st.write("")  # Espacement
-                            
-                            # Boutons
-                            col_btn1, col_btn2 = st.columns(2)
-                            
-                            with col_btn1:
-                                if st.button("👁️ Détails", key=f"details_{product['id']}", use_container_width=True):
-                                    st.session_state['selected_product'] = product['id']
-                                    st.rerun()
-                            
-                            with col_btn2:
-                                if product['stock'] > 0:
-                                    if st.button("🛒 Ajouter", key=f"add_{product['id']}", use_container_width=True, type="primary"):
-                                        product_data = {
-                                            'name': product['name'],
-                                            'price': product['price'],
-                                            'stock': product['stock'],
-                                            'image': image_url
-                                        }
-                                        if add_to_cart(product['id'], product_data, 1):
-                                            set_flash_message(f"✅ {product['name']} ajouté au panier !", "success")
-                                            st.rerun()
-                                        else:
-                                            set_flash_message("❌ Stock insuffisant", "error")
-                                            st.rerun()
-                                else:
-                                    st.button("Épuisé", key=f"add_{product['id']}", use_container_width=True, disabled=True)
+    # Recherche, filtres et grille de produits (fragment)
+    product_grid(cart_badge)
     
     # Modal détail produit
     if 'selected_product' in st.session_state and st.session_state['selected_product']:
         product = Product.get_by_id(st.session_state['selected_product'])
         
         if product:
+            available = Reservation.get_available_stock({product['id']: product['stock']}, get_cart_token())[product['id']]
+            
             @st.dialog(f"🌸 {product['name']}", width="large")
             def show_product_details():
                 col1, col2 = st.columns([1, 1])
@@ -205,7 +311,7 @@ def main():
                     )
                     
                     # Stock
-                    st.markdown(format_stock_badge(product['stock']), unsafe_allow_html=True)
+                    st.markdown(format_stock_badge(available), unsafe_allow_html=True)
                     
                     st.divider()
                     
@@ -217,8 +323,8 @@ def main():
                     st.divider()
                     
                     # Quantité et ajout au panier
-                    if product['stock'] > 0:
-                        quantity = st.number_input("Quantité", min_value=1, max_value=product['stock'], value=1, key="modal_qty")
+                    if available > 0:
+                        quantity = st.number_input("Quantité", min_value=1, max_value=available, value=1, key="modal_qty")
                         
                         col_a, col_b = st.columns(2)
                         
@@ -227,10 +333,11 @@ def main():
                                 product_data = {
                                     'name': product['name'],
                                     'price': product['price'],
-                                    'stock': product['stock'],
+                                    'stock': available,
                                     'image': images[0]['url'] if images else ''
                                 }
                                 if add_to_cart(product['id'], product_data, quantity):
+                                    track_event('add_to_cart', product['id'], quantity, source='fiche')
                                     set_flash_message(f"✅ {quantity}x {product['name']} ajouté(s) au panier !", "success")
                                     st.session_state['selected_product'] = None
                                     st.rerun()
@@ -0,0 +1,39 @@
+"""
+Benchmarks du modèle Analytics et de l'agrégation des top produits
+
+Les accès Supabase sont remplacés par les données de fixtures pour ne mesurer
+que le calcul Python/pandas.
+"""
+
+from unittest import mock
+
+from benchmarks.fixtures import orders_since
+from models.analytics import Analytics
+from models.order import Order
+
+
+def time_get_sales_evolution_30j(dataset):
+    orders = orders_since(dataset, 30)
+    with mock.patch.object(Order, 'get_orders_by_period', return_value=orders):
+        Analytics.get_sales_evolution(30)
+
+
+def time_get_sales_evolution_365j(dataset):
+    orders = orders_since(dataset, 365)
+    with mock.patch.object(Order, 'get_orders_by_period', return_value=orders):
+        Analytics.get_sales_evolution(365)
+
+
+def time_get_period_comparison_30j(dataset):
+    orders = orders_since(dataset, 30)
+    with mock.patch.object(Order, 'get_orders_by_period', return_value=orders), \
+         mock.patch.object(Order, 'get_all', return_value=dataset['orders']):
+        Analytics.get_period_comparison(30)
+
+
+def time_export_orders_to_csv(dataset):
+    Analytics.export_orders_to_csv(dataset['orders'])
+
+
+def time_aggregate_product_sales(dataset):
+    Order.aggregate_product_sales(dataset['order_items'], limit=10)
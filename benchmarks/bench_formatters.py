@@ -0,0 +1,20 @@
+"""
+Benchmarks des fonctions de formatage (une exécution = une commande formatée)
+"""
+
+from utils.formatters import format_date, format_price, format_relative_time
+
+
+def time_format_price(dataset):
+    for order in dataset['orders']:
+        format_price(order['total'])
+
+
+def time_format_date(dataset):
+    for order in dataset['orders']:
+        format_date(order['created_at'])
+
+
+def time_format_relative_time(dataset):
+    for order in dataset['orders']:
+        format_relative_time(order['created_at'])
@@ -0,0 +1,11 @@
+"""
+Benchmarks de la validation du formulaire de commande (un appel par client)
+"""
+
+from utils.validators import validate_checkout_form
+
+
+def time_validate_checkout_form(dataset):
+    for client in dataset['clients']:
+        validate_checkout_form(client['first_name'], client['last_name'], client['email'],
+                               client['phone'], client['address'])
@@ -0,0 +1,61 @@
+"""
+Jeux de données des benchmarks (1k / 10k / 100k commandes)
+Construits en mémoire avec tools.generate_data, au format des réponses PostgREST.
+"""
+
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+from tools.generate_data import generate_clients, generate_orders, generate_products, nest_orders
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+
+@lru_cache(maxsize=None)
+def get_dataset(n_orders: int, seed: int = 42) -> Dict[str, List[Dict]]:
+    """
+    Génère (une seule fois par taille) un jeu de données complet
+
+    Le catalogue et la clientèle grossissent avec le volume de commandes pour
+    garder des proportions réalistes.
+
+    Returns:
+        Dict avec 'products', 'clients', 'orders' (imbriquées comme Order.get_all)
+        et 'order_items' (comme la requête de Order.get_top_products)
+    """
+    rng = np.random.default_rng(seed)
+    products = generate_products(max(50, n_orders // 100), rng, images_per_product=1)
+    clients = generate_clients(max(100, n_orders // 5), rng)
+    orders = nest_orders(list(generate_orders(n_orders, products, [c['id'] for c in clients], rng)),
+                         products, clients)
+
+    # Ordre de Order.get_all : plus récentes d'abord
+    orders.sort(key=lambda o: o['created_at'], reverse=True)
+
+    order_items = [
+        {
+            'product_id': item['product_id'],
+            'quantity': item['quantity'],
+            'products': {'name': item['products'].get('name')},
+            'orders': {'created_at': order['created_at']}
+        }
+        for order in orders
+        for item in order['order_items']
+    ]
+
+    return {
+        'products': products,
+        'clients': clients,
+        'orders': orders,
+        'order_items': order_items,
+    }
+
+
+def orders_since(dataset: Dict, days: int) -> List[Dict]:
+    """Équivalent local de Order.get_orders_by_period (tri chronologique croissant)"""
+    import pandas as pd
+
+    start = (pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=days)).isoformat()
+    return sorted((o for o in dataset['orders'] if o['created_at'] >= start), key=lambda o: o['created_at'])
@@ -0,0 +1,147 @@
+"""
+Lanceur des micro-benchmarks - Sensations by Arda J
+
+Découvre les fonctions `time_*` des modules `benchmarks/bench_*.py` (style asv),
+les exécute sur des jeux de 1k/10k/100k commandes et enregistre les temps en JSON
+dans benchmarks/results/ pour comparer les versions entre elles.
+
+Usage :
+    python -m benchmarks.run                               # toutes tailles, label = commit git
+    python -m benchmarks.run --sizes 1000 10000 --filter sales
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import importlib
+import json
+import platform
+import pkgutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# Au-delà de ce ratio (nouveau / référence), un benchmark est signalé comme régression
+REGRESSION_RATIO = 1.20
+
+
+def discover(name_filter: str = "") -> List[Tuple[str, Callable]]:
+    """Retourne la liste (nom, fonction) des benchmarks disponibles"""
+    import benchmarks
+
+    found = []
+    for module_info in pkgutil.iter_modules(benchmarks.__path__):
+        if not module_info.name.startswith("bench_"):
+            continue
+        module = importlib.import_module(f"benchmarks.{module_info.name}")
+        for attr in sorted(dir(module)):
+            if attr.startswith("time_"):
+                full_name = f"{module_info.name[len('bench_'):]}.{attr[len('time_'):]}"
+                if name_filter in full_name:
+                    found.append((full_name, getattr(module, attr)))
+    return found
+
+
+def measure(func: Callable, dataset: Dict, repeat: int, max_seconds: float) -> Dict:
+    """
+    Chronomètre une fonction (1 tour de chauffe puis `repeat` mesures)
+
+    S'arrête plus tôt si le budget `max_seconds` est dépassé, pour que les
+    chemins les plus lents (100k commandes) ne bloquent pas toute la suite.
+    """
+    func(dataset)  # chauffe (imports, caches)
+
+    timings = []
+    budget_start = time.perf_counter()
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(dataset)
+        timings.append(time.perf_counter() - started)
+        if time.perf_counter() - budget_start > max_seconds:
+            break
+
+    return {
+        'runs': len(timings),
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+    }
+
+
+def _git_revision() -> str:
+    """Commit courant (court), ou 'inconnu' hors dépôt git"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "inconnu"
+
+
+def compare(current: Dict, reference: Dict):
+    """Affiche le ratio de chaque benchmark par rapport à un fichier de référence"""
+    print()
+    print(f"📊 Comparaison avec '{reference.get('label')}' ({reference.get('git_revision')})")
+    for name, sizes in current['results'].items():
+        for size, stats in sizes.items():
+            ref = reference.get('results', {}).get(name, {}).get(size)
+            if not ref:
+                continue
+            ratio = stats['median_s'] / ref['median_s'] if ref['median_s'] else float('inf')
+            flag = "🔴 RÉGRESSION" if ratio > REGRESSION_RATIO else ("🟢" if ratio < 1 / REGRESSION_RATIO else "")
+            print(f"  {name:<40}{size:>8}  ×{ratio:5.2f}  {flag}")
+
+
+def main(argv: Optional[List[str]] = None):
+    from benchmarks.fixtures import DEFAULT_SIZES, get_dataset
+
+    parser = argparse.ArgumentParser(description="Micro-benchmarks modèles / analytics / formatters")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Nombre de commandes")
+    parser.add_argument('--repeat', type=int, default=5, help="Mesures par benchmark et par taille")
+    parser.add_argument('--max-seconds', type=float, default=30.0, help="Budget par benchmark et par taille")
+    parser.add_argument('--filter', default="", help="Ne lance que les benchmarks dont le nom contient ce texte")
+    parser.add_argument('--label', default=None, help="Nom du fichier de résultats (défaut: commit git)")
+    parser.add_argument('--compare', type=Path, help="Fichier de résultats de référence")
+    args = parser.parse_args(argv)
+
+    benches = discover(args.filter)
+    if not benches:
+        raise SystemExit(f"❌ Aucun benchmark ne correspond à '{args.filter}'")
+
+    revision = _git_revision()
+    report = {
+        'label': args.label or revision,
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'results': {}
+    }
+
+    for size in args.sizes:
+        print(f"🧪 Jeu de données : {size} commandes...")
+        dataset = get_dataset(size)
+        for name, func in benches:
+            stats = measure(func, dataset, args.repeat, args.max_seconds)
+            report['results'].setdefault(name, {})[str(size)] = stats
+            print(f"  {name:<40}{size:>8}  médiane {stats['median_s'] * 1000:10.2f} ms  ({stats['runs']} runs)")
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    out_path = RESULTS_DIR / f"{report['label']}.json"
+    out_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    print(f"📄 Résultats enregistrés dans {out_path.relative_to(ROOT)}")
+
+    if args.compare:
+        compare(report, json.loads(args.compare.read_text(encoding='utf-8')))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Flux de modifications Supabase pour l'invalidation des caches
+
+Un thread d'arrière-plan (un par processus) écoute les changements des tables
+products, product_images et orders et incrémente la version du périmètre
+concerné (utils/cache.bump_data_version) : le catalogue, les index et les
+graphiques en cache sont reconstruits au prochain rerun, même quand l'écriture
+vient d'un autre administrateur ou d'une autre réplique.
+
+Modes (CHANGE_FEED) :
+    realtime  Supabase Realtime (Postgres changes), repli sur 'poll' en cas d'échec
+    poll      Sondage de max(updated_at) et count(*) toutes les CHANGE_FEED_POLL_INTERVAL secondes
+    off       Désactivé : seule la tranche DATA_VERSION_TTL borne la fraîcheur
+
+Voir supabase/migrations/20261019100000_change_feed.sql (publication Realtime,
+colonnes updated_at). Avec la clé anonyme, les règles RLS peuvent masquer les
+commandes : SUPABASE_SERVICE_KEY, si elle est définie, est utilisée à la place.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import streamlit as st
+
+from utils.cache import bump_data_version, set_live_invalidation
+
+CHANGE_FEED = os.getenv('CHANGE_FEED', 'realtime')
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv('CHANGE_FEED_POLL_INTERVAL', '5'))
+
+# Table surveillée -> périmètre de cache invalidé
+TABLE_SCOPES = {
+    'products': 'products',
+    'product_images': 'products',
+    'orders': 'orders',
+}
+
+
+class ChangeFeed:
+    """Thread d'écoute des modifications, qui invalide les caches du processus"""
+
+    def __init__(self, url: str, key: str, mode: str = CHANGE_FEED,
+                 poll_interval: float = CHANGE_FEED_POLL_INTERVAL):
+        self.url = url
+        self.key = key
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.events = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._markers: Dict[str, Tuple] = {}
+
+    def start(self):
+        """Démarre le thread d'écoute (sans effet si déjà démarré ou désactivé)"""
+        if self.mode == 'off' or (self._thread and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread d'écoute"""
+        self._stop.set()
+        set_live_invalidation(False)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _on_change(self, table: str):
+        scope = TABLE_SCOPES.get(table)
+        if scope:
+            self.events += 1
+            bump_data_version(scope)
+
+    def _run(self):
+        if self.mode == 'realtime':
+            try:
+                asyncio.run(self._listen_realtime())
+            except Exception as e:
+                print(f"⚠️ Supabase Realtime indisponible, sondage toutes les {self.poll_interval:g}s: {str(e)}")
+            finally:
+                set_live_invalidation(False)
+
+        if not self._stop.is_set():
+            self._poll_forever()
+
+    # --- Realtime -----------------------------------------------------------
+
+    async def _listen_realtime(self):
+        from realtime import AsyncRealtimeClient
+
+        endpoint = self.url.replace('https://', 'wss://').replace('http://', 'ws://').rstrip('/')
+        client = AsyncRealtimeClient(f"{endpoint}/realtime/v1", token=self.key, auto_reconnect=False)
+        await client.connect()
+
+        channel = client.channel('cache-invalidation')
+        for table in TABLE_SCOPES:
+            channel.on_postgres_changes(
+                '*', schema='public', table=table,
+                callback=lambda payload: self._on_change(payload['data']['table'])
+            )
+
+        subscribed = asyncio.Event()
+        failure = []
+
+        def on_subscribe(state, error):
+            if state == 'SUBSCRIBED':
+                subscribed.set()
+            else:
+                failure.append(error or state)
+                subscribed.set()
+
+        await channel.subscribe(on_subscribe)
+        await asyncio.wait_for(subscribed.wait(), timeout=10)
+        if failure:
+            raise ConnectionError(f"abonnement refusé: {failure[0]}")
+
+        # Des écritures ont pu avoir lieu avant l'abonnement
+        for scope in set(TABLE_SCOPES.values()):
+            bump_data_version(scope)
+        set_live_invalidation(True)
+        print("✅ Flux Realtime connecté : invalidation des caches à chaque modification")
+
+        try:
+            while not self._stop.is_set():
+                await asyncio.sleep(1)
+                if not client.is_connected:
+                    raise ConnectionError("connexion Realtime perdue")
+        finally:
+            await client.close()
+
+    # --- Sondage de repli ---------------------------------------------------
+
+    def _poll_forever(self):
+        from supabase import create_client
+
+        client = create_client(self.url, self.key)
+        while not self._stop.is_set():
+            try:
+                self.poll_once(client)
+                set_live_invalidation(True)
+            except Exception as e:
+                print(f"⚠️ Sondage des modifications en échec: {str(e)}")
+                set_live_invalidation(False)
+            self._stop.wait(self.poll_interval)
+
+    def poll_once(self, client):
+        """
+        Compare max(updated_at) et count(*) de chaque table au relevé précédent
+
+        Le compteur détecte les suppressions, updated_at les insertions et mises à jour.
+        Une requête minuscule par table (une ligne, une colonne).
+        """
+        for table in TABLE_SCOPES:
+            response = (client.table(table)
+                        .select('updated_at', count='exact')
+                        .order('updated_at', desc=True)
+                        .limit(1)
+                        .execute())
+            latest = response.data[0]['updated_at'] if response.data else None
+            marker = (response.count, latest)
+
+            previous = self._markers.get(table)
+            self._markers[table] = marker
+            if previous is not None and previous != marker:
+                self._on_change(table)
+
+
+@st.cache_resource(show_spinner=False)
+def start_change_feed() -> Optional[ChangeFeed]:
+    """
+    Démarre le flux de modifications du processus (une seule fois)
+
+    Returns:
+        Le ChangeFeed démarré, ou None s'il est désactivé ou non configuré
+    """
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+    if CHANGE_FEED == 'off' or not url or not key:
+        return None
+
+    feed = ChangeFeed(url, key)
+    feed.start()
+    return feed
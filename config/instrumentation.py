@@ -0,0 +1,394 @@
+"""
+Instrumentation des appels Supabase (PostgREST, RPC, Storage, Auth)
+
+Chaque appel est chronométré et enregistré : table, opération, filtres,
+nombre de lignes et latence. On dispose ainsi :
+- des totaux du rerun en cours (pour repérer les motifs 1+3N par page),
+- d'un journal des requêtes lentes (seuil SLOW_QUERY_MS, 500 ms par défaut),
+- d'un export texte au format Prometheus.
+
+Désactivable avec QUERY_INSTRUMENTATION=0. La taille des réponses (JSON
+sérialisé à nouveau à chaque appel) n'est mesurée qu'avec QUERY_PAYLOAD_SIZE=1.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, List
+
+import streamlit as st
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Seuils des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Méthodes PostgREST qui définissent l'opération (les autres sont des filtres/modificateurs)
+OPERATIONS = {'select', 'insert', 'update', 'upsert', 'delete'}
+
+# Au-delà de ce nombre de requêtes de même forme dans un rerun, on signale un motif N+1
+REPEATED_QUERY_THRESHOLD = 5
+
+
+def is_enabled() -> bool:
+    """Instrumentation active sauf si QUERY_INSTRUMENTATION=0"""
+    return os.getenv('QUERY_INSTRUMENTATION', '1') not in ('0', 'false', 'False')
+
+
+def payload_size_enabled() -> bool:
+    """Mesure de la taille des réponses si QUERY_PAYLOAD_SIZE=1 (désactivée par défaut)"""
+    return os.getenv('QUERY_PAYLOAD_SIZE', '0') in ('1', 'true', 'True')
+
+
+def slow_query_threshold() -> float:
+    """Seuil des requêtes lentes en secondes (SLOW_QUERY_MS)"""
+    try:
+        return float(os.getenv('SLOW_QUERY_MS', '500')) / 1000
+    except ValueError:
+        return 0.5
+
+
+def _current_page() -> str:
+    """
+    Nom de la page Streamlit à l'origine de l'appel (app, 2_Panier, admin_4_Dashboard...)
+
+    Remonte la pile d'appels jusqu'au premier fichier de pages/ ou app.py,
+    sans lire le code source (coût négligeable).
+    """
+    frame = sys._getframe(2)
+    pages_dir = str(ROOT / "pages")
+    app_file = str(ROOT / "app.py")
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(pages_dir) or filename == app_file:
+            return Path(filename).stem
+        frame = frame.f_back
+    return "-"
+
+
+class QueryLog:
+    """Registre des appels, partagé par toutes les sessions du processus"""
+
+    def __init__(self, recent_size: int = 500, slow_size: int = 200):
+        self._lock = threading.Lock()
+        self.recent = deque(maxlen=recent_size)
+        self.slow = deque(maxlen=slow_size)
+        self.metrics: Dict[tuple, Dict] = {}
+
+    def record(self, call: Dict):
+        """Enregistre un appel terminé dans les agrégats, le journal et le rerun en cours"""
+        key = (call['kind'], call['table'], call['operation'], call['page'])
+
+        with self._lock:
+            self.recent.append(call)
+            if call['seconds'] >= slow_query_threshold():
+                self.slow.append(call)
+
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = {
+                    'count': 0, 'errors': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0,
+                    'buckets': [0] * len(LATENCY_BUCKETS)
+                }
+            metric['count'] += 1
+            metric['errors'] += 1 if call['error'] else 0
+            metric['seconds'] += call['seconds']
+            metric['rows'] += call['rows']
+            metric['bytes'] += call['bytes']
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if call['seconds'] <= bound:
+                    metric['buckets'][i] += 1
+
+        if call['seconds'] >= slow_query_threshold():
+            print(f"🐢 Requête lente ({call['seconds'] * 1000:.0f} ms) [{call['page']}] "
+                  f"{call['kind']} {call['table']}.{call['operation']} {' '.join(call['filters'])}")
+
+        _record_rerun(call)
+
+    def slow_queries(self) -> List[Dict]:
+        """Requêtes lentes, les plus récentes d'abord"""
+        with self._lock:
+            return list(reversed(self.slow))
+
+    def export_prometheus(self) -> str:
+        """Exporte les agrégats au format texte Prometheus"""
+        with self._lock:
+            metrics = {k: dict(v, buckets=list(v['buckets'])) for k, v in self.metrics.items()}
+
+        lines = [
+            "# HELP supabase_requests_total Nombre d'appels Supabase",
+            "# TYPE supabase_requests_total counter",
+        ]
+        for key, m in metrics.items():
+            lines.append(f"supabase_requests_total{{{_labels(key)}}} {m['count']}")
+
+        lines += ["# HELP supabase_request_errors_total Appels Supabase en erreur",
+                  "# TYPE supabase_request_errors_total counter"]
+        for key, m in metrics.items():
+            lines.append(f"supabase_request_errors_total{{{_labels(key)}}} {m['errors']}")
+
+        lines += ["# HELP supabase_rows_total Lignes renvoyées",
+                  "# TYPE supabase_rows_total counter"]
+        for key, m in metrics.items():
+            lines.append(f"supabase_rows_total{{{_labels(key)}}} {m['rows']}")
+
+        lines += ["# HELP supabase_payload_bytes_total Taille des réponses (octets, JSON ; 0 sans QUERY_PAYLOAD_SIZE=1)",
+                  "# TYPE supabase_payload_bytes_total counter"]
+        for key, m in metrics.items():
+            lines.append(f"supabase_payload_bytes_total{{{_labels(key)}}} {m['bytes']}")
+
+        lines += ["# HELP supabase_request_duration_seconds Latence des appels Supabase",
+                  "# TYPE supabase_request_duration_seconds histogram"]
+        for key, m in metrics.items():
+            labels = _labels(key)
+            for bound, count in zip(LATENCY_BUCKETS, m['buckets']):
+                lines.append(f'supabase_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'supabase_request_duration_seconds_bucket{{{labels},le="+Inf"}} {m["count"]}')
+            lines.append(f"supabase_request_duration_seconds_sum{{{labels}}} {m['seconds']:.6f}")
+            lines.append(f"supabase_request_duration_seconds_count{{{labels}}} {m['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key: tuple) -> str:
+    kind, table, operation, page = key
+    return f'kind="{kind}",table="{table}",operation="{operation}",page="{page}"'
+
+
+# Registre unique du processus
+QUERY_LOG = QueryLog()
+
+# =============================================================================
+# TOTAUX PAR RERUN
+# =============================================================================
+
+
+def _empty_rerun_stats() -> Dict:
+    return {'calls': 0, 'errors': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0,
+            'by_table': Counter(), 'shapes': Counter()}
+
+
+def start_rerun():
+    """
+    Remet à zéro les totaux du rerun courant
+
+    Appelée par init_supabase() au début de chaque exécution de page. Écrit aussi
+    le fichier Prometheus si PROMETHEUS_TEXTFILE est défini.
+    """
+    try:
+        st.session_state['_query_rerun_stats'] = _empty_rerun_stats()
+    except Exception:
+        pass  # Hors contexte Streamlit (scripts, benchmarks)
+
+    textfile = os.getenv('PROMETHEUS_TEXTFILE')
+    if textfile:
+        write_prometheus_textfile(textfile)
+
+
+def _record_rerun(call: Dict):
+    """Ajoute un appel aux totaux du rerun de la session courante"""
+    try:
+        stats = st.session_state.get('_query_rerun_stats')
+    except Exception:
+        return
+    if stats is None:
+        return
+
+    stats['calls'] += 1
+    stats['errors'] += 1 if call['error'] else 0
+    stats['seconds'] += call['seconds']
+    stats['rows'] += call['rows']
+    stats['bytes'] += call['bytes']
+    stats['by_table'][f"{call['table']}.{call['operation']}"] += 1
+    stats['shapes'][(call['table'], call['operation'], tuple(call['filters']))] += 1
+
+
+def get_rerun_stats() -> Dict:
+    """
+    Totaux du rerun en cours pour la session
+
+    Returns:
+        Dict avec calls, errors, seconds, rows, bytes, by_table et `repeated`
+        (formes de requêtes répétées au moins REPEATED_QUERY_THRESHOLD fois)
+    """
+    try:
+        stats = st.session_state.get('_query_rerun_stats') or _empty_rerun_stats()
+    except Exception:
+        stats = _empty_rerun_stats()
+
+    repeated = {
+        f"{table}.{operation} {' '.join(filters)}".strip(): count
+        for (table, operation, filters), count in stats['shapes'].items()
+        if count >= REPEATED_QUERY_THRESHOLD
+    }
+    return {**{k: v for k, v in stats.items() if k != 'shapes'}, 'repeated': repeated}
+
+
+_last_textfile_write = 0.0
+
+
+def write_prometheus_textfile(path: str, min_interval: float = 15.0):
+    """Écrit l'export Prometheus dans un fichier (collecteur textfile de node_exporter)"""
+    global _last_textfile_write
+    now = time.monotonic()
+    if now - _last_textfile_write < min_interval:
+        return
+    _last_textfile_write = now
+    try:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(QUERY_LOG.export_prometheus())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"❌ Écriture des métriques Prometheus impossible: {e}")
+
+# =============================================================================
+# PROXIES
+# =============================================================================
+
+
+def _payload_stats(data) -> tuple:
+    """(lignes, octets) d'une réponse PostgREST (octets à 0 si la mesure est désactivée)"""
+    if data is None:
+        return 0, 0
+    rows = len(data) if isinstance(data, list) else 1
+    if not payload_size_enabled():
+        return rows, 0
+    try:
+        size = len(json.dumps(data, default=str))
+    except (TypeError, ValueError):
+        size = 0
+    return rows, size
+
+
+def _timed(kind: str, table: str, operation: str, filters: List[str], func, *args, **kwargs):
+    """Exécute `func` en enregistrant l'appel, y compris en cas d'exception"""
+    page = _current_page()
+    started = time.perf_counter()
+    error = None
+    result = None
+    try:
+        result = func(*args, **kwargs)
+        return result
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        rows, size = _payload_stats(getattr(result, 'data', None)) if kind in ('postgrest', 'rpc') else (0, 0)
+        QUERY_LOG.record({
+            'ts': time.time(),
+            'page': page,
+            'kind': kind,
+            'table': table,
+            'operation': operation,
+            'filters': filters,
+            'rows': rows,
+            'bytes': size,
+            'seconds': seconds,
+            'error': error
+        })
+
+
+class _InstrumentedQuery:
+    """Builder PostgREST instrumenté : mémorise l'opération et les filtres jusqu'à execute()"""
+
+    def __init__(self, builder, kind: str, table: str, operation: str = "select", filters: List[str] = None):
+        self._builder = builder
+        self._kind = kind
+        self._table = table
+        self._operation = operation
+        self._filters = filters or []
+
+    def execute(self):
+        return _timed(self._kind, self._table, self._operation, self._filters, self._builder.execute)
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # Propriétés chaînables comme `.not_`
+            if hasattr(attr, 'execute'):
+                return _InstrumentedQuery(attr, self._kind, self._table, self._operation,
+                                          self._filters + [name])
+            return attr
+
+        def wrapper(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if not hasattr(result, 'execute'):
+                return result
+
+            operation, filters = self._operation, self._filters
+            if name in OPERATIONS:
+                operation = name
+            else:
+                # On ne garde que la colonne (jamais la valeur : emails, téléphones...)
+                column = args[0] if args and isinstance(args[0], str) and name != 'or_' else ""
+                if name in ('in_',) and len(args) > 1:
+                    column = f"{column}[{len(args[1])}]"
+                filters = filters + [f"{name}({column})"]
+            return _InstrumentedQuery(result, self._kind, self._table, operation, filters)
+        return wrapper
+
+
+class _InstrumentedService:
+    """Service Storage/Auth instrumenté : chaque appel de méthode est chronométré"""
+
+    def __init__(self, service, kind: str, table: str = "-"):
+        self._service = service
+        self._kind = kind
+        self._table = table
+
+    def from_(self, bucket: str):
+        return _InstrumentedService(self._service.from_(bucket), self._kind, bucket)
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            return _timed(self._kind, self._table, name, [], attr, *args, **kwargs)
+        return wrapper
+
+
+class InstrumentedClient:
+    """Enveloppe fine d'un client Supabase : même API, appels mesurés"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str):
+        return _InstrumentedQuery(self._client.table(name), 'postgrest', name)
+
+    def from_(self, name: str):
+        return self.table(name)
+
+    def rpc(self, fn: str, *args, **kwargs):
+        return _InstrumentedQuery(self._client.rpc(fn, *args, **kwargs), 'rpc', fn, 'rpc')
+
+    @property
+    def storage(self):
+        return _InstrumentedService(self._client.storage, 'storage')
+
+    @property
+    def auth(self):
+        return _InstrumentedService(self._client.auth, 'auth')
+
+    @property
+    def unwrapped(self):
+        """Client Supabase d'origine"""
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_client(client):
+    """Retourne le client instrumenté si l'instrumentation est active, sinon le client tel quel"""
+    if not is_enabled() or isinstance(client, InstrumentedClient):
+        return client
+    return InstrumentedClient(client)
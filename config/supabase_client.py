@@ -5,6 +5,8 @@ Configuration et initialisation du client Supabase
 import os
 import streamlit as st
 from supabase import create_client, Client
+from config.instrumentation import instrument_client, start_rerun
+from config.change_feed import start_change_feed
 
 
 
@@ -13,7 +15,13 @@ def init_supabase() -> Client:
     """
     Initialise et retourne le client Supabase
     Utilise st.session_state pour cache le client
+    
+    Appelée en tête de chaque page : démarre aussi les totaux de requêtes du rerun
+    et, au premier appel du processus, le flux de modifications (invalidation des caches)
     """
+    start_rerun()
+    start_change_feed()
+    
     if 'supabase' not in st.session_state:
         url = os.getenv('SUPABASE_URL')
         key = os.getenv('SUPABASE_KEY') # Clé publique ANON
@@ -24,7 +32,8 @@ def init_supabase() -> Client:
         
         try:
             # Crée un client ANONYME. Il sera mis à jour après le login.
-            st.session_state.supabase = create_client(url, key)
+            # Enveloppé par l'instrumentation (latence, lignes, requêtes lentes)
+            st.session_state.supabase = instrument_client(create_client(url, key))
         except Exception as e:
             st.error(f"❌ Erreur de connexion à Supabase: {str(e)}")
             st.stop()
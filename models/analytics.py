@@ -2,12 +2,24 @@
 Modèle Analytics pour les statistiques et rapports
 """
 
+import json
 from typing import List, Dict
 from datetime import datetime, timedelta, timezone  # <-- 1. IMPORT AJOUTÉ
 from models.order import Order
 from models.product import Product
+from utils.events import read_events
+import numpy as np
 import pandas as pd
 
+# Étapes du tunnel de conversion (événements de utils/events.track_event), dans l'ordre
+FUNNEL_STEPS = {
+    'visit': "Visite",
+    'add_to_cart': "Ajout au panier",
+    'view_cart': "Panier consulté",
+    'begin_checkout': "Checkout",
+    'purchase': "Commande",
+}
+
 class Analytics:
     """Classe pour gérer les analytics et statistiques"""
     
@@ -40,7 +52,7 @@ class Analytics:
             days: Période en jours
         
         Returns:
-            DataFrame avec date, nb_commandes, chiffre_affaires
+            DataFrame avec date (jj/mm), jour (Timestamp UTC), nb_commandes, chiffre_affaires
         """
         orders = Order.get_orders_by_period(days)
         
@@ -63,7 +75,8 @@ class Analytics:
                 df.loc[mask, 'nb_commandes'] += 1
                 df.loc[mask, 'chiffre_affaires'] += order['total']
         
-        # Formatter en 'jour/mois' pour l'affichage
+        # Formatter en 'jour/mois' pour l'affichage (la date complète reste dans 'jour')
+        df['jour'] = df['date']
         df['date'] = df['date'].dt.strftime('%d/%m')
         
         return df
@@ -201,6 +214,7 @@ class Analytics:
         
         for order in orders:
             client = order.get('clients', {})
+            delivery = Order.delivery(order)
             
             # Détails des produits
             products_detail = []
@@ -216,10 +230,10 @@ class Analytics:
                 # Optionnel: convertir en heure locale pour l'export si besoin
                 # 'Date': order_date.tz_convert('Europe/Paris').strftime('%d/%m/%Y %H:%M'),
                 'Date': order_date.strftime('%d/%m/%Y %H:%M (UTC)'),
-                'Client': f"{client.get('first_name', '')} {client.get('last_name', '')}",
+                'Client': f"{delivery['first_name']} {delivery['last_name']}",
                 'Email': client.get('email', ''),
-                'Téléphone': client.get('phone', ''),
-                'Adresse': client.get('address', ''),
+                'Téléphone': delivery['phone'],
+                'Adresse': delivery['address'],
                 'Produits': ' | '.join(products_detail),
                 'Total': order['total'],
                 'Statut': order['status'],
@@ -281,4 +295,65 @@ class Analytics:
                 'viewed': order['viewed']
             })
         
-        return activities
\ No newline at end of file
+        return activities
+    
+    @staticmethod
+    def compute_funnel(events: pd.DataFrame) -> Dict:
+        """
+        Tunnel de conversion par session, calculé sans boucle Python
+        
+        Une session a franchi une étape si elle y a un événement ou en a franchi
+        une suivante (une commande implique le checkout, le panier...).
+        
+        Args:
+            events: Événements (colonnes session, name, props)
+        
+        Returns:
+            Dict avec sessions, steps (DataFrame Étape / Sessions / % du départ /
+            % de l'étape précédente), conversion_rate, abandoned_carts,
+            checkout_errors (Series champ -> nombre)
+        """
+        steps = list(FUNNEL_STEPS)
+        step_codes = pd.Categorical(events['name'], categories=steps).codes
+        in_funnel = step_codes >= 0
+        session_codes, sessions = pd.factorize(events['session'][in_funnel])
+        
+        # Matrice sessions x étapes, puis propagation des étapes suivantes vers les précédentes
+        reached = np.zeros((len(sessions), len(steps)), dtype=bool)
+        reached[session_codes, step_codes[in_funnel]] = True
+        reached = np.logical_or.accumulate(reached[:, ::-1], axis=1)[:, ::-1]
+        counts = reached.sum(axis=0)
+        previous = np.maximum(np.concatenate((counts[:1], counts[:-1])), 1)
+        steps_df = pd.DataFrame({
+            'Étape': list(FUNNEL_STEPS.values()),
+            'Sessions': counts,
+            '% du départ': (counts / max(counts[0], 1) * 100).round(1),
+            "% de l'étape précédente": (counts / previous * 100).round(1),
+        })
+        
+        errors = events.loc[events['name'] == 'checkout_error', 'props'].dropna()
+        checkout_errors = errors.map(lambda props: json.loads(props).get('fields', [])).explode().value_counts() \
+            if not errors.empty else pd.Series(dtype='int64')
+        
+        visits, purchases = int(counts[0]), int(counts[-1])
+        return {
+            'sessions': visits,
+            'steps': steps_df,
+            'conversion_rate': purchases / visits * 100 if visits else 0.0,
+            'abandoned_carts': int((reached[:, steps.index('add_to_cart')] & ~reached[:, -1]).sum()),
+            'checkout_errors': checkout_errors,
+        }
+    
+    @staticmethod
+    def get_funnel(days: int) -> Dict:
+        """
+        Tunnel de conversion des derniers jours
+        
+        Args:
+            days: Nombre de jours
+        
+        Returns:
+            Voir compute_funnel
+        """
+        since = (datetime.now(timezone.utc) - timedelta(days=days)).timestamp()
+        return Analytics.compute_funnel(read_events(since))
@@ -0,0 +1,75 @@
+"""
+Catalogue partagé en cache (un exemplaire par processus)
+
+Le catalogue complet et les index construits dessus sont mis en cache par
+estampille de version des produits : toute écriture via Product les reconstruit,
+et DATA_VERSION_TTL borne la fraîcheur des écritures faites ailleurs.
+Le catalogue est un CatalogStore (enregistrements à __slots__, images en table
+annexe) : une seule copie compacte par processus, quel que soit le nombre de
+sessions. Les objets retournés sont partagés entre sessions : ne pas les modifier.
+
+Le code qui combine plusieurs de ces objets (index + catalogue) lit la version
+une fois et la passe à chaque getter : une écriture entre deux lectures ne
+peut pas lui donner un index et un catalogue de versions différentes.
+
+Une erreur de chargement n'est pas mise en cache : elle est signalée, la page
+reçoit un catalogue vide et le rerun suivant réessaie.
+"""
+
+import streamlit as st
+
+from utils.cache import get_data_version
+from utils.catalog_store import CatalogStore
+from utils.facets import FacetIndex
+from utils.search_index import SearchIndex, Suggester
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_catalog(products_version: str) -> CatalogStore:
+    from models.product import Product
+    # Chargé page par page ; les lignes PostgREST ne sont gardées que le temps de la conversion
+    return CatalogStore(Product.iter_all())
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_search_index(products_version: str) -> SearchIndex:
+    return SearchIndex(_load_catalog(products_version))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_suggester(products_version: str) -> Suggester:
+    return Suggester(_load_catalog(products_version))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _build_facet_index(products_version: str) -> FacetIndex:
+    return FacetIndex(_load_catalog(products_version))
+
+
+def _current(builder, empty, version: str = None):
+    """Objet en cache pour la version donnée (courante par défaut), ou empty(catalogue vide) si le chargement échoue"""
+    try:
+        return builder(version or get_data_version('products'))
+    except Exception as e:
+        st.error(f"Erreur lors du chargement du catalogue: {str(e)}")
+        return empty(CatalogStore(()))
+
+
+def get_catalog(version: str = None) -> CatalogStore:
+    """Catalogue complet (trié par nom), recherche par ID en O(1)"""
+    return _current(_load_catalog, lambda catalog: catalog, version)
+
+
+def get_search_index(version: str = None) -> SearchIndex:
+    """Index de recherche local sur le catalogue courant"""
+    return _current(_build_search_index, SearchIndex, version)
+
+
+def get_suggester(version: str = None) -> Suggester:
+    """Index de suggestions (noms et notes) sur le catalogue courant"""
+    return _current(_build_suggester, Suggester, version)
+
+
+def get_facet_index(version: str = None) -> FacetIndex:
+    """Bitsets des facettes (type, prix, disponibilité, nouveautés) du catalogue courant"""
+    return _current(_build_facet_index, FacetIndex, version)
@@ -9,6 +9,60 @@ import streamlit as st
 class Client:
     """Classe pour gérer les clients"""
     
+    # Passe à False (pour le processus) sans index unique sur clients.email
+    _upsert_available = True
+    
+    @staticmethod
+    def get_or_create(first_name: str, last_name: str, email: str, phone: str, address: str) -> Optional[Dict]:
+        """
+        Retrouve le client par son email, ou le crée
+        
+        Une seule requête (on_conflict='email' sans mise à jour, index unique de
+        supabase/migrations/20261019140000_client_upsert.sql) ; sans l'index,
+        recherche par email puis création. Les coordonnées d'un client existant
+        ne sont pas modifiées : n'importe qui peut commander avec n'importe quel
+        email, et les coordonnées de livraison sont portées par la commande.
+        
+        Args:
+            first_name: Prénom
+            last_name: Nom
+            email: Email
+            phone: Téléphone
+            address: Adresse
+        
+        Returns:
+            Données du client ou None
+        """
+        if Client._upsert_available:
+            try:
+                supabase = get_supabase()
+                client_data = {
+                    'first_name': first_name,
+                    'last_name': last_name,
+                    'email': email,
+                    'phone': phone,
+                    'address': address
+                }
+                response = (supabase.table('clients')
+                            .upsert(client_data, on_conflict='email', ignore_duplicates=True)
+                            .execute())
+                if response.data:
+                    return response.data[0]
+                # Email déjà enregistré : aucune ligne renvoyée
+                return Client.get_by_email(email)
+            except Exception as e:
+                # 42P10 : aucune contrainte unique ne correspond à on_conflict
+                if getattr(e, 'code', None) != '42P10':
+                    st.error(f"Erreur lors de l'enregistrement du client: {str(e)}")
+                    return None
+                Client._upsert_available = False
+                print(f"⚠️ Index unique clients.email absent, recherche puis création: {str(e)}")
+        
+        existing = Client.get_by_email(email)
+        if existing:
+            return existing
+        return Client.create(first_name, last_name, email, phone, address)
+    
     @staticmethod
     def create(first_name: str, last_name: str, email: str, phone: str, address: str) -> Optional[Dict]:
         """
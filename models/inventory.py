@@ -0,0 +1,72 @@
+"""
+Modèle Inventory : journal des mouvements de stock
+
+Voir supabase/migrations/20261019110000_inventory_ledger.sql : le journal est
+en ajout seul, products.stock en est la somme matérialisée.
+"""
+
+from typing import Dict, List
+
+import streamlit as st
+
+from config.supabase_client import get_supabase
+from utils.cache import bump_data_version
+
+LEDGER_REASONS = {
+    'initial': "Stock initial",
+    'order': "Commande",
+    'cancel': "Annulation",
+    'adjustment': "Ajustement manuel",
+}
+
+
+class Inventory:
+    """Classe pour consulter le journal de stock et le réconcilier"""
+
+    @staticmethod
+    def get_ledger(product_id: int = None, order_id: int = None, limit: int = 100) -> List[Dict]:
+        """
+        Récupère les derniers mouvements de stock
+
+        Args:
+            product_id: Filtre par produit
+            order_id: Filtre par commande
+            limit: Nombre maximal de mouvements
+
+        Returns:
+            Mouvements, du plus récent au plus ancien
+        """
+        try:
+            supabase = get_supabase()
+            query = supabase.table('inventory_ledger').select('*, products(name)')
+            if product_id is not None:
+                query = query.eq('product_id', product_id)
+            if order_id is not None:
+                query = query.eq('order_id', order_id)
+            response = query.order('id', desc=True).limit(limit).execute()
+            return response.data if response.data else []
+        except Exception as e:
+            st.error(f"Erreur lors de la récupération du journal de stock: {str(e)}")
+            return []
+
+    @staticmethod
+    def reconcile(client=None) -> List[Dict]:
+        """
+        Recalcule products.stock depuis le journal et corrige les écarts
+
+        Args:
+            client: Client Supabase (celui de la session par défaut ; les outils
+                    en ligne de commande passent le leur)
+
+        Returns:
+            Écarts corrigés [{product_id, stock_before, stock_after}]
+
+        Raises:
+            Exception: Si la RPC reconcile_stock échoue
+        """
+        supabase = client or get_supabase()
+        response = supabase.rpc('reconcile_stock', {}).execute()
+        drift = response.data or []
+        if drift:
+            bump_data_version('products')
+        return drift
@@ -5,25 +5,165 @@ Modèle Order avec méthodes CRUD et logique métier
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from config.supabase_client import get_supabase
+from utils.cache import bump_data_version
 from models.product import Product
+from models.client import Client
+from models.reservation import Reservation
 import streamlit as st
 
 class Order:
     """Classe pour gérer les commandes"""
     
+    # Passe à False (pour le processus) si place_order / set_order_status ne sont pas déployées
+    _ledger_rpc_available = True
+    
+    @staticmethod
+    def _ledger_rpc_missing(e: Exception) -> bool:
+        """Vrai si l'erreur indique que les RPC du journal de stock ne sont pas déployées"""
+        if getattr(e, 'code', None) in ('PGRST202', '42883'):
+            Order._ledger_rpc_available = False
+            print(f"⚠️ RPC du journal de stock indisponibles, mode sans journal: {str(e)}")
+            return True
+        return False
+    
+    # Passe à False (pour le processus) si place_order n'accepte pas encore p_client
+    _client_rpc_available = True
+    
+    # Passe à False (pour le processus) si la colonne orders.idempotency_key n'existe pas
+    _idempotency_column = True
+    
+    # Passe à False (pour le processus) si les colonnes orders.delivery_* n'existent pas
+    _delivery_columns = True
+    
+    DELIVERY_FIELDS = ('first_name', 'last_name', 'phone', 'address')
+    
+    @staticmethod
+    def delivery(order: Dict) -> Dict:
+        """
+        Coordonnées de livraison d'une commande
+        
+        Celles saisies avec la commande (orders.delivery_*), sinon celles du
+        client (commandes antérieures aux colonnes).
+        
+        Args:
+            order: Commande, avec son client (clients) si chargé
+        
+        Returns:
+            {first_name, last_name, phone, address}
+        """
+        client = order.get('clients') or {}
+        if order.get('delivery_address'):
+            return {field: order.get(f'delivery_{field}') or '' for field in Order.DELIVERY_FIELDS}
+        return {field: client.get(field) or '' for field in Order.DELIVERY_FIELDS}
+    
     @staticmethod
-    def create(client_id: int, cart_items: Dict, total: float) -> Optional[Dict]:
+    def get_by_idempotency_key(idempotency_key: str) -> Optional[Dict]:
+        """
+        Récupère la commande créée avec une clé d'idempotence
+        
+        Args:
+            idempotency_key: Clé du formulaire de checkout
+        
+        Returns:
+            Données de la commande ou None
+        
+        Raises:
+            Exception: Si la requête échoue (colonne absente comprise)
+        """
+        supabase = get_supabase()
+        response = supabase.table('orders').select('*').eq('idempotency_key', idempotency_key).limit(1).execute()
+        return response.data[0] if response.data else None
+    
+    @staticmethod
+    def create(client_id: Optional[int], cart_items: Dict, total: float, cart_token: str = None,
+               idempotency_key: str = None, client_data: Dict = None) -> Optional[Dict]:
         """
         Crée une nouvelle commande et ses items
         
+        Utilise la RPC place_order (commande, lignes et sorties de stock dans une
+        seule transaction, refusée si un stock est insuffisant) ; sans elle,
+        les requêtes successives d'origine.
+        
+        Avec une clé d'idempotence, un second appel (double clic, nouvel essai
+        après une coupure) renvoie la commande existante avec 'replayed' à True,
+        sans nouvelles sorties de stock.
+        
+        Avec client_data, le client est retrouvé par son email ou créé dans le
+        même appel à place_order (sans la RPC, par Client.get_or_create) ; ses
+        coordonnées existantes ne sont pas modifiées, celles saisies sont
+        enregistrées sur la commande.
+        
         Args:
-            client_id: ID du client
+            client_id: ID du client (None si client_data est fourni)
             cart_items: Items du panier {product_id: {quantity, price, name}}
             total: Total de la commande
+            cart_token: Panier dont les réservations de stock sont converties en commande
+            idempotency_key: Clé du formulaire de checkout
+            client_data: Coordonnées {first_name, last_name, email, phone, address}
         
         Returns:
-            Données de la commande créée ou None
+            Données de la commande créée (ou existante) ou None
         """
+        delivery = {field: client_data.get(field) for field in Order.DELIVERY_FIELDS} if client_data else None
+        
+        if client_data is not None and not (Order._ledger_rpc_available and Order._client_rpc_available):
+            client = Client.get_or_create(**client_data)
+            if not client:
+                return None
+            client_id, client_data = client['id'], None
+        
+        if Order._ledger_rpc_available:
+            try:
+                supabase = get_supabase()
+                items = [
+                    {'product_id': int(product_id), 'quantity': item['quantity'], 'price': item['price']}
+                    for product_id, item in cart_items.items()
+                ]
+                params = {'p_items': items, 'p_total': total}
+                if client_data is not None:
+                    params['p_client'] = client_data
+                else:
+                    params['p_client_id'] = client_id
+                if cart_token:
+                    params['p_cart_token'] = cart_token
+                if idempotency_key:
+                    params['p_idempotency_key'] = idempotency_key
+                response = supabase.rpc('place_order', params).execute()
+                order = response.data
+                order = order[0] if isinstance(order, list) else order
+                if order is not None:
+                    order.setdefault('replayed', False)
+                    if not order['replayed']:
+                        bump_data_version('orders', 'products')
+                return order
+            
+            except Exception as e:
+                # place_order antérieure à p_client : client enregistré à part
+                if client_data is not None and getattr(e, 'code', None) in ('PGRST202', '42883'):
+                    Order._client_rpc_available = False
+                    print(f"⚠️ place_order sans p_client, client enregistré séparément: {str(e)}")
+                    return Order.create(None, cart_items, total, cart_token, idempotency_key, client_data)
+                if not Order._ledger_rpc_missing(e):
+                    if getattr(e, 'hint', None) == 'insufficient_stock':
+                        st.error("❌ Stock insuffisant pour un des articles, la commande n'a pas été créée")
+                    else:
+                        st.error(f"Erreur lors de la création de la commande: {str(e)}")
+                    return None
+        
+        # Rejeu sans la RPC : chercher la commande de la clé
+        if idempotency_key and Order._idempotency_column:
+            try:
+                existing = Order.get_by_idempotency_key(idempotency_key)
+                if existing:
+                    return {**existing, 'replayed': True}
+            except Exception as e:
+                if getattr(e, 'code', None) in ('42703', 'PGRST204'):
+                    Order._idempotency_column = False
+                    print(f"⚠️ Colonne orders.idempotency_key absente, commandes sans clé: {str(e)}")
+                else:
+                    st.error(f"Erreur lors de la création de la commande: {str(e)}")
+                    return None
+        
         try:
             supabase = get_supabase()
             
@@ -34,13 +174,35 @@ class Order:
                 'status': 'en_cours',
                 'viewed': False
             }
+            if idempotency_key and Order._idempotency_column:
+                order_data['idempotency_key'] = idempotency_key
+            if delivery and Order._delivery_columns:
+                order_data.update({f'delivery_{field}': value for field, value in delivery.items()})
             
-            response = supabase.table('orders').insert(order_data).execute()
+            try:
+                try:
+                    response = supabase.table('orders').insert(order_data).execute()
+                except Exception as e:
+                    # Colonnes de livraison absentes (migration non appliquée)
+                    if getattr(e, 'code', None) not in ('42703', 'PGRST204') or 'delivery_address' not in order_data:
+                        raise
+                    Order._delivery_columns = False
+                    print(f"⚠️ Colonnes orders.delivery_* absentes, coordonnées du client seules: {str(e)}")
+                    for field in Order.DELIVERY_FIELDS:
+                        order_data.pop(f'delivery_{field}')
+                    response = supabase.table('orders').insert(order_data).execute()
+            except Exception as e:
+                # Validation simultanée avec la même clé : l'autre a gagné
+                if getattr(e, 'code', None) == '23505' and 'idempotency_key' in order_data:
+                    existing = Order.get_by_idempotency_key(idempotency_key)
+                    if existing:
+                        return {**existing, 'replayed': True}
+                raise
             
             if not response.data:
                 return None
             
-            order = response.data[0]
+            order = {**response.data[0], 'replayed': False}
             order_id = order['id']
             
             # Créer les items et mettre à jour les stocks
@@ -57,6 +219,10 @@ class Order:
                 # Décrémenter le stock
                 Product.update_stock(int(product_id), -item['quantity'])
             
+            if cart_token:
+                Reservation.release(cart_token)
+            
+            bump_data_version('orders')
             return order
         
         except Exception as e:
@@ -114,6 +280,84 @@ class Order:
             st.error(f"Erreur lors de la récupération des nouvelles commandes: {str(e)}")
             return []
     
+    @staticmethod
+    def get_new_orders_since(last_seen_id: int = 0, page_size: int = 100) -> List[Dict]:
+        """
+        Récupère les commandes non vues d'ID supérieur à last_seen_id (flux du dashboard)
+
+        Requête légère : sans order_items ni produits, seulement ce qu'affiche
+        une carte de nouvelle commande. Parcours par ID croissant, page par page
+        jusqu'à une page incomplète : aucune commande n'est sautée, quel que soit
+        le nombre d'arrivées entre deux vérifications.
+
+        Args:
+            last_seen_id: Plus grand ID déjà affiché (0 pour toutes)
+            page_size: Nombre de commandes par requête
+
+        Returns:
+            Liste des commandes, de la plus ancienne à la plus récente (les pages
+            déjà lues si une requête échoue)
+        """
+        orders = []
+        try:
+            supabase = get_supabase()
+            while True:
+                response = (supabase.table('orders')
+                            .select('id, created_at, total, clients(first_name, last_name)')
+                            .eq('viewed', False)
+                            .gt('id', last_seen_id)
+                            .order('id')
+                            .limit(page_size)
+                            .execute())
+                page = response.data or []
+                orders.extend(page)
+                if len(page) < page_size:
+                    return orders
+                last_seen_id = page[-1]['id']
+        except Exception as e:
+            st.error(f"Erreur lors du suivi des nouvelles commandes: {str(e)}")
+            return orders
+
+    @staticmethod
+    def get_latest_new_orders(limit: int = 20) -> List[Dict]:
+        """
+        Récupère les dernières commandes non vues (même projection que get_new_orders_since)
+
+        Args:
+            limit: Nombre maximal de commandes
+
+        Returns:
+            Liste des commandes, de la plus récente à la plus ancienne
+        """
+        try:
+            supabase = get_supabase()
+            response = (supabase.table('orders')
+                        .select('id, created_at, total, clients(first_name, last_name)')
+                        .eq('viewed', False)
+                        .order('id', desc=True)
+                        .limit(limit)
+                        .execute())
+            return response.data if response.data else []
+        except Exception as e:
+            st.error(f"Erreur lors de la récupération des nouvelles commandes: {str(e)}")
+            return []
+
+    @staticmethod
+    def count_new_orders() -> int:
+        """
+        Compte les commandes non vues (sans les transférer)
+
+        Returns:
+            Nombre de commandes non vues (0 en cas d'erreur)
+        """
+        try:
+            supabase = get_supabase()
+            response = supabase.table('orders').select('id', count='exact', head=True).eq('viewed', False).execute()
+            return response.count or 0
+        except Exception as e:
+            st.error(f"Erreur lors du comptage des nouvelles commandes: {str(e)}")
+            return 0
+
     @staticmethod
     def get_orders_last_24h() -> List[Dict]:
         """
@@ -136,6 +380,8 @@ class Order:
         """
         Met à jour le statut d'une commande
         
+        Une annulation remet les articles en stock (voir bulk_update_status).
+        
         Args:
             order_id: ID de la commande
             new_status: Nouveau statut (en_cours, livree, annulee)
@@ -143,13 +389,7 @@ class Order:
         Returns:
             True si succès, False sinon
         """
-        try:
-            supabase = get_supabase()
-            supabase.table('orders').update({'status': new_status}).eq('id', order_id).execute()
-            return True
-        except Exception as e:
-            st.error(f"Erreur lors de la mise à jour du statut: {str(e)}")
-            return False
+        return Order.bulk_update_status([order_id], new_status) > 0
     
     @staticmethod
     def mark_as_viewed(order_id: int) -> bool:
@@ -165,11 +405,115 @@ class Order:
         try:
             supabase = get_supabase()
             supabase.table('orders').update({'viewed': True}).eq('id', order_id).execute()
+            bump_data_version('orders')
             return True
         except Exception as e:
             st.error(f"Erreur lors du marquage de la commande: {str(e)}")
             return False
     
+    @staticmethod
+    def bulk_update_status(order_ids: List[int], new_status: str) -> int:
+        """
+        Met à jour le statut de plusieurs commandes en une seule requête
+
+        Via la RPC set_order_status, les mouvements de stock sont journalisés
+        dans la même transaction : passer à 'annulee' remet les articles en
+        stock, quitter 'annulee' les sort à nouveau.
+
+        Args:
+            order_ids: IDs des commandes
+            new_status: Nouveau statut (en_cours, livree, annulee)
+
+        Returns:
+            Nombre de commandes mises à jour (0 en cas d'erreur)
+        """
+        if not order_ids:
+            return 0
+
+        if Order._ledger_rpc_available:
+            try:
+                supabase = get_supabase()
+                response = supabase.rpc('set_order_status', {
+                    'p_order_ids': [int(i) for i in order_ids],
+                    'p_status': new_status
+                }).execute()
+                bump_data_version('orders', 'products')
+                return len(response.data or [])
+            except Exception as e:
+                if not Order._ledger_rpc_missing(e):
+                    st.error(f"Erreur lors de la mise à jour des statuts: {str(e)}")
+                    return 0
+
+        try:
+            supabase = get_supabase()
+            
+            # Sans RPC : mouvements de stock appliqués un par un
+            previous = (supabase.table('orders')
+                        .select('id, status, order_items(product_id, quantity)')
+                        .in_('id', list(order_ids))
+                        .execute()).data or []
+            
+            # Comme la RPC : aucune commande rétablie si le stock ne couvre pas ses articles
+            needed = {}
+            for order in previous:
+                if order['status'] == 'annulee' and new_status != 'annulee':
+                    for item in order.get('order_items') or []:
+                        needed[item['product_id']] = needed.get(item['product_id'], 0) + item['quantity']
+            if needed:
+                stock = Product.get_stock_levels(list(needed))
+                short = [pid for pid, quantity in needed.items() if stock.get(pid, 0) < quantity]
+                if short:
+                    st.error(f"Stock insuffisant pour rétablir les commandes (produits {', '.join(map(str, short))})")
+                    return 0
+            
+            response = supabase.table('orders').update({'status': new_status}).in_('id', list(order_ids)).execute()
+            
+            for order in previous:
+                cancelled = new_status == 'annulee' and order['status'] != 'annulee'
+                restored = order['status'] == 'annulee' and new_status != 'annulee'
+                if cancelled or restored:
+                    for item in order.get('order_items') or []:
+                        delta = item['quantity'] if cancelled else -item['quantity']
+                        Product.update_stock(item['product_id'], delta)
+            
+            bump_data_version('orders', 'products')
+            return len(response.data or [])
+        except Exception as e:
+            st.error(f"Erreur lors de la mise à jour des statuts: {str(e)}")
+            return 0
+
+    @staticmethod
+    def mark_all_viewed(order_ids: List[int] = None, before: str = None, up_to_id: int = None) -> int:
+        """
+        Marque plusieurs commandes comme vues en une seule requête
+
+        Args:
+            order_ids: IDs des commandes
+            before: Ou bien toutes les commandes non vues créées jusqu'à cette date (ISO)
+            up_to_id: Ou bien toutes les commandes non vues d'ID inférieur ou égal
+
+        Returns:
+            Nombre de commandes marquées (0 en cas d'erreur)
+        """
+        if not order_ids and not before and not up_to_id:
+            return 0
+
+        try:
+            supabase = get_supabase()
+            query = supabase.table('orders').update({'viewed': True}).eq('viewed', False)
+            if order_ids:
+                query = query.in_('id', list(order_ids))
+            if before:
+                query = query.lte('created_at', before)
+            if up_to_id:
+                query = query.lte('id', up_to_id)
+            response = query.execute()
+            bump_data_version('orders')
+            return len(response.data or [])
+        except Exception as e:
+            st.error(f"Erreur lors du marquage des commandes: {str(e)}")
+            return 0
+
     @staticmethod
     def get_orders_by_period(days: int) -> List[Dict]:
         """
@@ -254,31 +598,44 @@ class Order:
             if not response.data:
                 return []
             
-            # Agréger les quantités par produit
-            product_sales = {}
-            for item in response.data:
-                product_id = item['product_id']
-                product_name = item['products']['name'] if item.get('products') else f"Produit {product_id}"
-                quantity = item['quantity']
-                
-                if product_id not in product_sales:
-                    product_sales[product_id] = {
-                        'product_id': product_id,
-                        'product_name': product_name,
-                        'total_quantity': 0
-                    }
-                
-                product_sales[product_id]['total_quantity'] += quantity
-            
-            # Trier par quantité décroissante
-            sorted_products = sorted(product_sales.values(), key=lambda x: x['total_quantity'], reverse=True)
-            
-            return sorted_products[:limit]
+            return Order.aggregate_product_sales(response.data, limit)
         
         except Exception as e:
             st.error(f"Erreur lors de la récupération des top produits: {str(e)}")
             return []
     
+    @staticmethod
+    def aggregate_product_sales(items: List[Dict], limit: int = 10) -> List[Dict]:
+        """
+        Agrège les lignes de commande par produit
+        
+        Args:
+            items: Lignes `order_items` (product_id, quantity, products(name))
+            limit: Nombre de produits à retourner
+        
+        Returns:
+            Liste des produits triés par quantité vendue décroissante
+        """
+        product_sales = {}
+        for item in items:
+            product_id = item['product_id']
+            product_name = item['products']['name'] if item.get('products') else f"Produit {product_id}"
+            quantity = item['quantity']
+            
+            if product_id not in product_sales:
+                product_sales[product_id] = {
+                    'product_id': product_id,
+                    'product_name': product_name,
+                    'total_quantity': 0
+                }
+            
+            product_sales[product_id]['total_quantity'] += quantity
+        
+        # Trier par quantité décroissante
+        sorted_products = sorted(product_sales.values(), key=lambda x: x['total_quantity'], reverse=True)
+        
+        return sorted_products[:limit]
+    
     @staticmethod
     def validate_cart_stock(cart_items: Dict) -> Dict[str, bool]:
         """
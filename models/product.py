@@ -2,43 +2,148 @@
 Modèle Product avec méthodes CRUD
 """
 
-from typing import List, Dict, Optional
+import os
+from typing import Iterator, List, Dict, Optional, Tuple
 from config.supabase_client import get_supabase
+from utils.cache import bump_data_version, get_data_version
 import streamlit as st
 
+# Recherche plein texte : 'rpc' (search_products, voir supabase/migrations) ou 'local' (index en mémoire)
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'rpc')
+
+# Taille des pages du chargement complet du catalogue (au plus max-rows de PostgREST, 1000 par défaut)
+CATALOG_FETCH_SIZE = int(os.getenv('CATALOG_FETCH_SIZE', '1000'))
+
 class Product:
     """Classe pour gérer les produits"""
     
+    # Passe à False (pour le processus) si la RPC search_products n'est pas déployée
+    _rpc_search_available = SEARCH_BACKEND == 'rpc'
+    
+    @staticmethod
+    def _apply_filters(query, filter_type: str = "Tous"):
+        """Applique le filtre de type commun à get_all et count"""
+        if filter_type != "Tous":
+            query = query.eq('type', filter_type)
+        return query
+    
+    @staticmethod
+    def search(search: str, filter_type: str = "Tous", page: int = None, page_size: int = None,
+               count_only: bool = False) -> Tuple[List[Dict], int]:
+        """
+        Recherche plein texte classée par pertinence
+        
+        Utilise la RPC search_products (tsvector français sans accents, index GIN,
+        ts_rank) ; si elle n'est pas disponible, l'index inversé local du catalogue.
+        
+        Args:
+            search: Texte recherché (préfixes acceptés, accents ignorés)
+            filter_type: Filtre par type (Homme/Femme/Mixte/Tous)
+            page: Numéro de page (à partir de 0) ; None pour tous les résultats
+            page_size: Nombre de produits par page
+            count_only: Ne retourne que le nombre de résultats
+        
+        Returns:
+            (produits de la page, nombre total de résultats)
+        """
+        if Product._rpc_search_available:
+            try:
+                supabase = get_supabase()
+                params = {'search_query': search, 'filter_type': None if filter_type == "Tous" else filter_type}
+                
+                if count_only:
+                    response = supabase.rpc('search_products', params, count='exact', head=True).execute()
+                    return [], response.count or 0
+                
+                query = supabase.rpc('search_products', params, count='exact').select('*, product_images(*)')
+                if page is not None and page_size:
+                    start = page * page_size
+                    query = query.range(start, start + page_size - 1)
+                response = query.execute()
+                return response.data or [], response.count or 0
+            
+            except Exception as e:
+                print(f"⚠️ RPC search_products indisponible, recherche sur l'index local: {str(e)}")
+                # Fonction absente (migration non appliquée) : inutile de réessayer
+                if getattr(e, 'code', None) in ('PGRST202', '42883'):
+                    Product._rpc_search_available = False
+        
+        from models.catalog import get_catalog, get_search_index
+        
+        # Index et catalogue de la même version
+        version = get_data_version('products')
+        catalog = get_catalog(version)
+        results = [catalog.to_row(product_id) for product_id in get_search_index(version).search(search)]
+        if filter_type != "Tous":
+            results = [p for p in results if p['type'] == filter_type]
+        
+        total = len(results)
+        if page is not None and page_size:
+            results = results[page * page_size:(page + 1) * page_size]
+        return ([] if count_only else results), total
+
+    @staticmethod
+    def search_ids(search: str, version: str = None) -> List[int]:
+        """
+        IDs des produits correspondant à la recherche, du plus pertinent au moins pertinent
+
+        Variante légère de search (seulement les IDs, sans pagination) pour
+        combiner la recherche avec les facettes du catalogue en cache.
+
+        Args:
+            search: Texte recherché
+            version: Version du catalogue (celle des facettes ; courante par défaut)
+
+        Returns:
+            Liste des IDs classés
+        """
+        if Product._rpc_search_available:
+            try:
+                supabase = get_supabase()
+                response = supabase.rpc('search_products', {'search_query': search}).select('id').execute()
+                return [row['id'] for row in response.data or []]
+
+            except Exception as e:
+                print(f"⚠️ RPC search_products indisponible, recherche sur l'index local: {str(e)}")
+                if getattr(e, 'code', None) in ('PGRST202', '42883'):
+                    Product._rpc_search_available = False
+
+        from models.catalog import get_search_index
+        return get_search_index(version).search(search)
+
     @staticmethod
-    def get_all(search: str = "", filter_type: str = "Tous") -> List[Dict]:
+    def get_all(search: str = "", filter_type: str = "Tous", page: int = None, page_size: int = None) -> List[Dict]:
         """
-        Récupère tous les produits avec filtres optionnels
+        Récupère les produits avec filtres optionnels
+        
+        Avec un terme de recherche, les résultats sont classés par pertinence (voir search).
         
         Args:
             search: Terme de recherche
             filter_type: Filtre par type (Homme/Femme/Mixte/Tous)
+            page: Numéro de page (à partir de 0) ; None pour tout récupérer
+            page_size: Nombre de produits par page
         
         Returns:
-            Liste des produits
+            Liste des produits (de la page demandée)
         """
+        if search:
+            return Product.search(search, filter_type, page, page_size)[0]
+        
         try:
             supabase = get_supabase()
             
             # Requête de base
             query = supabase.table('products').select('*, product_images(*)')
+            query = Product._apply_filters(query, filter_type)
             
-            # Appliquer le filtre de type
-            if filter_type != "Tous":
-                query = query.eq('type', filter_type)
+            # Trier par nom (puis id pour une pagination stable)
+            query = query.order('name').order('id')
             
-            # Appliquer la recherche
-            if search:
-                # --- CORRECTION APPLIQUÉE ICI ---
-                # C'était .%search}%' au lieu de .%{search}%'
-                query = query.or_(f'name.ilike.%{search}%,description.ilike.%{search}%')
-            
-            # Trier par nom
-            query = query.order('name')
+            # Pagination côté serveur
+            if page is not None and page_size:
+                start = page * page_size
+                query = query.range(start, start + page_size - 1)
             
             response = query.execute()
             return response.data if response.data else []
@@ -47,6 +152,93 @@ class Product:
             st.error(f"Erreur lors de la récupération des produits: {str(e)}")
             return []
     
+    @staticmethod
+    def iter_all(page_size: int = CATALOG_FETCH_SIZE) -> Iterator[Dict]:
+        """
+        Parcourt tout le catalogue (trié par nom), page par page
+        
+        PostgREST tronque une réponse à max-rows lignes : les pages sont
+        demandées jusqu'à une page incomplète. Les erreurs sont levées et non
+        signalées : le catalogue en cache (models/catalog.py) ne doit pas être
+        construit sur un résultat vide.
+        
+        Args:
+            page_size: Nombre de produits par requête
+        
+        Yields:
+            Produits avec leurs images
+        """
+        supabase = get_supabase()
+        start = 0
+        while True:
+            response = (supabase.table('products')
+                        .select('*, product_images(*)')
+                        .order('name').order('id')
+                        .range(start, start + page_size - 1)
+                        .execute())
+            rows = response.data or []
+            yield from rows
+            if len(rows) < page_size:
+                return
+            start += page_size
+    
+    @staticmethod
+    def get_names(page_size: int = CATALOG_FETCH_SIZE) -> List[Dict]:
+        """
+        ID, nom et type de tous les produits (sélecteurs), triés par nom
+        
+        Requête projetée, page par page (max-rows de PostgREST) : ni
+        description ni images.
+        
+        Args:
+            page_size: Nombre de produits par requête
+        
+        Returns:
+            Liste de {id, name, type}
+        """
+        try:
+            supabase = get_supabase()
+            products = []
+            while True:
+                response = (supabase.table('products')
+                            .select('id, name, type')
+                            .order('name').order('id')
+                            .range(len(products), len(products) + page_size - 1)
+                            .execute())
+                page = response.data or []
+                products.extend(page)
+                if len(page) < page_size:
+                    return products
+        except Exception as e:
+            st.error(f"Erreur lors de la récupération des produits: {str(e)}")
+            return []
+    
+    @staticmethod
+    def count(search: str = "", filter_type: str = "Tous") -> int:
+        """
+        Compte les produits correspondant aux filtres (sans les transférer)
+        
+        Args:
+            search: Terme de recherche
+            filter_type: Filtre par type (Homme/Femme/Mixte/Tous)
+        
+        Returns:
+            Nombre de produits
+        """
+        if search:
+            return Product.search(search, filter_type, count_only=True)[1]
+        
+        try:
+            supabase = get_supabase()
+            query = supabase.table('products').select('id', count='exact', head=True)
+            query = Product._apply_filters(query, filter_type)
+            response = query.execute()
+            return response.count or 0
+        
+        except Exception as e:
+            st.error(f"Erreur lors du comptage des produits: {str(e)}")
+            return 0
+    
     @staticmethod
     def get_by_id(product_id: int) -> Optional[Dict]:
         """
@@ -98,6 +290,7 @@ class Product:
                         'url': url
                     }).execute()
             
+            bump_data_version('products')
             return product
         
         except Exception as e:
@@ -122,6 +315,7 @@ class Product:
             }
             
             supabase.table('products').update(update_data).eq('id', product_id).execute()
+            bump_data_version('products')
             return True
         
         except Exception as e:
@@ -141,12 +335,49 @@ class Product:
             
             # Supprimer le produit
             supabase.table('products').delete().eq('id', product_id).execute()
+            bump_data_version('products')
             return True
         
         except Exception as e:
             st.error(f"Erreur lors de la suppression du produit: {str(e)}")
             return False
     
+    @staticmethod
+    def get_price_stock(product_ids: List[int]) -> Optional[Dict[int, Dict]]:
+        """
+        Prix et stock courants de plusieurs produits en une requête projetée
+        
+        Args:
+            product_ids: IDs des produits
+        
+        Returns:
+            {product_id: {'price', 'stock'}} (produits supprimés absents),
+            ou None en cas d'erreur (à ne pas confondre avec des produits supprimés)
+        """
+        if not product_ids:
+            return {}
+        
+        try:
+            supabase = get_supabase()
+            response = supabase.table('products').select('id, price, stock').in_('id', list(product_ids)).execute()
+            return {row['id']: {'price': row['price'], 'stock': row['stock']} for row in response.data or []}
+        except Exception as e:
+            st.error(f"Erreur lors de la récupération des prix et stocks: {str(e)}")
+            return None
+    
+    @staticmethod
+    def get_stock_levels(product_ids: List[int]) -> Dict[int, int]:
+        """
+        Stock de plusieurs produits en une requête
+        
+        Args:
+            product_ids: IDs des produits
+        
+        Returns:
+            {product_id: stock}
+        """
+        return {pid: row['stock'] for pid, row in (Product.get_price_stock(product_ids) or {}).items()}
+    
     @staticmethod
     def update_stock(product_id: int, quantity_change: int) -> bool:
         """
@@ -168,6 +399,7 @@ class Product:
             
             # Mettre à jour le stock
             supabase.table('products').update({'stock': new_stock}).eq('id', product_id).execute()
+            bump_data_version('products')
             return True
         
         except Exception as e:
@@ -185,6 +417,7 @@ class Product:
                 'product_id': product_id,
                 'url': image_url
             }).execute()
+            bump_data_version('products')
             return True
         except Exception as e:
             st.error(f"Erreur lors de l'ajout de l'image: {str(e)}")
@@ -199,6 +432,7 @@ class Product:
         try:
             supabase = get_supabase()
             supabase.table('product_images').delete().eq('id', image_id).execute()
+            bump_data_version('products')
             return True
         except Exception as e:
             st.error(f"Erreur lors de la suppression de l'image: {str(e)}")
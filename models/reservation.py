@@ -0,0 +1,231 @@
+"""
+Modèle Reservation : réservation temporaire du stock pendant le checkout
+
+À l'ouverture du checkout, les quantités du panier sont réservées pour une
+courte durée ; pendant ce temps les autres clients voient stock - réservations
+actives, et la commande consomme la réservation.
+
+La durée est fixée côté serveur : 10 minutes dans reserve_cart (rpc), ou
+RESERVATION_TTL secondes, bornée à RESERVATION_TTL_MAX, pour le registre local.
+Une réservation porte sur au plus RESERVATION_MAX_QUANTITY unités par produit ;
+reserve_cart limite aussi les nouveaux paniers et la durée de renouvellement.
+
+Backends (RESERVATION_BACKEND) :
+    rpc    Table stock_reservations et RPC reserve_cart / release_cart /
+           active_reservations
+           (supabase/migrations/20261019120000_stock_reservations.sql)
+    local  Registre en mémoire du processus, purgé à chaque accès (une seule
+           réplique, ou migration non appliquée)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from config.supabase_client import get_supabase
+from models.product import Product
+from utils.cart_store import cart_token_digest
+
+RESERVATION_BACKEND = os.getenv('RESERVATION_BACKEND', 'rpc')
+RESERVATION_TTL_MAX = 900
+RESERVATION_TTL = min(max(int(os.getenv('RESERVATION_TTL', '600')), 1), RESERVATION_TTL_MAX)
+
+# Unités réservées au plus par produit et par panier (comme dans reserve_cart)
+RESERVATION_MAX_QUANTITY = 10
+
+# Durée (secondes) pendant laquelle les réservations actives lues par RPC sont réutilisées
+RESERVATION_CACHE_TTL = int(os.getenv('RESERVATION_CACHE_TTL', '15'))
+
+Hold = Tuple[int, str, int]
+
+
+class LocalReservationStore:
+    """Réservations en mémoire : {product_id: {cart_token: (quantité, expiration)}}"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holds: Dict[int, Dict[str, tuple]] = {}
+
+    def _sweep(self, now: float):
+        for product_id in list(self._holds):
+            holds = {t: h for t, h in self._holds[product_id].items() if h[1] > now}
+            if holds:
+                self._holds[product_id] = holds
+            else:
+                del self._holds[product_id]
+
+    def reserved(self, product_id: int, except_token: str = None) -> int:
+        """Quantité réservée par les autres paniers (appelant détenant le verrou)"""
+        return sum(q for t, (q, _) in self._holds.get(product_id, {}).items() if t != except_token)
+
+    def reserve(self, cart_token: str, quantities: Dict[int, int], stock: Dict[int, int], ttl: int) -> Dict[int, Dict]:
+        with self._lock:
+            now = time.time()
+            self._sweep(now)
+            self._release(cart_token)
+            expires_at = now + ttl
+
+            results = {}
+            for product_id, quantity in sorted(quantities.items()):
+                available = max(stock.get(product_id, 0) - self.reserved(product_id, cart_token), 0)
+                reserved = available >= quantity
+                if reserved:
+                    held = min(quantity, RESERVATION_MAX_QUANTITY)
+                    self._holds.setdefault(product_id, {})[cart_token] = (held, expires_at)
+                results[product_id] = {'available': available, 'reserved': reserved, 'expires_at': expires_at}
+            return results
+
+    def _release(self, cart_token: str):
+        for holds in self._holds.values():
+            holds.pop(cart_token, None)
+
+    def release(self, cart_token: str):
+        with self._lock:
+            self._release(cart_token)
+
+    def holds(self) -> List[Hold]:
+        """Réservations actives : [(product_id, empreinte du panier, quantité)]"""
+        with self._lock:
+            self._sweep(time.time())
+            return [(pid, cart_token_digest(t), q) for pid, holds in self._holds.items() for t, (q, _) in holds.items()]
+
+
+@st.cache_resource(show_spinner=False)
+def _local_store() -> LocalReservationStore:
+    return LocalReservationStore()
+
+
+@st.cache_data(ttl=RESERVATION_CACHE_TTL, show_spinner=False)
+def _fetch_active_reservations() -> List[Hold]:
+    # Une erreur est levée (et non mise en cache) : Reservation.get_reserved_quantities la traite
+    response = get_supabase().rpc('active_reservations', {}).execute()
+    return [(row['product_id'], row['holder'], row['quantity']) for row in response.data or []]
+
+
+class Reservation:
+    """Classe pour réserver le stock d'un panier"""
+
+    # Passe à False (pour le processus) si les RPC de réservation ne sont pas déployées
+    _rpc_available = RESERVATION_BACKEND == 'rpc'
+
+    @staticmethod
+    def _rpc_missing(e: Exception) -> bool:
+        if getattr(e, 'code', None) in ('PGRST202', '42883', 'PGRST205', '42P01'):
+            Reservation._rpc_available = False
+            print(f"⚠️ RPC de réservation indisponibles, registre local: {str(e)}")
+            return True
+        return False
+
+    @staticmethod
+    def reserve(cart_token: str, cart_items: Dict) -> Optional[Dict[str, Dict]]:
+        """
+        Réserve les quantités du panier (remplace la réservation précédente du panier)
+
+        Args:
+            cart_token: Identifiant du panier
+            cart_items: Items du panier {product_id: {quantity, ...}}
+
+        Returns:
+            {product_id: {available, reserved, expires_at (timestamp)}}, ou None en cas d'erreur
+        """
+        quantities = {int(pid): item['quantity'] for pid, item in cart_items.items()}
+
+        if Reservation._rpc_available:
+            try:
+                supabase = get_supabase()
+                response = supabase.rpc('reserve_cart', {
+                    'p_cart_token': cart_token,
+                    'p_items': [{'product_id': pid, 'quantity': q} for pid, q in quantities.items()]
+                }).execute()
+                # Expiration décidée par le serveur
+                return {
+                    str(row['product_id']): {
+                        'available': row['available'],
+                        'reserved': row['reserved'],
+                        'expires_at': datetime.fromisoformat(row['expires_at']).timestamp()
+                    }
+                    for row in response.data or []
+                }
+            except Exception as e:
+                if getattr(e, 'hint', None) == 'reservation_limited':
+                    # Limite anti-abus : le checkout continue sans réservation
+                    print(f"⚠️ Réservation refusée: {str(e)}")
+                    return None
+                if not Reservation._rpc_missing(e):
+                    st.error(f"Erreur lors de la réservation du panier: {str(e)}")
+                    return None
+
+        stock = Product.get_stock_levels(list(quantities))
+        results = _local_store().reserve(cart_token, quantities, stock, RESERVATION_TTL)
+        return {str(pid): result for pid, result in results.items()}
+
+    @staticmethod
+    def release(cart_token: str):
+        """
+        Libère les réservations d'un panier (commande passée ou panier vidé)
+
+        Args:
+            cart_token: Identifiant du panier
+        """
+        if Reservation._rpc_available:
+            try:
+                get_supabase().rpc('release_cart', {'p_cart_token': cart_token}).execute()
+                return
+            except Exception as e:
+                if not Reservation._rpc_missing(e):
+                    print(f"⚠️ Erreur lors de la libération des réservations: {str(e)}")
+                    return
+
+        _local_store().release(cart_token)
+
+    @staticmethod
+    def get_reserved_quantities(cart_token: str = None) -> Dict[int, int]:
+        """
+        Quantités réservées par les autres paniers
+
+        Les réservations actives sont lues en une RPC, réutilisée
+        RESERVATION_CACHE_TTL secondes par tout le processus : la vitrine
+        n'ajoute pas de requête par rerun. place_order revérifie le stock.
+
+        Args:
+            cart_token: Panier dont les propres réservations ne comptent pas
+
+        Returns:
+            {product_id: quantité réservée}, produits réservés seulement
+        """
+        holds = None
+        if Reservation._rpc_available:
+            try:
+                holds = _fetch_active_reservations()
+            except Exception as e:
+                if not Reservation._rpc_missing(e):
+                    print(f"⚠️ Erreur lors de la lecture des réservations: {str(e)}")
+                    return {}
+        if holds is None:
+            holds = _local_store().holds()
+
+        own = cart_token_digest(cart_token) if cart_token else None
+        reserved = {}
+        for product_id, holder, quantity in holds:
+            if holder != own:
+                reserved[product_id] = reserved.get(product_id, 0) + quantity
+        return reserved
+
+    @staticmethod
+    def get_available_stock(stock: Dict[int, int], cart_token: str = None) -> Dict[int, int]:
+        """
+        Stock disponible pour un panier : stock - réservations des autres paniers
+
+        Args:
+            stock: {product_id: stock}
+            cart_token: Panier dont les propres réservations ne comptent pas
+
+        Returns:
+            {product_id: disponible}
+        """
+        reserved = Reservation.get_reserved_quantities(cart_token)
+        return {pid: max(s - reserved.get(pid, 0), 0) for pid, s in stock.items()}
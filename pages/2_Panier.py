@@ -9,9 +9,12 @@ load_dotenv() # <-- AJOUTER
 from config.supabase_client import init_supabase
 from utils.session import (init_session_state, get_cart_total, get_cart_count, 
                            update_cart_quantity, remove_from_cart, display_flash_message,
-                           set_flash_message)
+                           set_flash_message, get_cart_token, clear_cart, refresh_cart,
+                           get_cart_resume_link)
 from utils.formatters import format_price
-from utils.styling import load_custom_styling, build_header
+from models.reservation import Reservation
+from utils.events import track_event, track_visit
+from utils.styling import load_custom_styling, build_header, render_cart_badge
 
 # Configuration
 st.set_page_config(
@@ -21,52 +24,55 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Initialisation
-init_supabase()
-init_session_state()
+def _queue_toast(message: str, icon: str):
+    """Mémorise un toast à afficher au prochain rendu (pas d'éléments dans un callback de fragment)"""
+    st.session_state['cart_toast'] = (message, icon)
 
-# Charger le style et construire le header
-load_custom_styling()
-build_header()
+def _show_pending_toast():
+    """Affiche le toast mémorisé par un callback"""
+    if st.session_state.get('cart_toast'):
+        message, icon = st.session_state.pop('cart_toast')
+        st.toast(message, icon=icon)
 
-# Titre
-st.markdown("""
-<h1 style="
-    text-align: center;
-    color: #D4AF37 !important;
-    font-family: 'Playfair Display', serif !important;
-    margin-bottom: 2rem;
-">🛒 Mon Panier</h1>
-""", unsafe_allow_html=True)
+def _on_quantity_change(product_id: str):
+    """Callback : applique la nouvelle quantité avant le rerun du fragment"""
+    item = st.session_state.cart.get(product_id)
+    new_quantity = st.session_state[f"qty_{product_id}"]
+    if item is None or new_quantity == item['quantity']:
+        return
+    
+    if new_quantity == 0:
+        remove_from_cart(product_id)
+        track_event('remove_from_cart', product_id, item['quantity'])
+        _queue_toast(f"{item['name']} retiré du panier", "🗑️")
+    elif update_cart_quantity(product_id, new_quantity):
+        track_event('update_quantity', product_id, new_quantity)
+    else:
+        _queue_toast("Stock insuffisant", "❌")
 
-# Afficher les messages flash
-display_flash_message()
+def _on_remove(product_id: str):
+    """Callback : retire l'article avant le rerun du fragment"""
+    item = st.session_state.cart.get(product_id)
+    if item:
+        remove_from_cart(product_id)
+        track_event('remove_from_cart', product_id, item['quantity'])
+        _queue_toast(f"{item['name']} retiré du panier", "🗑️")
 
-# Vérifier si le panier est vide
-if not st.session_state.cart or len(st.session_state.cart) == 0:
-    st.markdown("""
-    <div style="
-        background: rgba(20, 20, 20, 0.9);
-        border: 1px solid rgba(212, 175, 55, 0.4);
-        border-radius: 20px;
-        padding: 3rem;
-        text-align: center;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.4);
-        margin: 2rem 0;
-    ">
-        <div style="font-size: 5rem; margin-bottom: 1rem;">🛒</div>
-        <h2 style="color: #D4AF37 !important; margin-bottom: 1rem;">Votre panier est vide</h2>
-        <p style="color: #E5E5E5 !important; font-size: 1.1rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
-            Découvrez notre collection exclusive de parfums & essences d'exception
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+@st.fragment
+def cart_lines(cart_badge):
+    """
+    Lignes du panier et récapitulatif
+
+    Fragment : un changement de quantité ne réexécute que ces lignes et le
+    compteur du header, pas le style ni le reste de la page.
+    """
+    # Panier vidé depuis le fragment : la page entière affiche l'état vide
+    if not st.session_state.cart:
+        st.rerun()
+    
+    render_cart_badge(cart_badge)
+    _show_pending_toast()
     
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        if st.button("🌸 Découvrir nos senteurs", use_container_width=True, type="primary"):
-            st.switch_page("app.py")
-else:
     # Afficher les articles du panier
     st.markdown(f"""
     <div style="
@@ -99,27 +105,17 @@ else:
             st.caption(f"Prix unitaire: {format_price(item['price'])} FCFA")
         
         with col3:
-            # Quantité
-            new_quantity = st.number_input(
+            # Quantité (mise à jour par callback : seul ce fragment est réexécuté)
+            st.number_input(
                 "Quantité",
                 min_value=0,
                 max_value=item['stock'],
                 value=item['quantity'],
                 key=f"qty_{product_id}",
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                on_change=_on_quantity_change,
+                args=(product_id,)
             )
-            
-            # Mettre à jour si changement
-            if new_quantity != item['quantity']:
-                if new_quantity == 0:
-                    remove_from_cart(product_id)
-                    set_flash_message(f"🗑️ {item['name']} retiré du panier", "info")
-                    st.rerun()
-                else:
-                    if update_cart_quantity(product_id, new_quantity):
-                        st.rerun()
-                    else:
-                        st.error("Stock insuffisant")
         
         with col4:
             # Sous-total
@@ -131,10 +127,8 @@ else:
         
         with col5:
             # Bouton supprimer
-            if st.button("🗑️", key=f"remove_{product_id}", help="Retirer du panier"):
-                remove_from_cart(product_id)
-                set_flash_message(f"🗑️ {item['name']} retiré du panier", "info")
-                st.rerun()
+            st.button("🗑️", key=f"remove_{product_id}", help="Retirer du panier",
+                      on_click=_on_remove, args=(product_id,))
         
         st.divider()
     
@@ -184,9 +178,72 @@ else:
             st.switch_page("app.py")
         
         if st.button("🗑️ Vider le panier", use_container_width=True):
-            st.session_state.cart = {}
+            clear_cart()
+            # Libérer le stock réservé par un checkout commencé
+            if st.session_state.pop('reservation', None):
+                Reservation.release(get_cart_token())
             set_flash_message("🗑️ Panier vidé", "info")
             st.rerun()
+        
+        # Le jeton du panier n'est pas dans l'URL : lien personnel pour le retrouver
+        st.caption(f"🔗 [Lien pour retrouver ce panier]({get_cart_resume_link()}) — personnel, ne le partagez pas")
+
+
+# Initialisation
+init_supabase()
+init_session_state()
+track_visit("panier")
+
+# Charger le style et construire le header
+load_custom_styling()
+cart_badge = build_header()
+
+# Titre
+st.markdown("""
+<h1 style="
+    text-align: center;
+    color: #D4AF37 !important;
+    font-family: 'Playfair Display', serif !important;
+    margin-bottom: 2rem;
+">🛒 Mon Panier</h1>
+""", unsafe_allow_html=True)
+
+# Afficher les messages flash
+display_flash_message()
+_show_pending_toast()
+
+# Prix et stocks à jour pour toutes les lignes (une requête, mémorisée)
+cart_changes = refresh_cart()
+if cart_changes:
+    st.warning("ℹ️ Votre panier a été mis à jour :\n\n" + "\n".join(f"- {change}" for change in cart_changes))
+
+# Vérifier si le panier est vide
+if not st.session_state.cart or len(st.session_state.cart) == 0:
+    st.markdown("""
+    <div style="
+        background: rgba(20, 20, 20, 0.9);
+        border: 1px solid rgba(212, 175, 55, 0.4);
+        border-radius: 20px;
+        padding: 3rem;
+        text-align: center;
+        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.4);
+        margin: 2rem 0;
+    ">
+        <div style="font-size: 5rem; margin-bottom: 1rem;">🛒</div>
+        <h2 style="color: #D4AF37 !important; margin-bottom: 1rem;">Votre panier est vide</h2>
+        <p style="color: #E5E5E5 !important; font-size: 1.1rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
+            Découvrez notre collection exclusive de parfums & essences d'exception
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if st.button("🌸 Découvrir nos senteurs", use_container_width=True, type="primary"):
+            st.switch_page("app.py")
+else:
+    track_event('view_cart', value=get_cart_count())
+    cart_lines(cart_badge)
 
 # Footer informatif
 st.divider()
@@ -3,15 +3,20 @@ Page Checkout - Validation et finalisation de la commande
 Sensations by Arda J - Parfums & Essences - Gabon
 """
 
+import time
+from datetime import datetime
+from typing import Dict, Optional
 import streamlit as st
 from dotenv import load_dotenv # <-- AJOUTER
 load_dotenv() # <-- AJOUTER
 from config.supabase_client import init_supabase
 from models.order import Order
-from models.client import Client
-from utils.session import (init_session_state, get_cart_total, clear_cart, 
+from models.reservation import Reservation
+from utils.events import track_event, track_visit
+from utils.session import (init_session_state, get_cart_total, clear_cart, get_cart_token,
+                           get_checkout_key, rotate_checkout_key, refresh_cart, get_cart,
                            set_flash_message, display_flash_message)
-from utils.validators import validate_checkout_form
+from utils.validators import validate_checkout_form, check_email_deliverability_async
 from utils.formatters import format_price
 from config.email_config import send_admin_notification
 from utils.styling import load_custom_styling, build_header
@@ -24,9 +29,48 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# Une réservation est renouvelée si elle expire dans moins de ce délai (secondes)
+RESERVATION_RENEW_MARGIN = 30
+
+def reserve_cart() -> Optional[Dict]:
+    """
+    Réserve le stock du panier à l'ouverture du checkout
+    
+    Une seule requête par panier : la réservation n'est refaite que si le
+    panier a changé ou si elle arrive à expiration.
+    
+    Returns:
+        {'signature', 'results': {product_id: {available, reserved}}, 'expires_at'}, ou None en cas d'erreur
+    """
+    signature = get_cart().version
+    current = st.session_state.get('reservation')
+    
+    if (current is None or current['signature'] != signature
+            or current['expires_at'] - time.time() < RESERVATION_RENEW_MARGIN):
+        results = Reservation.reserve(get_cart_token(), st.session_state.cart)
+        if results is None:
+            return None
+        current = {
+            'signature': signature,
+            'results': results,
+            'expires_at': min((r['expires_at'] for r in results.values()), default=time.time())
+        }
+        st.session_state['reservation'] = current
+    
+    return current
+
+def unavailable_items(reservation: Dict) -> Dict[str, int]:
+    """Articles du panier non réservés : {product_id: quantité disponible}"""
+    return {
+        pid: result['available']
+        for pid, result in reservation['results'].items()
+        if not result['reserved']
+    }
+
 # Initialisation
 init_supabase()
 init_session_state()
+track_visit("checkout")
 
 # Charger le style et construire le header
 load_custom_styling()
@@ -45,6 +89,11 @@ st.markdown("""
 # Afficher les messages flash
 display_flash_message()
 
+# Commander aux prix et stocks courants (réutilise le rafraîchissement du panier s'il est récent)
+cart_changes = refresh_cart()
+if cart_changes:
+    st.warning("ℹ️ Votre panier a été mis à jour :\n\n" + "\n".join(f"- {change}" for change in cart_changes))
+
 # Vérifier si le panier est vide
 if not st.session_state.cart or len(st.session_state.cart) == 0:
     st.markdown("""
@@ -68,6 +117,23 @@ if not st.session_state.cart or len(st.session_state.cart) == 0:
         st.switch_page("app.py")
     st.stop()
 
+track_event('begin_checkout', value=get_cart_total())
+
+# Réserver le stock du panier le temps du checkout
+reservation = reserve_cart()
+if reservation:
+    missing = unavailable_items(reservation)
+    if missing:
+        st.warning("⚠️ Certaines senteurs ne sont plus disponibles en quantité suffisante :\n\n" + "\n".join(
+            f"- **{st.session_state.cart[pid]['name']}** : {available} disponible(s)"
+            for pid, available in missing.items() if pid in st.session_state.cart
+        ))
+        if st.button("🛒 Modifier mon panier"):
+            st.switch_page("pages/2_Panier.py")
+    else:
+        expires = datetime.fromtimestamp(reservation['expires_at']).strftime('%H:%M')
+        st.info(f"🔒 Vos senteurs sont réservées jusqu'à {expires}")
+
 # Layout en deux colonnes
 col_form, col_recap = st.columns([2, 1])
 
@@ -114,6 +180,9 @@ with col_form:
     
     st.markdown("### 👤 Vos informations")
     
+    # Clé d'idempotence du formulaire : un double clic ne crée qu'une commande
+    checkout_key = get_checkout_key()
+    
     # Formulaire de commande
     with st.form("checkout_form", clear_on_submit=False):
         col1, col2 = st.columns(2)
@@ -141,108 +210,116 @@ with col_form:
         if submit:
             # Valider les CGV
             if not accept_terms:
+                track_event('checkout_error', fields=['cgv'])
                 st.error("❌ Vous devez accepter les conditions générales de vente")
             else:
                 # Valider le formulaire
                 validation = validate_checkout_form(first_name, last_name, email, phone, address)
                 
                 if not validation['is_valid']:
+                    track_event('checkout_error', fields=sorted(validation['errors']))
                     st.error("❌ Veuillez corriger les erreurs suivantes:")
                     for field, error in validation['errors'].items():
                         st.error(f"• {error}")
                 else:
-                    # Vérifier les stocks une dernière fois
-                    stock_check = Order.validate_cart_stock(st.session_state.cart)
+                    # Vérifier la réservation (renouvelée si expirée) ; sans réservation, les stocks
+                    reservation = reserve_cart()
+                    if reservation:
+                        stock_ok = not unavailable_items(reservation)
+                    else:
+                        stock_ok = all(Order.validate_cart_stock(st.session_state.cart).values())
                     
-                    if not all(stock_check.values()):
+                    if not stock_ok:
+                        track_event('stock_failure', value=len(st.session_state.cart))
                         st.error("❌ Certaines senteurs ne sont plus disponibles en quantité suffisante. Veuillez modifier votre panier.")
                     else:
-                        # Créer ou récupérer le client
-                        existing_client = Client.get_by_email(email)
+                        # Client (créé ou mis à jour sur l'email) et commande en un seul appel
+                        client_data = {
+                            'first_name': first_name,
+                            'last_name': last_name,
+                            'email': email,
+                            'phone': phone,
+                            'address': address
+                        }
                         
-                        if existing_client:
-                            client = existing_client
-                        else:
-                            client = Client.create(first_name, last_name, email, phone, address)
+                        order = Order.create(
+                            client_id=None,
+                            cart_items=st.session_state.cart,
+                            total=total,
+                            cart_token=get_cart_token(),
+                            idempotency_key=checkout_key,
+                            client_data=client_data
+                        )
                         
-                        if not client:
-                            st.error("❌ Erreur lors de la création du profil client")
+                        if not order:
+                            track_event('order_failure')
+                            st.error("❌ Erreur lors de la création de la commande")
                         else:
-                            # Créer la commande
-                            order = Order.create(
-                                client_id=client['id'],
-                                cart_items=st.session_state.cart,
-                                total=total
-                            )
+                            # Total calculé par le serveur aux prix courants (place_order)
+                            total = order.get('total') or total
+                            
+                            # Préparer les données pour l'email
+                            order_items = []
+                            for product_id, item in st.session_state.cart.items():
+                                order_items.append({
+                                    'product_name': item['name'],
+                                    'quantity': item['quantity'],
+                                    'price': item['price']
+                                })
                             
-                            if not order:
-                                st.error("❌ Erreur lors de la création de la commande")
-                            else:
-                                # Préparer les données pour l'email
-                                order_items = []
-                                for product_id, item in st.session_state.cart.items():
-                                    order_items.append({
-                                        'product_name': item['name'],
-                                        'quantity': item['quantity'],
-                                        'price': item['price']
-                                    })
-                                
-                                order_data = {
-                                    'id': order['id'],
-                                    'total': total,
-                                    'items': order_items
-                                }
-                                
-                                client_data = {
-                                    'first_name': first_name,
-                                    'last_name': last_name,
-                                    'email': email,
-                                    'phone': phone,
-                                    'address': address
-                                }
-                                
-                                # Envoyer les emails
+                            order_data = {
+                                'id': order['id'],
+                                'total': total,
+                                'items': order_items
+                            }
+                            
+                            # Envoyer les emails (pas pour une commande rejouée, déjà notifiée)
+                            if not order.get('replayed'):
+                                track_event('purchase', value=total, order_id=order['id'])
+                                check_email_deliverability_async(email)
                                 try:
                                     send_admin_notification(order_data, client_data)
                                 except Exception as e:
                                     # Ne pas bloquer la commande si l'email échoue
                                     print(f"Erreur envoi email: {str(e)}")
-                                
-                                # Vider le panier
-                                clear_cart()
-                                
-                                # Afficher le succès
-                                st.success("✅ Commande validée avec succès !")
-                                st.balloons()
-                                
-                                # Message de confirmation stylisé
-                                st.markdown(f"""
-                                <div style="
-                                    background: linear-gradient(135deg, rgba(16, 185, 129, 0.15) 0%, rgba(5, 150, 105, 0.15) 100%);
-                                    border: 1px solid rgba(16, 185, 129, 0.4);
-                                    border-radius: 15px;
-                                    padding: 2rem;
-                                    margin: 2rem 0;
-                                    text-align: center;
-                                ">
-                                    <div style="font-size: 4rem; margin-bottom: 1rem;">🎉</div>
-                                    <h2 style="color: #10B981 !important; margin-bottom: 1rem;">Merci pour votre commande !</h2>
-                                    <p style="color: #E5E5E5 !important; font-size: 1.1rem; margin-bottom: 1rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
-                                        <strong>Numéro de commande:</strong> <span style="color: #D4AF37;">#{order['id']}</span>
-                                    </p>
-                                    <p style="color: #E5E5E5 !important; font-size: 1.3rem; font-weight: 700; margin-bottom: 1rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
-                                        <strong>Montant total:</strong> <span style="color: #D4AF37;">{format_price(total)} FCFA</span>
-                                    </p>
-                                    <p style="color: #CCCCCC !important; margin-top: 1rem; font-size: 0.95rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
-                                        Nous préparons votre commande de parfums & essences avec soin.<br>
-                                        Vous serez tenu informé de son expédition.
-                                    </p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                                
-                                if st.button("🏠 Retour à l'accueil", use_container_width=True):
-                                    st.switch_page("app.py")
-    
+                            
+                            # Vider le panier (réservations consommées par la commande)
+                            clear_cart()
+                            st.session_state.pop('reservation', None)
+                            rotate_checkout_key()
+                            
+                            # Afficher le succès
+                            st.success("✅ Commande validée avec succès !")
+                            st.balloons()
+                            
+                            # Message de confirmation stylisé
+                            st.markdown(f"""
+                            <div style="
+                                background: linear-gradient(135deg, rgba(16, 185, 129, 0.15) 0%, rgba(5, 150, 105, 0.15) 100%);
+                                border: 1px solid rgba(16, 185, 129, 0.4);
+                                border-radius: 15px;
+                                padding: 2rem;
+                                margin: 2rem 0;
+                                text-align: center;
+                            ">
+                                <div style="font-size: 4rem; margin-bottom: 1rem;">🎉</div>
+                                <h2 style="color: #10B981 !important; margin-bottom: 1rem;">Merci pour votre commande !</h2>
+                                <p style="color: #E5E5E5 !important; font-size: 1.1rem; margin-bottom: 1rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
+                                    <strong>Numéro de commande:</strong> <span style="color: #D4AF37;">#{order['id']}</span>
+                                </p>
+                                <p style="color: #E5E5E5 !important; font-size: 1.3rem; font-weight: 700; margin-bottom: 1rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
+                                    <strong>Montant total:</strong> <span style="color: #D4AF37;">{format_price(total)} FCFA</span>
+                                </p>
+                                <p style="color: #CCCCCC !important; margin-top: 1rem; font-size: 0.95rem; text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.9);">
+                                    Nous préparons votre commande de parfums & essences avec soin.<br>
+                                    Vous serez tenu informé de son expédition.
+                                </p>
+                            </div>
+                            """, unsafe_allow_html=True)
+                            
+                            if st.button("🏠 Retour à l'accueil", use_container_width=True):
+                                st.switch_page("app.py")
+
     st.markdown("</div>", unsafe_allow_html=True)
 
 # Informations supplémentaires
@@ -2,6 +2,12 @@
 Page Dashboard Admin - Vue d'ensemble
 """
 
+import base64
+import io
+import math
+import os
+import struct
+import wave
 import streamlit as st
 from typing import Dict
 # --- MODIFIÉ ---
@@ -12,10 +18,115 @@ from models.product import Product
 from utils.session import init_session_state, require_auth, display_flash_message
 # --- FIN MODIFIÉ ---
 from utils.formatters import format_price, format_date, format_relative_time
+from utils.profiler import start_profiling
 
 # Configuration
 st.set_page_config(page_title="Dashboard Admin - Sensations Arda", page_icon="📊", layout="wide")
 
+# Intervalle (secondes) de vérification des nouvelles commandes
+NEW_ORDERS_REFRESH = int(os.getenv('NEW_ORDERS_REFRESH', '5'))
+NEW_ORDERS_SHOWN = 5
+# Commandes non vues gardées en session pour le flux (le total vient d'un comptage)
+NEW_ORDERS_KEPT = 50
+
+@st.cache_resource(show_spinner=False)
+def _alert_sound() -> str:
+    """Bip court (WAV en data URI) joué à l'arrivée d'une commande"""
+    rate, duration = 22050, 0.25
+    frames = bytearray()
+    for i in range(int(rate * duration)):
+        envelope = min(1.0, (rate * duration - i) / (rate * 0.05))
+        frames += struct.pack('<h', int(12000 * envelope * math.sin(2 * math.pi * 880 * i / rate)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(bytes(frames))
+    return "data:audio/wav;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+def load_new_orders():
+    """Charge les dernières commandes non vues et leur nombre total (rerun complet de la page)"""
+    orders = Order.get_latest_new_orders(NEW_ORDERS_KEPT)
+    st.session_state['live_orders'] = orders
+    st.session_state['live_orders_last_id'] = max((o['id'] for o in orders), default=0)
+    # Comptage en échec (0) : au moins les commandes chargées
+    st.session_state['live_orders_count'] = max(Order.count_new_orders(), len(orders))
+    st.session_state['live_orders_arrived'] = set()
+
+def _mark_viewed(order_id: int):
+    """Callback : marque la commande comme vue et la retire du flux"""
+    if Order.mark_as_viewed(order_id):
+        st.session_state['live_orders'] = [o for o in st.session_state['live_orders'] if o['id'] != order_id]
+        st.session_state['live_orders_count'] = max(st.session_state['live_orders_count'] - 1, 0)
+        # Commandes plus anciennes au-delà de NEW_ORDERS_KEPT : recharger
+        if not st.session_state['live_orders'] and st.session_state['live_orders_count']:
+            load_new_orders()
+
+def _mark_all_viewed():
+    """Callback : marque toutes les commandes non vues jusqu'à la dernière du flux (une requête)"""
+    if Order.mark_all_viewed(up_to_id=st.session_state.get('live_orders_last_id', 0)):
+        st.session_state['live_orders'] = []
+        st.session_state['live_orders_count'] = 0
+
+@st.fragment(run_every=NEW_ORDERS_REFRESH)
+def new_orders_feed():
+    """
+    Flux des nouvelles commandes
+
+    Fragment relancé toutes les NEW_ORDERS_REFRESH secondes : une requête
+    légère (id > dernier ID vu, par ID croissant) ; les commandes arrivées sont
+    ajoutées en tête avec une notification et un bip, sans recharger le reste
+    du dashboard.
+    """
+    arrived = Order.get_new_orders_since(st.session_state.get('live_orders_last_id', 0))
+    if arrived:
+        arrived.reverse()  # La plus récente en tête
+        st.session_state['live_orders'] = (arrived + st.session_state.get('live_orders', []))[:NEW_ORDERS_KEPT]
+        st.session_state['live_orders_last_id'] = arrived[0]['id']
+        st.session_state['live_orders_count'] += len(arrived)
+        st.session_state['live_orders_arrived'].update(o['id'] for o in arrived)
+        
+        st.toast(f"🔔 {len(arrived)} nouvelle(s) commande(s) !", icon="🛍️")
+        st.html(f'<audio autoplay src="{_alert_sound()}"></audio>')
+    
+    new_orders = st.session_state.get('live_orders', [])
+    total = st.session_state.get('live_orders_count', len(new_orders))
+    if not new_orders:
+        st.info("✨ Aucune nouvelle commande")
+        return
+    
+    for order in new_orders[:NEW_ORDERS_SHOWN]:  # Afficher les 5 dernières
+        client = order.get('clients') or {}
+        badge = " 🔔" if order['id'] in st.session_state['live_orders_arrived'] else ""
+        
+        # Card avec background vert pour nouvelles commandes
+        st.markdown(f"""
+        <div class="new-order">
+            <strong>Commande #{order['id']}</strong>{badge} - {format_relative_time(order['created_at'])}<br>
+            👤 {client.get('first_name', '')} {client.get('last_name', '')}<br>
+            💰 {format_price(order['total'])}
+        </div>
+        """, unsafe_allow_html=True)
+        
+        col_a, col_b = st.columns([1, 1])
+        
+        with col_a:
+            if st.button("👁️ Voir détails", key=f"view_{order['id']}", use_container_width=True):
+                st.switch_page("pages/admin_6_Commandes.py")
+        
+        with col_b:
+            st.button("✅ Marquer comme vue", key=f"mark_{order['id']}", use_container_width=True,
+                      on_click=_mark_viewed, args=(order['id'],))
+    
+    shown = min(len(new_orders), NEW_ORDERS_SHOWN)
+    if total > shown:
+        st.caption(f"... et {total - shown} autre(s)")
+    
+    if total > 1:
+        st.button(f"✅ Tout marquer comme vu ({total})", key="mark_all_viewed",
+                  use_container_width=True, on_click=_mark_all_viewed)
+
 # Initialisation
 init_supabase()
 init_session_state()
@@ -27,6 +138,8 @@ def main():
     # S'assure que le client Supabase a bien le token d'authentification
     load_supabase_session()
     
+    profiler = start_profiling("admin_4_Dashboard")
+    
     # En-tête avec déconnexion
     col1, col2 = st.columns([4, 1])
     
@@ -51,42 +164,44 @@ def main():
     st.divider()
     
     # Récupérer les métriques
-    metrics = Analytics.get_dashboard_metrics()
+    with profiler.section("Métriques", 'fetch'):
+        metrics = Analytics.get_dashboard_metrics()
     
     # ... (le reste du fichier est identique) ...
     
-    # Métriques principales
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric(
-            label="📦 Total Commandes",
-            value=metrics['total_orders'],
-            help="Nombre total de commandes"
-        )
-    
-    with col2:
-        st.metric(
-            label="🆕 Nouvelles Commandes",
-            value=metrics['new_orders'],
-            delta=f"+{metrics['new_orders']}" if metrics['new_orders'] > 0 else None,
-            delta_color="normal",
-            help="Commandes non encore consultées"
-        )
-    
-    with col3:
-        st.metric(
-            label="⏱️ Commandes 24h",
-            value=metrics['orders_24h'],
-            help="Commandes des dernières 24 heures"
-        )
-    
-    with col4:
-        st.metric(
-            label="📦 Produits",
-            value=metrics['total_products'],
-            help="Nombre total de produits"
-        )
+    with profiler.section("Rendu métriques"):
+        # Métriques principales
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.metric(
+                label="📦 Total Commandes",
+                value=metrics['total_orders'],
+                help="Nombre total de commandes"
+            )
+        
+        with col2:
+            st.metric(
+                label="🆕 Nouvelles Commandes",
+                value=metrics['new_orders'],
+                delta=f"+{metrics['new_orders']}" if metrics['new_orders'] > 0 else None,
+                delta_color="normal",
+                help="Commandes non encore consultées"
+            )
+        
+        with col3:
+            st.metric(
+                label="⏱️ Commandes 24h",
+                value=metrics['orders_24h'],
+                help="Commandes des dernières 24 heures"
+            )
+        
+        with col4:
+            st.metric(
+                label="📦 Produits",
+                value=metrics['total_products'],
+                help="Nombre total de produits"
+            )
     
     st.divider()
     
@@ -94,58 +209,39 @@ def main():
     col_left, col_right = st.columns([2, 1])
     
     with col_left:
-        # Nouvelles commandes
+        # Nouvelles commandes (liste chargée une fois par rerun complet, puis flux)
         st.subheader("🆕 Nouvelles Commandes")
         
-        new_orders = Order.get_new_orders()
+        with profiler.section("Nouvelles commandes", 'fetch'):
+            load_new_orders()
         
-        if new_orders:
-            for order in new_orders[:5]:  # Afficher les 5 dernières
-                client = order.get('clients', {})
-                
-                # Card avec background vert pour nouvelles commandes
-                st.markdown(f"""
-                <div class="new-order">
-                    <strong>Commande #{order['id']}</strong> - {format_relative_time(order['created_at'])}<br>
-                    👤 {client.get('first_name', '')} {client.get('last_name', '')}<br>
-                    💰 {format_price(order['total'])}
-                </div>
-                """, unsafe_allow_html=True)
-                
-                col_a, col_b = st.columns([1, 1])
-                
-                with col_a:
-                    if st.button("👁️ Voir détails", key=f"view_{order['id']}", use_container_width=True):
-                        st.switch_page("pages/admin_6_Commandes.py")
-                
-                with col_b:
-                    if st.button("✅ Marquer comme vue", key=f"mark_{order['id']}", use_container_width=True):
-                        if Order.mark_as_viewed(order['id']):
-                            st.rerun()
-        else:
-            st.info("✨ Aucune nouvelle commande")
+        new_orders_feed()
         
         st.divider()
         
         # Activité récente
         st.subheader("📋 Activité Récente")
         
-        activities = Analytics.get_recent_activity(limit=5)
+        with profiler.section("Activité récente", 'fetch'):
+            activities = Analytics.get_recent_activity(limit=5)
         
-        for activity in activities:
-            icon = "🆕" if not activity['viewed'] else "✅"
-            st.markdown(f"""
-            {icon} **Commande #{activity['order_id']}** - {activity['client_name']}  
-            💰 {format_price(activity['total'])} • {format_relative_time(activity['created_at'])}
-            """)
-            st.divider()
+        with profiler.section("Rendu activité"):
+            for activity in activities:
+                icon = "🆕" if not activity['viewed'] else "✅"
+                st.markdown(f"""
+                {icon} **Commande #{activity['order_id']}** - {activity['client_name']}  
+                💰 {format_price(activity['total'])} • {format_relative_time(activity['created_at'])}
+                """)
+                st.divider()
     
     with col_right:
         # Alertes stock
         st.subheader("⚠️ Alertes Stock")
         
         # Produits en rupture
-        out_of_stock = Product.get_out_of_stock_products()
+        with profiler.section("Alertes stock", 'fetch'):
+            out_of_stock = Product.get_out_of_stock_products()
+            low_stock = Product.get_low_stock_products(threshold=5)
         if out_of_stock:
             st.markdown('<div class="alert-danger">', unsafe_allow_html=True)
             st.markdown(f"**🚫 {len(out_of_stock)} produit(s) en rupture de stock**")
@@ -156,7 +252,6 @@ def main():
             st.markdown('</div>', unsafe_allow_html=True)
         
         # Produits en stock faible
-        low_stock = Product.get_low_stock_products(threshold=5)
         low_stock = [p for p in low_stock if p['stock'] > 0]  # Exclure ruptures
         
         if low_stock:
@@ -187,6 +282,8 @@ def main():
         
         if st.button("🏠 Retour au site", use_container_width=True):
             st.switch_page("app.py")
+    
+    profiler.render_sidebar()
 
 # Exécuter la fonction principale
 main()
\ No newline at end of file
@@ -7,9 +7,12 @@ import streamlit as st
 from config.supabase_client import init_supabase, upload_file, delete_file, load_supabase_session
 # --- FIN MODIFIÉ ---
 from models.product import Product
+from models.inventory import Inventory, LEDGER_REASONS
 from utils.session import init_session_state, require_auth, set_flash_message, display_flash_message
 from utils.validators import validate_product_form
-from utils.formatters import format_price, format_stock_badge
+from utils.formatters import format_price, format_stock_badge, format_date
+from utils.display_helpers import ADMIN_PAGE_SIZE, get_current_page, display_pagination
+from utils.cache import get_data_version
 import uuid
 
 # Configuration
@@ -47,10 +50,13 @@ def main():
         with col2:
             filter_type = st.selectbox("Type", ["Tous", "Homme", "Femme", "Mixte"])
         
-        # Récupérer les produits
-        products = Product.get_all(search=search, filter_type=filter_type)
+        # Compter puis récupérer uniquement la page affichée
+        total = Product.count(search=search, filter_type=filter_type)
+        page = get_current_page("admin_products_page", total, ADMIN_PAGE_SIZE, reset_on=(search, filter_type))
+        products = Product.get_all(search=search, filter_type=filter_type,
+                                   page=page, page_size=ADMIN_PAGE_SIZE) if total else []
         
-        st.markdown(f"**{len(products)} produit(s) trouvé(s)**")
+        st.markdown(f"**{total} produit(s) trouvé(s)**")
         
         if products:
             # Afficher en grille
@@ -88,6 +94,8 @@ def main():
                                     if st.button("🗑️ Supprimer", key=f"del_{product['id']}", use_container_width=True):
                                         st.session_state['delete_product_id'] = product['id']
                                         st.rerun()
+            
+            display_pagination("admin_products_page", total, ADMIN_PAGE_SIZE)
         else:
             st.info("Aucun produit trouvé")
 
@@ -175,8 +183,14 @@ def main():
         if 'edit_product_id' not in st.session_state:
             st.session_state['edit_product_id'] = None
         
-        products = Product.get_all()
-        product_options = {p['id']: f"{p['name']} ({p['type']})" for p in products}
+        # st.tabs exécute cet onglet à chaque rerun : sélecteur sur une requête
+        # projetée (id, nom, type), mémorisée jusqu'à la prochaine écriture produit
+        version = get_data_version('products')
+        options_memo = st.session_state.get('edit_product_options')
+        if options_memo is None or options_memo[0] != version:
+            options_memo = (version, {p['id']: f"{p['name']} ({p['type']})" for p in Product.get_names()})
+            st.session_state['edit_product_options'] = options_memo
+        product_options = options_memo[1]
         
         selected_id = st.selectbox(
             "Sélectionner un produit",
@@ -274,6 +288,19 @@ def main():
                                 st.rerun()
                             else:
                                 st.error("❌ Erreur lors de la mise à jour")
+                
+                # Journal des mouvements de stock (commandes, annulations, ajustements)
+                with st.expander("📒 Mouvements de stock"):
+                    ledger = Inventory.get_ledger(product_id=selected_id, limit=20)
+                    if ledger:
+                        for entry in ledger:
+                            order_ref = f" • commande #{entry['order_id']}" if entry.get('order_id') else ""
+                            st.markdown(
+                                f"`{entry['delta']:+d}` {LEDGER_REASONS.get(entry['reason'], entry['reason'])}"
+                                f"{order_ref} — {format_date(entry['created_at'])}"
+                            )
+                    else:
+                        st.caption("Aucun mouvement enregistré")
     
     # Modal de confirmation de suppression
     if st.session_state.get('delete_product_id'):
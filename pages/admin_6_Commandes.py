@@ -9,6 +9,7 @@ from models.order import Order
 from utils.session import init_session_state, require_auth, display_flash_message, set_flash_message
 from utils.formatters import format_price, format_date, format_order_status, format_phone
 from models.analytics import Analytics
+from utils.profiler import start_profiling
 
 # Configuration
 st.set_page_config(page_title="Commandes Admin - Sensations Arda", page_icon="📋", layout="wide")
@@ -17,9 +18,81 @@ st.set_page_config(page_title="Commandes Admin - Sensations Arda", page_icon="
 init_supabase()
 init_session_state()
 
+STATUS_LABELS = {"en_cours": "En cours", "livree": "Livrée", "annulee": "Annulée"}
+
+def _select_all(order_ids):
+    """Callback : sélectionne toutes les commandes affichées"""
+    st.session_state['bulk_selection'] = order_ids
+
+def _apply_bulk_status():
+    """Callback : applique le statut choisi à la sélection (une requête)"""
+    status = st.session_state['bulk_status']
+    updated = Order.bulk_update_status(st.session_state.get('bulk_selection', []), status)
+    if updated:
+        st.session_state['bulk_selection'] = []
+        set_flash_message(f"✅ {updated} commande(s) passée(s) à « {STATUS_LABELS[status]} »", "success")
+
+def _mark_bulk_viewed(order_ids):
+    """Callback : marque les commandes non vues de la sélection (une requête)"""
+    marked = Order.mark_all_viewed(order_ids)
+    if marked:
+        st.session_state['bulk_selection'] = []
+        set_flash_message(f"✅ {marked} commande(s) marquée(s) comme vue(s)", "success")
+
+def bulk_actions(orders):
+    """Sélection multiple et actions groupées sur les commandes affichées"""
+    labels = {
+        o['id']: f"#{o['id']} - {(o.get('clients') or {}).get('first_name', '')} {(o.get('clients') or {}).get('last_name', '')}"
+        for o in orders
+    }
+    # Ne garder que les commandes encore affichées (filtres modifiés)
+    if 'bulk_selection' in st.session_state:
+        st.session_state['bulk_selection'] = [i for i in st.session_state['bulk_selection'] if i in labels]
+    
+    with st.expander("☑️ Actions groupées", expanded=bool(st.session_state.get('bulk_selection'))):
+        col_sel, col_all = st.columns([4, 1])
+        
+        with col_sel:
+            selected = st.multiselect(
+                "Commandes sélectionnées",
+                options=list(labels),
+                format_func=labels.get,
+                key="bulk_selection",
+                placeholder="Choisir des commandes..."
+            )
+        
+        with col_all:
+            st.write("")
+            st.button("Tout sélectionner", use_container_width=True,
+                      on_click=_select_all, args=(list(labels),))
+        
+        col_status, col_apply, col_viewed = st.columns([2, 1, 1])
+        
+        with col_status:
+            # Lu par _apply_bulk_status dans st.session_state['bulk_status']
+            st.selectbox(
+                "Nouveau statut",
+                options=list(STATUS_LABELS),
+                format_func=STATUS_LABELS.get,
+                key="bulk_status"
+            )
+        
+        with col_apply:
+            st.write("")
+            st.button("💾 Appliquer", use_container_width=True, disabled=not selected,
+                      on_click=_apply_bulk_status)
+        
+        with col_viewed:
+            st.write("")
+            unviewed = [o['id'] for o in orders if o['id'] in selected and not o['viewed']]
+            st.button("👁️ Marquer comme vues", use_container_width=True, disabled=not unviewed,
+                      on_click=_mark_bulk_viewed, args=(unviewed,))
+
 # Protection de la page
 @require_auth
 def main():
+    profiler = start_profiling("admin_6_Commandes")
+    
     st.title("📋 Gestion des Commandes")
     
     # Afficher les messages flash
@@ -38,26 +111,29 @@ def main():
         show_only_new = st.checkbox("Nouvelles uniquement")
     
     # Récupérer les commandes
-    if show_only_new:
-        orders = Order.get_new_orders()
-    elif status_filter != "Tous":
-        orders = Order.get_orders_by_status(status_filter)
-    else:
-        orders = Order.get_all()
+    with profiler.section("Commandes", 'fetch'):
+        if show_only_new:
+            orders = Order.get_new_orders()
+        elif status_filter != "Tous":
+            orders = Order.get_orders_by_status(status_filter)
+        else:
+            orders = Order.get_all()
     
     # Filtrer par recherche
     if search:
-        orders = [
-            o for o in orders
-            if search.lower() in str(o['id']) or
-               search.lower() in f"{o.get('clients', {}).get('first_name', '')} {o.get('clients', {}).get('last_name', '')}".lower()
-        ]
+        with profiler.section("Recherche", 'transform'):
+            orders = [
+                o for o in orders
+                if search.lower() in str(o['id']) or
+                   search.lower() in f"{o.get('clients', {}).get('first_name', '')} {o.get('clients', {}).get('last_name', '')}".lower()
+            ]
     
     st.markdown(f"**{len(orders)} commande(s) trouvée(s)**")
     
     # Bouton export CSV
     if orders:
-        csv_data = Analytics.export_orders_to_csv(orders)
+        with profiler.section("Export CSV", 'transform'):
+            csv_data = Analytics.export_orders_to_csv(orders)
         st.download_button(
             label="📥 Exporter en CSV",
             data=csv_data,
@@ -65,111 +141,119 @@ def main():
             mime="text/csv"
         )
     
+    # Actions groupées (une seule requête in_() et un seul rerun)
+    if orders:
+        bulk_actions(orders)
+    
     st.divider()
     
-    # Afficher les commandes
-    if not orders:
-        st.info("Aucune commande trouvée")
-    else:
-        for order in orders:
-            client = order.get('clients', {})
-            items = order.get('order_items', [])
-            
-            # Card commande avec style conditionnel
-            card_class = "new-order" if not order['viewed'] else ""
-            
-            with st.container(border=True):
-                # En-tête
-                col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
-                
-                with col1:
-                    icon = "🆕" if not order['viewed'] else "📦"
-                    st.markdown(f"### {icon} Commande #{order['id']}")
-                    st.caption(format_date(order['created_at']))
+    with profiler.section("Rendu des commandes"):
+        # Afficher les commandes
+        if not orders:
+            st.info("Aucune commande trouvée")
+        else:
+            for order in orders:
+                client = order.get('clients', {})
+                delivery = Order.delivery(order)
+                items = order.get('order_items', [])
                 
-                with col2:
-                    st.markdown("**Client**")
-                    st.write(f"{client.get('first_name', '')} {client.get('last_name', '')}")
-                    st.caption(f"📧 {client.get('email', '')}")
+                # Card commande avec style conditionnel
+                card_class = "new-order" if not order['viewed'] else ""
                 
-                with col3:
-                    st.markdown("**Statut**")
-                    st.markdown(format_order_status(order['status']), unsafe_allow_html=True)
-                
-                with col4:
-                    st.markdown("**Total**")
-                    st.markdown(f"<p style='font-size: 1.5rem; font-weight: 700; color: #3b82f6; margin: 0;'>{format_price(order['total'])}</p>", unsafe_allow_html=True)
-                
-                # Expandable details
-                with st.expander("📄 Voir les détails", expanded=not order['viewed']):
-                    col_info, col_items = st.columns([1, 2])
+                with st.container(border=True):
+                    # En-tête
+                    col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+                    
+                    with col1:
+                        icon = "🆕" if not order['viewed'] else "📦"
+                        st.markdown(f"### {icon} Commande #{order['id']}")
+                        st.caption(format_date(order['created_at']))
                     
-                    with col_info:
-                        st.markdown("#### 📍 Informations Client")
-                        st.markdown(f"""
-                        **Nom:** {client.get('first_name', '')} {client.get('last_name', '')}  
-                        **Email:** {client.get('email', '')}  
-                        **Téléphone:** {format_phone(client.get('phone', ''))}  
-                        **Adresse:**  
-                        {client.get('address', '')}
-                        """)
+                    with col2:
+                        st.markdown("**Client**")
+                        st.write(f"{delivery['first_name']} {delivery['last_name']}")
+                        st.caption(f"📧 {client.get('email', '')}")
                     
-                    with col_items:
-                        st.markdown("#### 🛒 Articles Commandés")
+                    with col3:
+                        st.markdown("**Statut**")
+                        st.markdown(format_order_status(order['status']), unsafe_allow_html=True)
+                    
+                    with col4:
+                        st.markdown("**Total**")
+                        st.markdown(f"<p style='font-size: 1.5rem; font-weight: 700; color: #3b82f6; margin: 0;'>{format_price(order['total'])}</p>", unsafe_allow_html=True)
+                    
+                    # Expandable details
+                    with st.expander("📄 Voir les détails", expanded=not order['viewed']):
+                        col_info, col_items = st.columns([1, 2])
                         
-                        for item in items:
-                            product = item.get('products', {})
-                            col_a, col_b, col_c = st.columns([3, 1, 2])
+                        with col_info:
+                            st.markdown("#### 📍 Informations Client")
+                            st.markdown(f"""
+                            **Nom:** {delivery['first_name']} {delivery['last_name']}  
+                            **Email:** {client.get('email', '')}  
+                            **Téléphone:** {format_phone(delivery['phone'])}  
+                            **Adresse:**  
+                            {delivery['address']}
+                            """)
+                        
+                        with col_items:
+                            st.markdown("#### 🛒 Articles Commandés")
                             
-                            with col_a:
-                                st.write(f"**{product.get('name', 'Produit')}**")
+                            for item in items:
+                                product = item.get('products', {})
+                                col_a, col_b, col_c = st.columns([3, 1, 2])
+                                
+                                with col_a:
+                                    st.write(f"**{product.get('name', 'Produit')}**")
+                                
+                                with col_b:
+                                    st.write(f"x{item.get('quantity', 0)}")
+                                
+                                with col_c:
+                                    st.write(f"{format_price(item.get('price', 0) * item.get('quantity', 0))}")
+                                
+                                st.divider()
                             
-                            with col_b:
-                                st.write(f"x{item.get('quantity', 0)}")
+                            # Total
+                            st.markdown(f"**TOTAL:** {format_price(order['total'])}")
+                        
+                        st.divider()
+                        
+                        # Actions
+                        col_act1, col_act2, col_act3 = st.columns(3)
+                        
+                        with col_act1:
+                            # Changer le statut
+                            status_options = ["en_cours", "livree", "annulee"]
+                            current_index = status_options.index(order['status'])
                             
-                            with col_c:
-                                st.write(f"{format_price(item.get('price', 0) * item.get('quantity', 0))}")
+                            new_status = st.selectbox(
+                                "Changer le statut",
+                                options=status_options,
+                                index=current_index,
+                                key=f"status_{order['id']}",
+                                format_func=STATUS_LABELS.get
+                            )
                             
-                            st.divider()
+                            if new_status != order['status']:
+                                if st.button("💾 Sauvegarder le statut", key=f"save_status_{order['id']}", use_container_width=True):
+                                    if Order.update_status(order['id'], new_status):
+                                        set_flash_message(f"✅ Statut mis à jour", "success")
+                                        st.rerun()
                         
-                        # Total
-                        st.markdown(f"**TOTAL:** {format_price(order['total'])}")
-                    
-                    st.divider()
-                    
-                    # Actions
-                    col_act1, col_act2, col_act3 = st.columns(3)
-                    
-                    with col_act1:
-                        # Changer le statut
-                        status_options = ["en_cours", "livree", "annulee"]
-                        current_index = status_options.index(order['status'])
-                        
-                        new_status = st.selectbox(
-                            "Changer le statut",
-                            options=status_options,
-                            index=current_index,
-                            key=f"status_{order['id']}",
-                            format_func=lambda x: {"en_cours": "En cours", "livree": "Livrée", "annulee": "Annulée"}[x]
-                        )
+                        with col_act2:
+                            # Marquer comme vue
+                            if not order['viewed']:
+                                if st.button("👁️ Marquer comme vue", key=f"mark_viewed_{order['id']}", use_container_width=True):
+                                    if Order.mark_as_viewed(order['id']):
+                                        set_flash_message(f"✅ Commande marquée comme vue", "success")
+                                        st.rerun()
                         
-                        if new_status != order['status']:
-                            if st.button("💾 Sauvegarder le statut", key=f"save_status_{order['id']}", use_container_width=True):
-                                if Order.update_status(order['id'], new_status):
-                                    set_flash_message(f"✅ Statut mis à jour", "success")
-                                    st.rerun()
-                    
-                    with col_act2:
-                        # Marquer comme vue
-                        if not order['viewed']:
-                            if st.button("👁️ Marquer comme vue", key=f"mark_viewed_{order['id']}", use_container_width=True):
-                                if Order.mark_as_viewed(order['id']):
-                                    set_flash_message(f"✅ Commande marquée comme vue", "success")
-                                    st.rerun()
-                    
-                    with col_act3:
-                        # Export PDF (placeholder - nécessiterait une lib comme reportlab)
-                        st.button("📄 Exporter PDF", key=f"pdf_{order['id']}", use_container_width=True, disabled=True, help="Fonctionnalité à venir")
+                        with col_act3:
+                            # Export PDF (placeholder - nécessiterait une lib comme reportlab)
+                            st.button("📄 Exporter PDF", key=f"pdf_{order['id']}", use_container_width=True, disabled=True, help="Fonctionnalité à venir")
+    
+    profiler.render_sidebar()
 
 # Exécuter
 main()
\ No newline at end of file
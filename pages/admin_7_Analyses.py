@@ -3,13 +3,16 @@ Page Analytics Admin - Statistiques et rapports
 """
 
 import streamlit as st
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
 from config.supabase_client import init_supabase
 from models.analytics import Analytics
 from utils.session import init_session_state, require_auth, display_flash_message
 from utils.formatters import format_price
+from utils.profiler import start_profiling
+from utils.cache import get_data_version
+from utils.charts import (build_sales_figure, build_status_donut, build_top_products_bar,
+                          load_sales_evolution, load_top_products, top_products_table,
+                          load_funnel, build_funnel_figure)
 
 # Configuration
 st.set_page_config(page_title="Analytics Admin - Sensations Arda", page_icon="📈", layout="wide")
@@ -26,6 +29,8 @@ init_session_state()
 # Protection de la page
 @require_auth
 def main():
+    profiler = start_profiling("admin_7_Analyses")
+    
     st.title("📈 Analytics & Rapports")
     
     # Afficher les messages flash
@@ -52,7 +57,8 @@ def main():
     # NOTE: L'erreur TypeError se produit à l'intérieur de cette fonction,
     # qui se trouve dans votre fichier models/analytics.py.
     # C'est LÀ-BAS que la correction pd.to_datetime(..., utc=True) doit être appliquée.
-    comparison = Analytics.get_period_comparison(period)
+    with profiler.section("Comparaison de périodes", 'fetch'):
+        comparison = Analytics.get_period_comparison(period)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -80,13 +86,15 @@ def main():
             delta_color="normal"
         )
     
+    with profiler.section("Tunnel de conversion", 'fetch'):
+        funnel = load_funnel(period)
+    
     with col4:
-        # Taux de conversion (exemple fictif)
-        conversion_rate = 3.5  # Placeholder
+        # Taux de conversion mesuré par le journal d'événements (utils/events.py)
         st.metric(
             label="📈 Taux de Conversion",
-            value=f"{conversion_rate}%",
-            help="Pourcentage de visiteurs qui passent commande"
+            value=f"{funnel['conversion_rate']:.1f}%",
+            help="Pourcentage des sessions visiteurs qui passent commande"
         )
     
     st.divider()
@@ -94,56 +102,23 @@ def main():
     # Graphiques
     col_left, col_right = st.columns([2, 1])
     
+    # Estampille des commandes : les figures en cache ne sont reconstruites
+    # qu'après une écriture ou à l'expiration de la tranche DATA_VERSION_TTL
+    orders_version = get_data_version('orders')
+    
     with col_left:
         # Graphique d'évolution des ventes
         st.subheader("📈 Évolution des Ventes")
         
-        sales_data = Analytics.get_sales_evolution(period)
+        with profiler.section("Évolution des ventes", 'fetch'):
+            sales_data = load_sales_evolution(period, orders_version)
         
         if not sales_data.empty:
-            fig = go.Figure()
-            
-            # Ligne du chiffre d'affaires
-            fig.add_trace(go.Scatter(
-                x=sales_data['date'],
-                y=sales_data['chiffre_affaires'],
-                mode='lines+markers',
-                name='Chiffre d\'affaires (€)',
-                line=dict(color='#3b82f6', width=3),
-                marker=dict(size=8)
-            ))
-            
-            # Ligne du nombre de commandes (axe secondaire)
-            fig.add_trace(go.Scatter(
-                x=sales_data['date'],
-                y=sales_data['nb_commandes'],
-                mode='lines+markers',
-                name='Nombre de commandes',
-                line=dict(color='#10b981', width=3),
-                marker=dict(size=8),
-                yaxis='y2'
-            ))
-            
-            fig.update_layout(
-                xaxis_title="Date",
-                yaxis_title="Chiffre d'affaires (€)",
-                yaxis2=dict(
-                    title="Nombre de commandes",
-                    overlaying='y',
-                    side='right'
-                ),
-                hovermode='x unified',
-                height=400,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=1.02,
-                    xanchor="right",
-                    x=1
-                )
-            )
+            with profiler.section("Courbe des ventes", 'figure'):
+                fig = build_sales_figure(period, orders_version)
             
-            st.plotly_chart(fig, use_container_width=True)
+            with profiler.section("Rendu courbe"):
+                st.plotly_chart(fig, use_container_width=True, key="chart_sales")
         else:
             st.info("Pas de données pour cette période")
     
@@ -151,90 +126,61 @@ def main():
         # Graphique donut des statuts de commandes
         st.subheader("📊 Répartition des Commandes")
         
-        status_stats = Analytics.get_orders_by_status_stats()
-        
-        labels = []
-        values = []
-        colors = []
+        with profiler.section("Donut", 'figure'):
+            fig_donut = build_status_donut(orders_version)
         
-        status_config = {
-            'en_cours': {'label': 'En cours', 'color': '#3b82f6'},
-            'livree': {'label': 'Livrées', 'color': '#10b981'},
-            'annulee': {'label': 'Annulées', 'color': '#ef4444'}
-        }
+        if fig_donut is not None:
+            with profiler.section("Rendu donut"):
+                st.plotly_chart(fig_donut, use_container_width=True, key="chart_status")
+        else:
+            st.info("Aucune commande")
+    
+    st.divider()
+    
+    # Tunnel de conversion
+    st.subheader("🧭 Tunnel de Conversion")
+    
+    if funnel['sessions']:
+        col_funnel, col_drop = st.columns([2, 1])
         
-        for status, count in status_stats.items():
-            if count > 0:
-                labels.append(status_config[status]['label'])
-                values.append(count)
-                colors.append(status_config[status]['color'])
+        with col_funnel:
+            with profiler.section("Rendu tunnel"):
+                st.plotly_chart(build_funnel_figure(funnel), use_container_width=True, key="chart_funnel")
         
-        if values:
-            fig_donut = go.Figure(data=[go.Pie(
-                labels=labels,
-                values=values,
-                hole=0.5,
-                marker=dict(colors=colors)
-            )])
-            
-            fig_donut.update_layout(
-                height=400,
-                showlegend=True,
-                legend=dict(
-                    orientation="h",
-                    yanchor="bottom",
-                    y=-0.1,
-                    xanchor="center",
-                    x=0.5
+        with col_drop:
+            st.metric("👥 Sessions", funnel['sessions'])
+            st.metric("🛒 Paniers abandonnés", funnel['abandoned_carts'],
+                      help="Sessions avec un ajout au panier mais sans commande")
+            if not funnel['checkout_errors'].empty:
+                st.markdown("**Erreurs du formulaire de commande**")
+                st.dataframe(
+                    funnel['checkout_errors'].rename_axis('Champ').reset_index(name='Erreurs'),
+                    use_container_width=True, hide_index=True
                 )
-            )
-            
-            st.plotly_chart(fig_donut, use_container_width=True)
-        else:
-            st.info("Aucune commande")
+        
+        with st.expander("📋 Détail par étape"):
+            st.dataframe(funnel['steps'], use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucun événement enregistré sur cette période")
     
     st.divider()
     
     # Top produits
     st.subheader("🏆 Top 10 Produits Vendus")
     
-    # NOTE (Refactoring): Appel déplacé vers Analytics pour une meilleure séparation des préoccupations.
-    # La logique Order.get_top_products() doit être dans models/analytics.py
-    top_products = Analytics.get_top_products(limit=10, days=period)
+    with profiler.section("Top produits", 'fetch'):
+        top_products = load_top_products(period, orders_version)
     
     if top_products:
-        # Créer un DataFrame pour l'affichage
-        df_top = pd.DataFrame(top_products)
-        df_top = df_top.rename(columns={
-            'product_name': 'Produit',
-            'total_quantity': 'Quantité Vendue'
-        })
-        df_top.index = df_top.index + 1  # Commencer à 1
-        
-        # Graphique en barres
-        fig_bar = px.bar(
-            df_top,
-            x='Quantité Vendue',
-            y='Produit',
-            orientation='h',
-            text='Quantité Vendue',
-            color='Quantité Vendue',
-            color_continuous_scale='Blues'
-        )
+        with profiler.section("Barres top produits", 'figure'):
+            fig_bar = build_top_products_bar(period, orders_version)
         
-        fig_bar.update_layout(
-            height=400,
-            showlegend=False,
-            yaxis={'categoryorder': 'total ascending'}
-        )
-        
-        fig_bar.update_traces(textposition='outside')
-        
-        st.plotly_chart(fig_bar, use_container_width=True)
+        with profiler.section("Rendu barres"):
+            st.plotly_chart(fig_bar, use_container_width=True, key="chart_top_products")
         
         # Tableau détaillé
         with st.expander("📋 Voir le tableau détaillé"):
-            st.dataframe(df_top, use_container_width=True, hide_index=False)
+            st.dataframe(top_products_table(top_products), use_container_width=True, hide_index=False)
     else:
         st.info("Aucune vente sur cette période")
     
@@ -247,7 +193,8 @@ def main():
     # regroupés en une seule méthode dans Analytics pour une meilleure abstraction.
     # Vous devez créer Analytics.get_stock_alerts() dans votre modèle.
     # Elle doit renvoyer (list_out_of_stock, list_low_stock)
-    out_of_stock, low_stock = Analytics.get_stock_alerts(threshold=5)
+    with profiler.section("Alertes stock", 'fetch'):
+        out_of_stock, low_stock = Analytics.get_stock_alerts(threshold=5)
     
     col_alert1, col_alert2 = st.columns(2)
     
@@ -299,15 +246,17 @@ def main():
     
     # NOTE (Refactoring): Les données pour l'export sont maintenant 
     # aussi récupérées via le modèle Analytics.
-    orders_for_export = Analytics.get_orders_for_export(days=period)
-    products_for_export = Analytics.get_products_for_export()
+    with profiler.section("Données d'export", 'fetch'):
+        orders_for_export = Analytics.get_orders_for_export(days=period)
+        products_for_export = Analytics.get_products_for_export()
     
     col_exp1, col_exp2 = st.columns(2)
     
     with col_exp1:
         # Export commandes
         if orders_for_export:
-            csv_orders = Analytics.export_orders_to_csv(orders_for_export)
+            with profiler.section("CSV commandes", 'transform'):
+                csv_orders = Analytics.export_orders_to_csv(orders_for_export)
             st.download_button(
                 label=f"📦 Exporter les commandes ({len(orders_for_export)})",
                 data=csv_orders,
@@ -321,7 +270,8 @@ def main():
     with col_exp2:
         # Export produits
         if products_for_export:
-            csv_products = Analytics.export_products_to_csv(products_for_export)
+            with profiler.section("CSV produits", 'transform'):
+                csv_products = Analytics.export_products_to_csv(products_for_export)
             st.download_button(
                 label=f"📦 Exporter les produits ({len(products_for_export)})",
                 data=csv_products,
@@ -331,6 +281,8 @@ def main():
             )
         else:
             st.button(f"📦 Exporter les produits (0)", disabled=True, use_container_width=True)
+    
+    profiler.render_sidebar()
 
 # Exécuter
 main()
\ No newline at end of file
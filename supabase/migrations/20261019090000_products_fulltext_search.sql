@@ -0,0 +1,65 @@
+-- =============================================================================
+-- Recherche plein texte sur le catalogue - Sensations by Arda J
+--
+-- Remplace les `ilike '%terme%'` (scan séquentiel, sensibles aux accents,
+-- tri alphabétique) par un tsvector français sans accents, indexé en GIN,
+-- et une RPC classée par pertinence (ts_rank).
+--
+-- Appel côté client : supabase.rpc('search_products', {...}, count='exact')
+--                             .select('*, product_images(*)').range(a, b)
+-- =============================================================================
+
+create extension if not exists unaccent with schema extensions;
+
+-- unaccent() n'est pas IMMUTABLE : enveloppe nécessaire pour la colonne générée et l'index
+create or replace function public.f_unaccent(value text)
+returns text
+language sql
+immutable
+parallel safe
+strict
+as $$
+    select extensions.unaccent('extensions.unaccent'::regdictionary, value);
+$$;
+
+-- Nom (poids A) et description / notes (poids B)
+alter table public.products
+    add column if not exists search_vector tsvector
+    generated always as (
+        setweight(to_tsvector('french', public.f_unaccent(coalesce(name, ''))), 'A') ||
+        setweight(to_tsvector('french', public.f_unaccent(coalesce(description, ''))), 'B')
+    ) stored;
+
+create index if not exists products_search_vector_idx
+    on public.products using gin (search_vector);
+
+-- Requête préfixe : "eau de parf" -> 'eau':* & 'parf':* (les mots vides sont ignorés par la config french)
+create or replace function public.products_search_query(search_query text)
+returns tsquery
+language sql
+immutable
+parallel safe
+as $$
+    select to_tsquery('french', string_agg(quote_literal(word) || ':*', ' & '))
+    from regexp_split_to_table(public.f_unaccent(lower(coalesce(search_query, ''))), '[^[:alnum:]]+') as word
+    where word <> '';
+$$;
+
+-- Produits correspondant à la recherche, du plus pertinent au moins pertinent.
+-- Retourne setof products : PostgREST peut donc embarquer product_images, paginer
+-- (range / limit) et compter (count=exact) sur le résultat.
+create or replace function public.search_products(search_query text, filter_type text default null)
+returns setof public.products
+language sql
+stable
+as $$
+    select p.*
+    from public.products p,
+         public.products_search_query(search_query) as q
+    where q is not null
+      and p.search_vector @@ q
+      and (filter_type is null or p.type = filter_type)
+    order by ts_rank(p.search_vector, q) desc, p.name, p.id;
+$$;
+
+grant execute on function public.search_products(text, text) to anon, authenticated;
@@ -0,0 +1,59 @@
+-- =============================================================================
+-- Flux de modifications pour l'invalidation des caches - Sensations by Arda J
+--
+-- Les processus Streamlit gardent le catalogue et les agrégats en cache
+-- (config/change_feed.py). Ils sont prévenus des écritures faites ailleurs :
+--   - par Supabase Realtime (publication supabase_realtime) ;
+--   - à défaut, en interrogeant régulièrement max(updated_at) et count(*).
+-- =============================================================================
+
+-- Horodatage de dernière modification, tenu à jour par trigger
+create or replace function public.touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+alter table public.products       add column if not exists updated_at timestamptz not null default now();
+alter table public.product_images add column if not exists updated_at timestamptz not null default now();
+alter table public.orders         add column if not exists updated_at timestamptz not null default now();
+
+drop trigger if exists products_touch_updated_at on public.products;
+create trigger products_touch_updated_at
+    before update on public.products
+    for each row execute function public.touch_updated_at();
+
+drop trigger if exists product_images_touch_updated_at on public.product_images;
+create trigger product_images_touch_updated_at
+    before update on public.product_images
+    for each row execute function public.touch_updated_at();
+
+drop trigger if exists orders_touch_updated_at on public.orders;
+create trigger orders_touch_updated_at
+    before update on public.orders
+    for each row execute function public.touch_updated_at();
+
+-- Sondage de repli : order by updated_at desc limit 1
+create index if not exists products_updated_at_idx       on public.products (updated_at desc);
+create index if not exists product_images_updated_at_idx on public.product_images (updated_at desc);
+create index if not exists orders_updated_at_idx         on public.orders (updated_at desc);
+
+-- Diffusion Realtime des changements (INSERT / UPDATE / DELETE)
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['products', 'product_images', 'orders'] loop
+        if not exists (
+            select 1 from pg_publication_tables
+            where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = t
+        ) then
+            execute format('alter publication supabase_realtime add table public.%I', t);
+        end if;
+    end loop;
+end;
+$$;
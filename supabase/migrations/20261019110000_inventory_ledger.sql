@@ -0,0 +1,273 @@
+-- =============================================================================
+-- Journal des mouvements de stock - Sensations by Arda J
+--
+-- inventory_ledger est la source de vérité du stock : une ligne par mouvement,
+-- jamais modifiée ni supprimée. products.stock en est la somme matérialisée :
+--   - 'order' / 'cancel' : écrits par les RPC de commande, le trigger du journal
+--     applique le delta à products.stock dans la même transaction ;
+--   - 'initial' / 'adjustment' : enregistrent après coup une création de produit
+--     ou une modification directe de products.stock (formulaire admin) ;
+--   - reconcile_stock() recalcule la somme et corrige les écarts (tâche périodique).
+--
+-- RPC côté client :
+--   place_order(p_client_id, p_items, p_total)  commande + lignes + sorties de stock, atomique
+--   set_order_status(p_order_ids, p_status)      statut en masse ; 'annulee' remet en stock
+--   reconcile_stock()                            écarts corrigés (product_id, stock_before, stock_after)
+-- =============================================================================
+
+create table if not exists public.inventory_ledger (
+    id          bigint generated always as identity primary key,
+    product_id  bigint not null references public.products (id) on delete cascade,
+    delta       integer not null check (delta <> 0),
+    reason      text not null check (reason in ('initial', 'order', 'cancel', 'adjustment')),
+    order_id    bigint references public.orders (id) on delete set null,
+    created_at  timestamptz not null default now()
+);
+
+create index if not exists inventory_ledger_product_idx on public.inventory_ledger (product_id);
+create index if not exists inventory_ledger_order_idx on public.inventory_ledger (order_id) where order_id is not null;
+
+alter table public.inventory_ledger enable row level security;
+
+drop policy if exists inventory_ledger_admin_read on public.inventory_ledger;
+create policy inventory_ledger_admin_read on public.inventory_ledger
+    for select to authenticated using (true);
+
+-- Stock actuel comme point de départ (avant la création des triggers)
+insert into public.inventory_ledger (product_id, delta, reason)
+select p.id, p.stock, 'initial'
+from public.products p
+where coalesce(p.stock, 0) <> 0
+  and not exists (select 1 from public.inventory_ledger l where l.product_id = p.id);
+
+-- -----------------------------------------------------------------------------
+-- Triggers
+-- -----------------------------------------------------------------------------
+
+-- Journal en ajout seul. Les actions des clés étrangères (suppression d'un
+-- produit : on delete cascade ; d'une commande : on delete set null) passent :
+-- Postgres les exécute depuis ses propres triggers, donc à une profondeur > 1.
+create or replace function public.inventory_ledger_append_only()
+returns trigger
+language plpgsql
+as $$
+begin
+    if pg_trigger_depth() > 1 then
+        return case when tg_op = 'DELETE' then old else new end;
+    end if;
+    raise exception 'inventory_ledger est en ajout seul (% refusé)', tg_op;
+end;
+$$;
+
+drop trigger if exists inventory_ledger_no_update on public.inventory_ledger;
+create trigger inventory_ledger_no_update
+    before update or delete on public.inventory_ledger
+    for each row execute function public.inventory_ledger_append_only();
+
+-- Mouvements de commande : appliqués à la somme matérialisée
+create or replace function public.inventory_ledger_apply()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if new.reason in ('order', 'cancel') then
+        -- Évite que products_log_stock_change journalise une seconde fois
+        perform set_config('inventory.syncing', 'on', true);
+        update products set stock = stock + new.delta where id = new.product_id;
+        perform set_config('inventory.syncing', 'off', true);
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists inventory_ledger_apply on public.inventory_ledger;
+create trigger inventory_ledger_apply
+    after insert on public.inventory_ledger
+    for each row execute function public.inventory_ledger_apply();
+
+-- Création de produit et modifications directes du stock : journalisées
+create or replace function public.products_log_stock_change()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    if current_setting('inventory.syncing', true) = 'on' then
+        return null;
+    end if;
+
+    if tg_op = 'INSERT' then
+        if coalesce(new.stock, 0) <> 0 then
+            insert into inventory_ledger (product_id, delta, reason) values (new.id, new.stock, 'initial');
+        end if;
+    elsif new.stock is distinct from old.stock then
+        insert into inventory_ledger (product_id, delta, reason)
+        values (new.id, coalesce(new.stock, 0) - coalesce(old.stock, 0), 'adjustment');
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists products_log_stock_change on public.products;
+create trigger products_log_stock_change
+    after insert or update of stock on public.products
+    for each row execute function public.products_log_stock_change();
+
+-- -----------------------------------------------------------------------------
+-- RPC
+-- -----------------------------------------------------------------------------
+
+-- Commande complète en une transaction : refusée si un stock est insuffisant
+-- p_items : [{"product_id": 1, "quantity": 2}, ...] (quantités > 0). La fonction
+-- est appelable par anon : prix unitaires et total sont lus dans products sous
+-- verrou ; un "price" dans p_items et p_total (gardé pour la signature) sont ignorés.
+create or replace function public.place_order(p_client_id bigint, p_items jsonb, p_total numeric)
+returns public.orders
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_order orders;
+    v_item  record;
+    v_stock integer;
+    v_price numeric;
+    v_total numeric := 0;
+begin
+    if jsonb_array_length(coalesce(p_items, '[]'::jsonb)) = 0 then
+        raise exception 'Commande vide' using errcode = '22023';
+    end if;
+
+    insert into orders (client_id, total, status, viewed)
+    values (p_client_id, 0, 'en_cours', false)
+    returning * into v_order;
+
+    -- Ordre des IDs constant : pas d'interblocage entre deux commandes concurrentes
+    for v_item in
+        select (i->>'product_id')::bigint                as product_id,
+               sum((i->>'quantity')::integer)::integer as quantity
+        from jsonb_array_elements(p_items) as i
+        group by 1
+        order by 1
+    loop
+        -- Quantités de l'appelant (anonyme) : une quantité négative ferait entrer du stock
+        if v_item.quantity is null or v_item.quantity <= 0 then
+            raise exception 'Quantité invalide pour le produit %', v_item.product_id
+                using errcode = '22023';
+        end if;
+
+        -- Prix lu sous le verrou : le prix et le total envoyés par l'appelant sont ignorés
+        select stock, price into v_stock, v_price from products where id = v_item.product_id for update;
+        if v_stock is null or v_stock < v_item.quantity then
+            raise exception 'Stock insuffisant pour le produit %', v_item.product_id
+                using errcode = 'P0001', hint = 'insufficient_stock';
+        end if;
+
+        insert into order_items (order_id, product_id, quantity, price)
+        values (v_order.id, v_item.product_id, v_item.quantity, v_price);
+        v_total := v_total + v_price * v_item.quantity;
+
+        insert into inventory_ledger (product_id, delta, reason, order_id)
+        values (v_item.product_id, -v_item.quantity, 'order', v_order.id);
+    end loop;
+
+    update orders set total = v_total where id = v_order.id returning * into v_order;
+
+    return v_order;
+end;
+$$;
+
+-- Changement de statut en masse, avec mouvements de stock :
+--   -> 'annulee'           remise en stock des articles
+--   'annulee' -> autre     nouvelle sortie de stock (refusée si insuffisant)
+create or replace function public.set_order_status(p_order_ids bigint[], p_status text)
+returns setof public.orders
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_order orders;
+    v_item  order_items;
+    v_stock integer;
+begin
+    if p_status not in ('en_cours', 'livree', 'annulee') then
+        raise exception 'Statut inconnu: %', p_status;
+    end if;
+
+    for v_order in
+        select * from orders where id = any(p_order_ids) order by id for update
+    loop
+        if v_order.status = 'annulee' and p_status <> 'annulee' then
+            for v_item in select * from order_items where order_id = v_order.id order by product_id loop
+                select stock into v_stock from products where id = v_item.product_id for update;
+                if v_stock is null or v_stock < v_item.quantity then
+                    raise exception 'Stock insuffisant pour rétablir la commande %', v_order.id
+                        using errcode = 'P0001', hint = 'insufficient_stock';
+                end if;
+                insert into inventory_ledger (product_id, delta, reason, order_id)
+                values (v_item.product_id, -v_item.quantity, 'order', v_order.id);
+            end loop;
+        elsif v_order.status <> 'annulee' and p_status = 'annulee' then
+            insert into inventory_ledger (product_id, delta, reason, order_id)
+            select product_id, quantity, 'cancel', order_id
+            from order_items
+            where order_id = v_order.id and quantity > 0;
+        end if;
+
+        update orders set status = p_status where id = v_order.id returning * into v_order;
+        return next v_order;
+    end loop;
+end;
+$$;
+
+-- Recalcule products.stock depuis le journal et corrige les écarts
+create or replace function public.reconcile_stock()
+returns table (product_id bigint, stock_before integer, stock_after integer)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+begin
+    perform set_config('inventory.syncing', 'on', true);
+
+    return query
+    with ledger as (
+        select p.id, coalesce(sum(l.delta), 0)::integer as total
+        from products p
+        left join inventory_ledger l on l.product_id = p.id
+        group by p.id
+    ),
+    drifted as (
+        select p.id, p.stock as stock_before, ledger.total as stock_after
+        from products p
+        join ledger on ledger.id = p.id
+        where p.stock is distinct from ledger.total
+        for update of p
+    )
+    update products p
+    set stock = drifted.stock_after
+    from drifted
+    where p.id = drifted.id
+    returning p.id, drifted.stock_before, drifted.stock_after;
+
+    perform set_config('inventory.syncing', 'off', true);
+end;
+$$;
+
+grant execute on function public.place_order(bigint, jsonb, numeric) to anon, authenticated;
+grant execute on function public.set_order_status(bigint[], text) to authenticated;
+grant execute on function public.reconcile_stock() to authenticated;
+
+-- Réconciliation périodique (si pg_cron est activé sur le projet)
+do $$
+begin
+    if exists (select 1 from pg_extension where extname = 'pg_cron') then
+        perform cron.schedule('reconcile-stock', '*/15 * * * *', 'select public.reconcile_stock()');
+    end if;
+end;
+$$;
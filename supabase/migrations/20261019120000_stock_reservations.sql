@@ -0,0 +1,262 @@
+-- =============================================================================
+-- Réservations de stock pendant le checkout - Sensations by Arda J
+--
+-- À l'ouverture du checkout, les quantités du panier sont réservées pour une
+-- durée fixée ici, côté serveur (10 minutes) : l'appelant, anonyme, ne choisit
+-- pas combien de temps il bloque le stock. Le stock disponible
+-- pour les autres clients est stock - réservations actives ; place_order
+-- convertit les réservations du panier en commande dans la même transaction.
+--
+-- reserve_cart est appelable par anon ; pour qu'un appelant ne bloque pas tout
+-- le stock en multipliant les jetons et les renouvellements :
+--   - au plus 10 unités réservées par produit et 50 produits par appel (la
+--     disponibilité est vérifiée, et place_order revérifiée, sur toute la quantité) ;
+--   - au plus 30 nouveaux jetons par minute pour toute la boutique ;
+--   - un jeton ne renouvelle ses réservations que pendant 30 minutes après la première.
+-- Au-delà, reserve_cart lève une erreur (hint reservation_limited) : le
+-- checkout continue sans réservation, le stock étant vérifié à la commande.
+--
+-- RPC côté client :
+--   reserve_cart(p_cart_token, p_items)                 (re)pose les réservations du panier
+--   release_cart(p_cart_token)                          libère les réservations du panier
+--   active_reservations()                               réservations actives (stock disponible affiché)
+--   place_order(..., p_cart_token)                      commande + consommation des réservations
+-- =============================================================================
+
+create table if not exists public.stock_reservations (
+    cart_token  text not null,
+    product_id  bigint not null references public.products (id) on delete cascade,
+    quantity    integer not null check (quantity > 0),
+    expires_at  timestamptz not null,
+    created_at  timestamptz not null default now(),
+    primary key (cart_token, product_id)
+);
+
+create index if not exists stock_reservations_product_idx on public.stock_reservations (product_id, expires_at);
+create index if not exists stock_reservations_expires_idx on public.stock_reservations (expires_at);
+
+-- Accès uniquement via les fonctions security definer ci-dessous
+alter table public.stock_reservations enable row level security;
+
+-- Première réservation de chaque jeton (limites de reserve_cart), purgée après une heure
+create table if not exists public.reservation_tokens (
+    cart_token        text primary key,
+    first_reserved_at timestamptz not null default now()
+);
+
+create index if not exists reservation_tokens_first_idx on public.reservation_tokens (first_reserved_at);
+
+alter table public.reservation_tokens enable row level security;
+
+-- Quantité réservée par les autres paniers (réservations non expirées)
+create or replace function public.reserved_quantity(p_product_id bigint, p_except_token text default null)
+returns integer
+language sql
+stable
+set search_path = public
+as $$
+    select coalesce(sum(quantity), 0)::integer
+    from stock_reservations
+    where product_id = p_product_id
+      and expires_at > now()
+      and cart_token is distinct from p_except_token;
+$$;
+
+-- Réservations actives par produit et par panier, pour afficher le stock
+-- disponible. Le panier est désigné par l'empreinte md5 de son jeton : le jeton
+-- donne accès au panier, il n'est pas exposé ; l'application reconnaît ses
+-- propres réservations en calculant l'empreinte de son jeton.
+drop function if exists public.available_stock(bigint[]);
+
+create or replace function public.active_reservations()
+returns table (product_id bigint, holder text, quantity integer)
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select r.product_id, md5(r.cart_token), r.quantity
+    from stock_reservations r
+    where r.expires_at > now();
+$$;
+
+-- Purge des réservations expirées
+create or replace function public.sweep_reservations()
+returns integer
+language sql
+security definer
+set search_path = public
+as $$
+    delete from reservation_tokens where first_reserved_at <= now() - interval '1 hour';
+
+    with swept as (
+        delete from stock_reservations where expires_at <= now() returning 1
+    )
+    select count(*)::integer from swept;
+$$;
+
+-- Réserve les lignes du panier (remplace les réservations précédentes du même panier)
+-- p_items : [{"product_id": 1, "quantity": 2}, ...]
+-- Une ligne n'est réservée que si toute la quantité est disponible ; la
+-- réservation elle-même est plafonnée à 10 unités.
+drop function if exists public.reserve_cart(text, jsonb, integer);
+
+create or replace function public.reserve_cart(p_cart_token text, p_items jsonb)
+returns table (product_id bigint, requested integer, available integer, reserved boolean, expires_at timestamptz)
+language plpgsql
+security definer
+set search_path = public
+as $$
+#variable_conflict use_column
+declare
+    v_item      record;
+    v_available integer;
+    v_expires   timestamptz := now() + interval '10 minutes';
+    v_first     timestamptz;
+begin
+    if jsonb_array_length(coalesce(p_items, '[]'::jsonb)) > 50 then
+        raise exception 'Trop de produits à réserver' using errcode = '22023';
+    end if;
+
+    perform public.sweep_reservations();
+
+    select t.first_reserved_at into v_first from reservation_tokens t where t.cart_token = p_cart_token;
+    if not found then
+        -- Comptage des nouveaux jetons sérialisé (verrou de transaction)
+        perform pg_advisory_xact_lock(hashtext('reserve_cart_new_token'));
+        if (select count(*) from reservation_tokens t
+            where t.first_reserved_at > now() - interval '1 minute') >= 30 then
+            raise exception 'Trop de nouvelles réservations, réessayez plus tard'
+                using errcode = 'P0001', hint = 'reservation_limited';
+        end if;
+        insert into reservation_tokens (cart_token) values (p_cart_token)
+        on conflict do nothing;
+    elsif v_first <= now() - interval '30 minutes' then
+        raise exception 'Durée maximale de réservation atteinte'
+            using errcode = 'P0001', hint = 'reservation_limited';
+    end if;
+
+    delete from stock_reservations r where r.cart_token = p_cart_token;
+
+    -- Verrou des produits dans l'ordre des IDs : pas d'interblocage entre paniers
+    for v_item in
+        select (i->>'product_id')::bigint                as product_id,
+               sum((i->>'quantity')::integer)::integer as quantity
+        from jsonb_array_elements(p_items) as i
+        group by 1
+        order by 1
+    loop
+        if v_item.quantity is null or v_item.quantity <= 0 then
+            raise exception 'Quantité invalide pour le produit %', v_item.product_id
+                using errcode = '22023';
+        end if;
+
+        select p.stock - public.reserved_quantity(p.id, p_cart_token) into v_available
+        from products p where p.id = v_item.product_id
+        for update of p;
+
+        v_available := greatest(coalesce(v_available, 0), 0);
+        if v_available >= v_item.quantity then
+            insert into stock_reservations (cart_token, product_id, quantity, expires_at)
+            values (p_cart_token, v_item.product_id, least(v_item.quantity, 10), v_expires);
+        end if;
+
+        product_id := v_item.product_id;
+        requested := v_item.quantity;
+        available := v_available;
+        reserved := v_available >= v_item.quantity;
+        expires_at := v_expires;
+        return next;
+    end loop;
+end;
+$$;
+
+create or replace function public.release_cart(p_cart_token text)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+    delete from stock_reservations where cart_token = p_cart_token;
+$$;
+
+-- place_order tient compte des réservations des autres paniers et consomme
+-- celles du panier commandé (remplace la version du journal de stock)
+drop function if exists public.place_order(bigint, jsonb, numeric);
+
+create or replace function public.place_order(p_client_id bigint, p_items jsonb, p_total numeric,
+                                              p_cart_token text default null)
+returns public.orders
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_order     orders;
+    v_item      record;
+    v_available integer;
+    v_price     numeric;
+    v_total     numeric := 0;
+begin
+    if jsonb_array_length(coalesce(p_items, '[]'::jsonb)) = 0 then
+        raise exception 'Commande vide' using errcode = '22023';
+    end if;
+
+    insert into orders (client_id, total, status, viewed)
+    values (p_client_id, 0, 'en_cours', false)
+    returning * into v_order;
+
+    for v_item in
+        select (i->>'product_id')::bigint                as product_id,
+               sum((i->>'quantity')::integer)::integer as quantity
+        from jsonb_array_elements(p_items) as i
+        group by 1
+        order by 1
+    loop
+        -- Quantités de l'appelant (anonyme) : une quantité négative ferait entrer du stock
+        if v_item.quantity is null or v_item.quantity <= 0 then
+            raise exception 'Quantité invalide pour le produit %', v_item.product_id
+                using errcode = '22023';
+        end if;
+
+        -- Prix lu sous le verrou : le prix et le total envoyés par l'appelant sont ignorés
+        select p.stock - public.reserved_quantity(p.id, p_cart_token), p.price into v_available, v_price
+        from products p where p.id = v_item.product_id
+        for update of p;
+
+        if v_available is null or v_available < v_item.quantity then
+            raise exception 'Stock insuffisant pour le produit %', v_item.product_id
+                using errcode = 'P0001', hint = 'insufficient_stock';
+        end if;
+
+        insert into order_items (order_id, product_id, quantity, price)
+        values (v_order.id, v_item.product_id, v_item.quantity, v_price);
+        v_total := v_total + v_price * v_item.quantity;
+
+        insert into inventory_ledger (product_id, delta, reason, order_id)
+        values (v_item.product_id, -v_item.quantity, 'order', v_order.id);
+    end loop;
+
+    if p_cart_token is not null then
+        delete from stock_reservations where cart_token = p_cart_token;
+    end if;
+
+    update orders set total = v_total where id = v_order.id returning * into v_order;
+
+    return v_order;
+end;
+$$;
+
+grant execute on function public.active_reservations() to anon, authenticated;
+grant execute on function public.reserve_cart(text, jsonb) to anon, authenticated;
+grant execute on function public.release_cart(text) to anon, authenticated;
+grant execute on function public.place_order(bigint, jsonb, numeric, text) to anon, authenticated;
+
+-- Purge périodique (si pg_cron est activé sur le projet)
+do $$
+begin
+    if exists (select 1 from pg_extension where extname = 'pg_cron') then
+        perform cron.schedule('sweep-reservations', '* * * * *', 'select public.sweep_reservations()');
+    end if;
+end;
+$$;
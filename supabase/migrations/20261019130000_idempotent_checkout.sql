@@ -0,0 +1,100 @@
+-- =============================================================================
+-- Validation de commande idempotente - Sensations by Arda J
+--
+-- Chaque formulaire de checkout porte une clé d'idempotence (utils/session.py,
+-- get_checkout_key) enregistrée avec la commande. Un double clic ou un nouvel
+-- essai après une coupure réseau rejoue place_order avec la même clé : la
+-- commande existante est renvoyée, sans nouvelles sorties de stock.
+--
+-- place_order renvoie désormais la commande en jsonb, avec "replayed" à true
+-- si elle existait déjà (l'application n'envoie pas de second email).
+-- =============================================================================
+
+alter table public.orders add column if not exists idempotency_key text;
+
+-- Plusieurs NULL restent permis (commandes sans clé)
+create unique index if not exists orders_idempotency_key_key on public.orders (idempotency_key);
+
+drop function if exists public.place_order(bigint, jsonb, numeric, text);
+
+create or replace function public.place_order(p_client_id bigint, p_items jsonb, p_total numeric,
+                                              p_cart_token text default null,
+                                              p_idempotency_key text default null)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_order     orders;
+    v_item      record;
+    v_available integer;
+    v_price     numeric;
+    v_total     numeric := 0;
+begin
+    -- Rejeu : la commande de cette clé existe déjà
+    if p_idempotency_key is not null then
+        select * into v_order from orders where idempotency_key = p_idempotency_key;
+        if found then
+            return to_jsonb(v_order) || jsonb_build_object('replayed', true);
+        end if;
+    end if;
+
+    if jsonb_array_length(coalesce(p_items, '[]'::jsonb)) = 0 then
+        raise exception 'Commande vide' using errcode = '22023';
+    end if;
+
+    -- Deux validations simultanées : la seconde attend la première sur l'index
+    -- unique, puis renvoie sa commande
+    insert into orders (client_id, total, status, viewed, idempotency_key)
+    values (p_client_id, 0, 'en_cours', false, p_idempotency_key)
+    on conflict (idempotency_key) do nothing
+    returning * into v_order;
+
+    if not found then
+        select * into v_order from orders where idempotency_key = p_idempotency_key;
+        return to_jsonb(v_order) || jsonb_build_object('replayed', true);
+    end if;
+
+    for v_item in
+        select (i->>'product_id')::bigint                as product_id,
+               sum((i->>'quantity')::integer)::integer as quantity
+        from jsonb_array_elements(p_items) as i
+        group by 1
+        order by 1
+    loop
+        -- Quantités de l'appelant (anonyme) : une quantité négative ferait entrer du stock
+        if v_item.quantity is null or v_item.quantity <= 0 then
+            raise exception 'Quantité invalide pour le produit %', v_item.product_id
+                using errcode = '22023';
+        end if;
+
+        -- Prix lu sous le verrou : le prix et le total envoyés par l'appelant sont ignorés
+        select p.stock - public.reserved_quantity(p.id, p_cart_token), p.price into v_available, v_price
+        from products p where p.id = v_item.product_id
+        for update of p;
+
+        if v_available is null or v_available < v_item.quantity then
+            raise exception 'Stock insuffisant pour le produit %', v_item.product_id
+                using errcode = 'P0001', hint = 'insufficient_stock';
+        end if;
+
+        insert into order_items (order_id, product_id, quantity, price)
+        values (v_order.id, v_item.product_id, v_item.quantity, v_price);
+        v_total := v_total + v_price * v_item.quantity;
+
+        insert into inventory_ledger (product_id, delta, reason, order_id)
+        values (v_item.product_id, -v_item.quantity, 'order', v_order.id);
+    end loop;
+
+    if p_cart_token is not null then
+        delete from stock_reservations where cart_token = p_cart_token;
+    end if;
+
+    update orders set total = v_total where id = v_order.id returning * into v_order;
+
+    return to_jsonb(v_order) || jsonb_build_object('replayed', false);
+end;
+$$;
+
+grant execute on function public.place_order(bigint, jsonb, numeric, text, text) to anon, authenticated;
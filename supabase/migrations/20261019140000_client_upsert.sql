@@ -0,0 +1,159 @@
+-- =============================================================================
+-- Client enregistré par upsert sur l'email - Sensations by Arda J
+--
+-- Le checkout ne fait plus « chercher par email puis créer » : le client est
+-- retrouvé ou créé en une requête (index unique sur l'email), et place_order
+-- accepte directement les coordonnées (p_client) pour qu'une commande
+-- complète, client compris, ne coûte qu'un aller-retour.
+--
+-- N'importe qui peut passer commande avec n'importe quel email : les
+-- coordonnées d'un client existant ne sont jamais écrasées par ce chemin
+-- anonyme (seuls les champs vides sont complétés). Les coordonnées de
+-- livraison saisies sont enregistrées sur la commande elle-même.
+-- =============================================================================
+
+-- Coordonnées de livraison propres à chaque commande
+alter table public.orders add column if not exists delivery_first_name text;
+alter table public.orders add column if not exists delivery_last_name text;
+alter table public.orders add column if not exists delivery_phone text;
+alter table public.orders add column if not exists delivery_address text;
+
+-- Commandes existantes : coordonnées de leur client, avant le dédoublonnage
+update public.orders o
+set delivery_first_name = c.first_name,
+    delivery_last_name  = c.last_name,
+    delivery_phone      = c.phone,
+    delivery_address    = c.address
+from public.clients c
+where o.client_id = c.id
+  and o.delivery_address is null;
+
+-- Doublons existants : les commandes passent au client le plus récent (coordonnées à jour)
+with ranked as (
+    select id, max(id) over (partition by email) as keep_id
+    from public.clients
+)
+update public.orders o
+set client_id = r.keep_id
+from ranked r
+where o.client_id = r.id
+  and r.id <> r.keep_id;
+
+delete from public.clients c
+using public.clients k
+where c.email = k.email
+  and c.id < k.id;
+
+create unique index if not exists clients_email_key on public.clients (email);
+
+-- Paramètres nommés (PostgREST) : le client est donné par p_client_id ou par
+-- ses coordonnées p_client {first_name, last_name, email, phone, address}
+drop function if exists public.place_order(bigint, jsonb, numeric, text, text);
+
+create or replace function public.place_order(p_items jsonb, p_total numeric,
+                                              p_client_id bigint default null,
+                                              p_cart_token text default null,
+                                              p_idempotency_key text default null,
+                                              p_client jsonb default null)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_order     orders;
+    v_client_id bigint := p_client_id;
+    v_item      record;
+    v_available integer;
+    v_price     numeric;
+    v_total     numeric := 0;
+begin
+    -- Rejeu : la commande de cette clé existe déjà
+    if p_idempotency_key is not null then
+        select * into v_order from orders where idempotency_key = p_idempotency_key;
+        if found then
+            return to_jsonb(v_order) || jsonb_build_object('replayed', true);
+        end if;
+    end if;
+
+    if p_client is not null then
+        insert into clients (first_name, last_name, email, phone, address)
+        values (p_client->>'first_name', p_client->>'last_name', p_client->>'email',
+                p_client->>'phone', p_client->>'address')
+        on conflict (email) do update
+            set first_name = coalesce(clients.first_name, excluded.first_name),
+                last_name  = coalesce(clients.last_name, excluded.last_name),
+                phone      = coalesce(clients.phone, excluded.phone),
+                address    = coalesce(clients.address, excluded.address)
+        returning id into v_client_id;
+    else
+        select jsonb_build_object('first_name', first_name, 'last_name', last_name,
+                                  'phone', phone, 'address', address)
+        into p_client
+        from clients where id = v_client_id;
+    end if;
+
+    if v_client_id is null then
+        raise exception 'Client manquant' using errcode = '22023';
+    end if;
+
+    if jsonb_array_length(coalesce(p_items, '[]'::jsonb)) = 0 then
+        raise exception 'Commande vide' using errcode = '22023';
+    end if;
+
+    -- Deux validations simultanées : la seconde attend la première sur l'index
+    -- unique, puis renvoie sa commande
+    insert into orders (client_id, total, status, viewed, idempotency_key,
+                        delivery_first_name, delivery_last_name, delivery_phone, delivery_address)
+    values (v_client_id, 0, 'en_cours', false, p_idempotency_key,
+            p_client->>'first_name', p_client->>'last_name', p_client->>'phone', p_client->>'address')
+    on conflict (idempotency_key) do nothing
+    returning * into v_order;
+
+    if not found then
+        select * into v_order from orders where idempotency_key = p_idempotency_key;
+        return to_jsonb(v_order) || jsonb_build_object('replayed', true);
+    end if;
+
+    for v_item in
+        select (i->>'product_id')::bigint                as product_id,
+               sum((i->>'quantity')::integer)::integer as quantity
+        from jsonb_array_elements(p_items) as i
+        group by 1
+        order by 1
+    loop
+        -- Quantités de l'appelant (anonyme) : une quantité négative ferait entrer du stock
+        if v_item.quantity is null or v_item.quantity <= 0 then
+            raise exception 'Quantité invalide pour le produit %', v_item.product_id
+                using errcode = '22023';
+        end if;
+
+        -- Prix lu sous le verrou : le prix et le total envoyés par l'appelant sont ignorés
+        select p.stock - public.reserved_quantity(p.id, p_cart_token), p.price into v_available, v_price
+        from products p where p.id = v_item.product_id
+        for update of p;
+
+        if v_available is null or v_available < v_item.quantity then
+            raise exception 'Stock insuffisant pour le produit %', v_item.product_id
+                using errcode = 'P0001', hint = 'insufficient_stock';
+        end if;
+
+        insert into order_items (order_id, product_id, quantity, price)
+        values (v_order.id, v_item.product_id, v_item.quantity, v_price);
+        v_total := v_total + v_price * v_item.quantity;
+
+        insert into inventory_ledger (product_id, delta, reason, order_id)
+        values (v_item.product_id, -v_item.quantity, 'order', v_order.id);
+    end loop;
+
+    if p_cart_token is not null then
+        delete from stock_reservations where cart_token = p_cart_token;
+    end if;
+
+    update orders set total = v_total where id = v_order.id returning * into v_order;
+
+    return to_jsonb(v_order) || jsonb_build_object('replayed', false);
+end;
+$$;
+
+grant execute on function public.place_order(jsonb, numeric, bigint, text, text, jsonb) to anon, authenticated;
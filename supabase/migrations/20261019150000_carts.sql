@@ -0,0 +1,62 @@
+-- =============================================================================
+-- Paniers enregistrés côté serveur - Sensations by Arda J
+--
+-- Copie des paniers de session (utils/cart_store.py, CART_STORE=supabase),
+-- identifiés par le jeton du panier : une autre réplique ou un lien de reprise
+-- retrouve le panier, et les paniers abandonnés peuvent être analysés. Le
+-- jeton est le seul accès au panier : il n'est pas mis dans l'URL des pages.
+--
+-- RPC côté application :
+--   save_carts(p_carts)  écriture par lots [{"token": "...", "items": {...}}]
+--   load_cart(p_token)   contenu d'un panier (null s'il n'existe pas)
+-- =============================================================================
+
+create table if not exists public.carts (
+    token       text primary key,
+    items       jsonb not null default '{}'::jsonb,
+    item_count  integer not null default 0,
+    created_at  timestamptz not null default now(),
+    updated_at  timestamptz not null default now()
+);
+
+-- Paniers abandonnés : non vides et inactifs depuis un moment
+create index if not exists carts_updated_at_idx on public.carts (updated_at) where item_count > 0;
+
+-- Accès uniquement via les fonctions security definer ci-dessous (le jeton fait office de clé)
+alter table public.carts enable row level security;
+
+create or replace function public.save_carts(p_carts jsonb)
+returns integer
+language sql
+security definer
+set search_path = public
+as $$
+    with saved as (
+        insert into carts (token, items, item_count, updated_at)
+        select c->>'token',
+               coalesce(c->'items', '{}'::jsonb),
+               coalesce((select sum((v->>'quantity')::integer)
+                         from jsonb_each(coalesce(c->'items', '{}'::jsonb)) as e(k, v)), 0),
+               now()
+        from jsonb_array_elements(p_carts) as c
+        on conflict (token) do update
+            set items      = excluded.items,
+                item_count = excluded.item_count,
+                updated_at = excluded.updated_at
+        returning 1
+    )
+    select count(*)::integer from saved;
+$$;
+
+create or replace function public.load_cart(p_token text)
+returns jsonb
+language sql
+stable
+security definer
+set search_path = public
+as $$
+    select items from carts where token = p_token;
+$$;
+
+grant execute on function public.save_carts(jsonb) to anon, authenticated;
+grant execute on function public.load_cart(text) to anon, authenticated;
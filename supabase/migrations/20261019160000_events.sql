@@ -0,0 +1,29 @@
+-- =============================================================================
+-- Événements du parcours client - Sensations by Arda J
+--
+-- Puits EVENT_SINK=supabase de utils/events.py : les événements (visite, fiche
+-- produit, ajout au panier, checkout, commande...) sont insérés par lots et
+-- alimentent le tunnel de conversion de la page Analytics.
+-- =============================================================================
+
+create table if not exists public.events (
+    id          bigint generated always as identity primary key,
+    created_at  timestamptz not null default now(),
+    session     text not null,
+    name        text not null,
+    product_id  bigint,
+    value       numeric,
+    props       jsonb
+);
+
+create index if not exists events_created_at_idx on public.events (created_at);
+create index if not exists events_session_idx on public.events (session, name);
+
+-- Insertion seule pour la clé anonyme ; lecture réservée aux administrateurs
+alter table public.events enable row level security;
+
+drop policy if exists events_insert on public.events;
+create policy events_insert on public.events for insert to anon, authenticated with check (true);
+
+drop policy if exists events_select on public.events;
+create policy events_select on public.events for select to authenticated using (true);
@@ -0,0 +1,525 @@
+"""
+Générateur de données synthétiques - Sensations by Arda J
+Produits, images, clients et commandes (avec saisonnalité) pour les tests de charge.
+
+Usage :
+    python -m tools.generate_data --products 10000 --clients 50000 --orders 1000000 --backend local --out data/seed
+    python -m tools.generate_data --products 2000 --clients 5000 --orders 20000 --backend supabase
+
+Le backend "local" écrit des fichiers JSON Lines (un objet par ligne) au format
+des réponses PostgREST ; le backend "supabase" insère par lots via l'API.
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import unicodedata
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+# =============================================================================
+# VOCABULAIRE
+# =============================================================================
+
+PRODUCT_TYPES = ["Homme", "Femme", "Mixte"]
+TYPE_WEIGHTS = [0.35, 0.45, 0.20]
+
+NAME_PREFIXES = ["Eau de Parfum", "Eau de Toilette", "Extrait", "Essence", "Huile Parfumée", "Brume", "Élixir"]
+NAME_WORDS = [
+    "Élégance", "Nuit d'Or", "Ambre Royal", "Santal Sacré", "Oud Mystique", "Rose de Saba",
+    "Vanille Noire", "Jasmin Étoilé", "Cuir Fauve", "Musc Blanc", "Fleur d'Oranger", "Ylang Soleil",
+    "Bois d'Ébène", "Encens Doré", "Iris Poudré", "Patchouli Velours", "Cèdre Atlas", "Néroli Frais",
+    "Vétiver Impérial", "Tubéreuse", "Safran Précieux", "Figue Verte", "Café Épicé", "Baobab",
+]
+NOTES = [
+    "bergamote", "citron", "poivre rose", "cardamome", "rose", "jasmin", "ylang-ylang", "iris",
+    "fleur d'oranger", "tubéreuse", "oud", "santal", "cèdre", "vétiver", "patchouli", "ambre",
+    "vanille", "musc", "benjoin", "encens", "cuir", "tonka", "safran", "café",
+]
+
+FIRST_NAMES = [
+    "Aïcha", "Fatou", "Mariam", "Awa", "Nadège", "Grâce", "Ruth", "Esther", "Prisca", "Léa",
+    "Moussa", "Ibrahim", "Kofi", "Yao", "Serge", "Landry", "Junior", "Rodrigue", "Franck", "Hervé",
+]
+LAST_NAMES = [
+    "Ndong", "Obame", "Mba", "Nzé", "Ondo", "Koné", "Traoré", "Diallo", "Ouattara", "Kouassi",
+    "Mensah", "Adjovi", "Sow", "Ba", "Diop", "Nguema", "Mintsa", "Ella", "Bongo", "Moussavou",
+]
+CITIES = ["Libreville", "Port-Gentil", "Franceville", "Oyem", "Abidjan", "Dakar", "Cotonou", "Lomé"]
+PHONE_PREFIXES = {"Libreville": "+241 07", "Port-Gentil": "+241 06", "Franceville": "+241 07",
+                  "Oyem": "+241 06", "Abidjan": "+225 07", "Dakar": "+221 77",
+                  "Cotonou": "+229 97", "Lomé": "+228 90"}
+
+# Facteur par jour de semaine (lundi = 0) : les week-ends vendent davantage
+WEEKDAY_FACTORS = [0.80, 0.85, 0.90, 1.00, 1.15, 1.30, 1.00]
+
+# Heure de commande : creux la nuit, pic en soirée
+HOUR_WEIGHTS = np.array([1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 9, 10, 9, 8, 8, 9, 11, 13, 14, 13, 10, 6, 3], dtype=float)
+
+# =============================================================================
+# GÉNÉRATION
+# =============================================================================
+
+
+def _gaussian_peak(day_of_year: int, center: int, width: float) -> float:
+    """Pic saisonnier gaussien autour d'un jour de l'année (gère le passage d'année)"""
+    distance = min(abs(day_of_year - center), 365 - abs(day_of_year - center))
+    return math.exp(-((distance / width) ** 2))
+
+
+def seasonal_weights(start: datetime, days: int) -> np.ndarray:
+    """
+    Calcule le poids relatif de chaque jour de la période
+
+    Combine une tendance de croissance, la semaine (week-end), et les pics
+    commerciaux : Saint-Valentin, fête des mères (fin mai) et fêtes de fin d'année.
+
+    Returns:
+        Tableau normalisé (somme = 1) de longueur `days`
+    """
+    weights = np.empty(days)
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        doy = day.timetuple().tm_yday
+        trend = 0.7 + 0.6 * offset / max(days - 1, 1)
+        season = (1.0
+                  + 0.8 * _gaussian_peak(doy, 42, 5)      # avant le 14 février
+                  + 0.5 * _gaussian_peak(doy, 148, 6)     # fête des mères
+                  + 1.2 * _gaussian_peak(doy, 352, 12))   # fêtes de fin d'année
+        weights[offset] = trend * season * WEEKDAY_FACTORS[day.weekday()]
+    return weights / weights.sum()
+
+
+def generate_products(count: int, rng: np.random.Generator, images_per_product: int = 2,
+                      days: int = 365) -> List[Dict]:
+    """
+    Génère un catalogue de produits au format PostgREST (`*, product_images(*)`)
+
+    Args:
+        count: Nombre de produits
+        rng: Générateur aléatoire (reproductible)
+        images_per_product: Nombre d'images par produit
+        days: Ancienneté maximale du catalogue
+
+    Returns:
+        Liste de produits avec leurs images
+    """
+    now = datetime.now(timezone.utc)
+    products = []
+    image_id = 1
+
+    for product_id in range(1, count + 1):
+        name = f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_WORDS)}"
+        if product_id > len(NAME_PREFIXES) * len(NAME_WORDS):
+            name = f"{name} N°{product_id}"
+
+        notes = rng.choice(NOTES, size=3, replace=False)
+        description = (f"Un sillage {rng.choice(['lumineux', 'envoûtant', 'boisé', 'floral', 'oriental'])} "
+                       f"aux notes de {notes[0]}, {notes[1]} et {notes[2]}.")
+
+        # Prix en FCFA arrondis à 500, distribution log-normale (beaucoup de 15-40k, quelques pièces rares)
+        price = float(min(250_000, max(5_000, round(rng.lognormal(10.2, 0.5) / 500) * 500)))
+        # Stock : quelques ruptures, beaucoup de petits stocks
+        stock = int(0 if rng.random() < 0.05 else rng.geometric(0.08))
+        created_at = now - timedelta(days=float(rng.uniform(0, days)))
+
+        images = []
+        for position in range(images_per_product):
+            images.append({
+                'id': image_id,
+                'product_id': product_id,
+                'url': f"https://picsum.photos/seed/senteur-{product_id}-{position}/600/800",
+                'created_at': created_at.isoformat()
+            })
+            image_id += 1
+
+        products.append({
+            'id': product_id,
+            'name': name,
+            'type': str(rng.choice(PRODUCT_TYPES, p=TYPE_WEIGHTS)),
+            'description': description,
+            'price': price,
+            'stock': stock,
+            'created_at': created_at.isoformat(),
+            'product_images': images
+        })
+
+    return products
+
+
+def _ascii(text: str) -> str:
+    """Supprime les accents (Aïcha -> aicha) pour construire des emails valides"""
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+
+
+def generate_clients(count: int, rng: np.random.Generator, days: int = 365) -> List[Dict]:
+    """
+    Génère des clients avec des emails uniques
+
+    Args:
+        count: Nombre de clients
+        rng: Générateur aléatoire
+        days: Ancienneté maximale
+
+    Returns:
+        Liste de clients
+    """
+    now = datetime.now(timezone.utc)
+    clients = []
+
+    for client_id in range(1, count + 1):
+        first_name = str(rng.choice(FIRST_NAMES))
+        last_name = str(rng.choice(LAST_NAMES))
+        city = str(rng.choice(CITIES))
+        digits = " ".join(f"{int(rng.integers(0, 100)):02d}" for _ in range(3))
+
+        clients.append({
+            'id': client_id,
+            'first_name': first_name,
+            'last_name': last_name,
+            'email': f"{_ascii(first_name)}.{_ascii(last_name)}.{client_id}@example.com",
+            'phone': f"{PHONE_PREFIXES[city]} {digits}",
+            'address': f"{int(rng.integers(1, 300))} rue des Senteurs, {city}",
+            'created_at': (now - timedelta(days=float(rng.uniform(0, days)))).isoformat()
+        })
+
+    return clients
+
+
+def generate_orders(count: int, products: List[Dict], client_ids: List[int],
+                    rng: np.random.Generator, days: int = 365) -> Iterator[Dict]:
+    """
+    Génère des commandes réparties selon la saisonnalité (générateur, faible mémoire)
+
+    La popularité des produits suit une loi de Zipf : quelques best-sellers
+    concentrent l'essentiel des ventes, comme dans un vrai catalogue.
+
+    Args:
+        count: Nombre total de commandes
+        products: Catalogue (pour les prix et la popularité)
+        client_ids: IDs clients disponibles
+        rng: Générateur aléatoire
+        days: Profondeur de l'historique en jours
+
+    Yields:
+        Commandes avec leurs `order_items`
+    """
+    now = datetime.now(timezone.utc)
+    start = (now - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    per_day = rng.multinomial(count, seasonal_weights(start, days))
+    hour_p = HOUR_WEIGHTS / HOUR_WEIGHTS.sum()
+
+    popularity = 1.0 / np.arange(1, len(products) + 1) ** 1.1
+    rng.shuffle(popularity)
+    popularity /= popularity.sum()
+
+    client_ids = np.asarray(client_ids)
+    order_id = 1
+
+    for offset, n_orders in enumerate(per_day):
+        if n_orders == 0:
+            continue
+
+        day = start + timedelta(days=offset)
+        age_days = days - 1 - offset
+        hours = rng.choice(24, size=n_orders, p=hour_p)
+        minutes = rng.integers(0, 60, size=n_orders)
+        n_items = np.minimum(rng.geometric(0.55, size=n_orders), 5)
+        buyers = rng.choice(client_ids, size=n_orders)
+        # Un seul tirage pondéré par jour (rng.choice avec p est coûteux sur 10k produits)
+        picks = rng.choice(len(products), size=int(n_items.sum()), p=popularity)
+        bounds = np.concatenate(([0], np.cumsum(n_items)))
+
+        for k in range(n_orders):
+            created_at = day + timedelta(hours=int(hours[k]), minutes=int(minutes[k]))
+            if created_at > now:
+                created_at = now - timedelta(minutes=int(rng.integers(1, 600)))
+
+            picked = dict.fromkeys(picks[bounds[k]:bounds[k + 1]].tolist())
+            items = []
+            total = 0.0
+            for idx in picked:
+                product = products[idx]
+                quantity = int(min(rng.geometric(0.7), 4))
+                items.append({
+                    'order_id': order_id,
+                    'product_id': product['id'],
+                    'quantity': quantity,
+                    'price': product['price']
+                })
+                total += product['price'] * quantity
+
+            # Les commandes anciennes sont livrées, les récentes encore en cours
+            roll = rng.random()
+            if roll < 0.05:
+                status = 'annulee'
+            elif age_days > 3:
+                status = 'livree'
+            else:
+                status = 'en_cours'
+
+            yield {
+                'id': order_id,
+                'client_id': int(buyers[k]),
+                'total': total,
+                'status': status,
+                'viewed': age_days > 0 or roll > 0.5,
+                'created_at': created_at.isoformat(),
+                'order_items': items
+            }
+            order_id += 1
+
+
+def nest_orders(orders: List[Dict], products: List[Dict], clients: List[Dict]) -> List[Dict]:
+    """
+    Convertit des commandes générées au format `*, clients(*), order_items(*, products(*))`
+
+    C'est la forme renvoyée par `Order.get_all` : utile pour les benchmarks et le
+    backend local.
+    """
+    products_by_id = {p['id']: {k: v for k, v in p.items() if k != 'product_images'} for p in products}
+    clients_by_id = {c['id']: c for c in clients}
+
+    nested = []
+    for order in orders:
+        nested.append({
+            **order,
+            'clients': clients_by_id.get(order['client_id'], {}),
+            'order_items': [
+                {**item, 'products': products_by_id.get(item['product_id'], {})}
+                for item in order['order_items']
+            ]
+        })
+    return nested
+
+
+def render_product_image(name: str, seed: int, size: tuple = (600, 800)) -> bytes:
+    """
+    Dessine une image de flacon (dégradé + silhouette) en JPEG
+
+    Args:
+        name: Nom du produit (écrit sous le flacon)
+        seed: Graine pour les couleurs
+        size: Dimensions (largeur, hauteur)
+
+    Returns:
+        Contenu JPEG
+    """
+    from PIL import Image, ImageDraw
+
+    rng = np.random.default_rng(seed)
+    width, height = size
+    top = tuple(int(c) for c in rng.integers(10, 60, size=3))
+    bottom = tuple(int(c) for c in rng.integers(80, 200, size=3))
+
+    image = Image.new("RGB", size)
+    draw = ImageDraw.Draw(image)
+    for y in range(height):
+        t = y / height
+        draw.line([(0, y), (width, y)], fill=tuple(int(a + (b - a) * t) for a, b in zip(top, bottom)))
+
+    # Silhouette du flacon
+    draw.rounded_rectangle([width * 0.3, height * 0.35, width * 0.7, height * 0.8], radius=30,
+                           fill=(212, 175, 55), outline=(255, 215, 0), width=4)
+    draw.rectangle([width * 0.42, height * 0.25, width * 0.58, height * 0.35], fill=(40, 40, 40))
+    draw.text((width * 0.1, height * 0.88), name[:40], fill=(255, 252, 252))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+# =============================================================================
+# ÉCRITURE
+# =============================================================================
+
+
+def _write_jsonl(path: Path, rows) -> int:
+    """Écrit des lignes JSON et retourne le nombre de lignes écrites"""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write('\n')
+            written += 1
+    return written
+
+
+def load_jsonl(path: Path) -> List[Dict]:
+    """Relit un fichier JSON Lines produit par ce générateur"""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_local(out_dir: Path, products: List[Dict], clients: List[Dict], orders: Iterator[Dict],
+                with_images: bool = False) -> Dict[str, int]:
+    """
+    Écrit le jeu de données dans un dossier local
+
+    Fichiers : products.jsonl, clients.jsonl, orders.jsonl (et images/ si demandé)
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if with_images:
+        images_dir = out_dir / "images"
+        images_dir.mkdir(exist_ok=True)
+        for product in products:
+            for image in product['product_images']:
+                filename = f"{product['id']}_{image['id']}.jpg"
+                (images_dir / filename).write_bytes(render_product_image(product['name'], image['id']))
+                image['url'] = f"images/{filename}"
+
+    return {
+        'products': _write_jsonl(out_dir / "products.jsonl", products),
+        'clients': _write_jsonl(out_dir / "clients.jsonl", clients),
+        'orders': _write_jsonl(out_dir / "orders.jsonl", orders),
+    }
+
+
+def _batched(rows, size: int):
+    """Découpe un itérable en lots de taille `size`"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_supabase(products: List[Dict], clients: List[Dict], orders: Iterator[Dict],
+                   batch_size: int = 500, upload_images: bool = False) -> Dict[str, int]:
+    """
+    Insère le jeu de données dans Supabase par lots
+
+    Utilise SUPABASE_SERVICE_KEY si présente (contourne les RLS), sinon SUPABASE_KEY.
+    Les IDs générés localement sont remappés sur ceux attribués par la base.
+    """
+    from supabase import create_client
+
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+    if not url or not key:
+        raise SystemExit("❌ SUPABASE_URL et SUPABASE_SERVICE_KEY (ou SUPABASE_KEY) sont requis")
+
+    supabase = create_client(url, key)
+    counts = {'products': 0, 'product_images': 0, 'clients': 0, 'orders': 0, 'order_items': 0}
+
+    # Produits puis images
+    product_ids = {}
+    for batch in _batched(products, batch_size):
+        rows = [{k: v for k, v in p.items() if k not in ('id', 'product_images')} for p in batch]
+        response = supabase.table('products').insert(rows).execute()
+        for local, remote in zip(batch, response.data):
+            product_ids[local['id']] = remote['id']
+        counts['products'] += len(response.data)
+        print(f"  ✓ {counts['products']} produits")
+
+    images = []
+    for product in products:
+        for image in product['product_images']:
+            image_url = image['url']
+            if upload_images:
+                path = f"seed/{uuid.uuid4()}.jpg"
+                supabase.storage.from_('product-images').upload(
+                    path=path,
+                    file=render_product_image(product['name'], image['id']),
+                    file_options={"content-type": "image/jpeg"}
+                )
+                image_url = supabase.storage.from_('product-images').get_public_url(path)
+            images.append({'product_id': product_ids[product['id']], 'url': image_url})
+
+    for batch in _batched(images, batch_size):
+        supabase.table('product_images').insert(batch).execute()
+        counts['product_images'] += len(batch)
+
+    # Clients
+    client_ids = {}
+    for batch in _batched(clients, batch_size):
+        rows = [{k: v for k, v in c.items() if k != 'id'} for c in batch]
+        response = supabase.table('clients').insert(rows).execute()
+        for local, remote in zip(batch, response.data):
+            client_ids[local['id']] = remote['id']
+        counts['clients'] += len(response.data)
+    print(f"  ✓ {counts['clients']} clients")
+
+    # Commandes puis lignes de commande
+    for batch in _batched(orders, batch_size):
+        rows = [{
+            'client_id': client_ids[o['client_id']],
+            'total': o['total'],
+            'status': o['status'],
+            'viewed': o['viewed'],
+            'created_at': o['created_at']
+        } for o in batch]
+        response = supabase.table('orders').insert(rows).execute()
+
+        items = []
+        for local, remote in zip(batch, response.data):
+            for item in local['order_items']:
+                items.append({
+                    'order_id': remote['id'],
+                    'product_id': product_ids[item['product_id']],
+                    'quantity': item['quantity'],
+                    'price': item['price']
+                })
+        for items_batch in _batched(items, batch_size * 2):
+            supabase.table('order_items').insert(items_batch).execute()
+            counts['order_items'] += len(items_batch)
+
+        counts['orders'] += len(response.data)
+        if counts['orders'] % (batch_size * 20) < batch_size:
+            print(f"  ✓ {counts['orders']} commandes")
+
+    return counts
+
+# =============================================================================
+# CLI
+# =============================================================================
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Génère des données synthétiques pour Sensations by Arda J")
+    parser.add_argument('--products', type=int, default=200, help="Nombre de produits")
+    parser.add_argument('--clients', type=int, default=1000, help="Nombre de clients")
+    parser.add_argument('--orders', type=int, default=5000, help="Nombre de commandes")
+    parser.add_argument('--days', type=int, default=365, help="Profondeur de l'historique (jours)")
+    parser.add_argument('--images', type=int, default=2, help="Images par produit")
+    parser.add_argument('--seed', type=int, default=42, help="Graine aléatoire (reproductibilité)")
+    parser.add_argument('--backend', choices=['local', 'supabase'], default='local')
+    parser.add_argument('--out', type=Path, default=Path('data/seed'), help="Dossier de sortie (backend local)")
+    parser.add_argument('--render-images', action='store_true',
+                        help="Dessine de vraies images JPEG (local: fichiers, supabase: upload Storage)")
+    parser.add_argument('--batch-size', type=int, default=500, help="Taille des lots d'insertion Supabase")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+
+    print(f"🧪 Génération : {args.products} produits, {args.clients} clients, {args.orders} commandes "
+          f"sur {args.days} jours (graine {args.seed})")
+
+    products = generate_products(args.products, rng, images_per_product=args.images, days=args.days)
+    clients = generate_clients(args.clients, rng, days=args.days)
+    orders = generate_orders(args.orders, products, [c['id'] for c in clients], rng, days=args.days)
+
+    if args.backend == 'local':
+        counts = write_local(args.out, products, clients, orders, with_images=args.render_images)
+        print(f"📁 Données écrites dans {args.out}/")
+    else:
+        from dotenv import load_dotenv
+        load_dotenv()
+        counts = write_supabase(products, clients, orders, batch_size=args.batch_size,
+                                upload_images=args.render_images)
+
+    print("✅ Terminé : " + ", ".join(f"{n} {name}" for name, n in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Harnais de test de charge - Sensations by Arda J
+Rejoue des parcours clients (catalogue, ajout au panier, commande) en parallèle
+avec `streamlit.testing.v1.AppTest` et mesure latences et appels backend.
+
+Usage :
+    python -m tools.load_test --users 8 --iterations 20
+    python -m tools.load_test --users 4 --flows checkout --allow-writes --json resultats.json
+
+⚠️ Le parcours "checkout" avec --allow-writes crée de vraies commandes :
+à n'utiliser que sur un projet Supabase de test (alimenté par tools.generate_data).
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+FLOWS = ('browse', 'add_to_cart', 'checkout')
+
+# =============================================================================
+# COMPTAGE DES APPELS BACKEND
+# =============================================================================
+
+
+class _CountingProxy:
+    """Proxy qui délègue tout à l'objet cible et compte les appels `execute()`"""
+
+    def __init__(self, target, counter: 'CallCounter'):
+        self._target = target
+        self._counter = counter
+
+    def execute(self, *args, **kwargs):
+        self._counter.increment()
+        return self._target.execute(*args, **kwargs)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Les builders PostgREST sont chaînables : on continue d'envelopper
+            if hasattr(result, 'execute'):
+                return _CountingProxy(result, self._counter)
+            return result
+        return wrapper
+
+
+class CallCounter:
+    """Compteur d'appels backend partagé par un utilisateur virtuel"""
+
+    def __init__(self):
+        self.count = 0
+
+    def increment(self):
+        self.count += 1
+
+    def reset(self) -> int:
+        count, self.count = self.count, 0
+        return count
+
+
+class CountingClient:
+    """Enveloppe un client Supabase : chaque requête PostgREST/RPC/Storage est comptée"""
+
+    def __init__(self, client, counter: CallCounter):
+        self._client = client
+        self._counter = counter
+
+    def table(self, name: str):
+        return _CountingProxy(self._client.table(name), self._counter)
+
+    def from_(self, name: str):
+        return self.table(name)
+
+    def rpc(self, *args, **kwargs):
+        return _CountingProxy(self._client.rpc(*args, **kwargs), self._counter)
+
+    @property
+    def storage(self):
+        counter = self._counter
+        storage = self._client.storage
+
+        class _Storage:
+            def from_(self, bucket):
+                bucket_api = storage.from_(bucket)
+
+                class _Bucket:
+                    def __getattr__(self, name):
+                        attr = getattr(bucket_api, name)
+
+                        def wrapper(*args, **kwargs):
+                            counter.increment()
+                            return attr(*args, **kwargs)
+                        return wrapper
+                return _Bucket()
+        return _Storage()
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+# =============================================================================
+# PARCOURS
+# =============================================================================
+
+
+def _new_app(page: str, client, timeout: float):
+    """Crée une instance AppTest avec le client Supabase instrumenté injecté"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=timeout)
+    at.session_state['supabase'] = client
+    return at
+
+
+def flow_browse(client, rng: random.Random, ctx: Dict, timeout: float):
+    """Accueil puis sélection d'une facette de type"""
+    at = _new_app("app.py", client, timeout)
+    at.run()
+    type_facet = next((p for p in at.get('button_group') if p.key == "facet_type"), None)
+    if type_facet is not None:
+        type_facet.set_value([rng.choice(["Homme", "Femme", "Mixte"])]).run()
+    return at
+
+
+def flow_add_to_cart(client, rng: random.Random, ctx: Dict, timeout: float):
+    """Accueil puis clic sur « 🛒 Ajouter » d'une carte au hasard"""
+    at = _new_app("app.py", client, timeout)
+    at.run()
+    buttons = [b for b in at.button if (b.key or '').startswith('add_') and not b.disabled]
+    if buttons:
+        rng.choice(buttons).click().run()
+    return at
+
+
+def flow_checkout(client, rng: random.Random, ctx: Dict, timeout: float):
+    """Page commande avec un panier pré-rempli, formulaire rempli et soumis"""
+    at = _new_app("pages/3_Checkout.py", client, timeout)
+
+    catalog = ctx.get('catalog') or []
+    cart = {}
+    for product in rng.sample(catalog, k=min(len(catalog), rng.randint(1, 3))):
+        cart[str(product['id'])] = {
+            'product_id': product['id'],
+            'name': product['name'],
+            'price': product['price'],
+            'quantity': 1,
+            'image': '',
+            'stock': product['stock']
+        }
+    at.session_state['cart'] = cart
+    at.run()
+
+    if cart:
+        n = rng.randint(1, 10**6)
+        values = ["Awa", "Ndong", f"charge.{n}@example.com", "+241 07 12 34 56"]
+        for widget, value in zip(at.text_input, values):
+            widget.input(value)
+        if at.text_area:
+            at.text_area[0].input("12 rue des Senteurs, Libreville")
+        if at.checkbox:
+            # Sans --allow-writes, les CGV restent décochées : seule la validation s'exécute
+            at.checkbox[0].set_value(bool(ctx.get('allow_writes')))
+        submit = next((b for b in at.button if 'Valider' in (b.label or '')), None)
+        if submit is not None:
+            submit.click().run()
+    return at
+
+
+FLOW_FUNCS: Dict[str, Callable] = {
+    'browse': flow_browse,
+    'add_to_cart': flow_add_to_cart,
+    'checkout': flow_checkout,
+}
+
+# =============================================================================
+# EXÉCUTION
+# =============================================================================
+
+
+def _virtual_user(user_id: int, flows: List[str], iterations: int, base_client_factory: Callable,
+                  ctx: Dict, timeout: float, results: Dict, lock: threading.Lock):
+    """Boucle d'un utilisateur virtuel : enchaîne des parcours tirés au hasard"""
+    rng = random.Random(user_id)
+    counter = CallCounter()
+    client = CountingClient(base_client_factory(), counter)
+
+    for _ in range(iterations):
+        flow = rng.choice(flows)
+        counter.reset()
+        error = None
+        started = time.perf_counter()
+        try:
+            at = FLOW_FUNCS[flow](client, rng, ctx, timeout)
+            if at.exception:
+                error = str(at.exception[0].message)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with lock:
+            entry = results[flow]
+            entry['latencies_ms'].append(elapsed_ms)
+            entry['backend_calls'].append(counter.reset())
+            if error:
+                entry['errors'].append(error)
+
+
+def summarize(results: Dict) -> Dict:
+    """Calcule p50/p95/p99 et le nombre moyen d'appels backend par parcours"""
+    summary = {}
+    for flow, entry in results.items():
+        latencies = np.asarray(entry['latencies_ms'])
+        if latencies.size == 0:
+            continue
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary[flow] = {
+            'runs': int(latencies.size),
+            'errors': len(entry['errors']),
+            'p50_ms': round(float(p50), 1),
+            'p95_ms': round(float(p95), 1),
+            'p99_ms': round(float(p99), 1),
+            'max_ms': round(float(latencies.max()), 1),
+            'backend_calls_avg': round(float(np.mean(entry['backend_calls'])), 1),
+            'backend_calls_max': int(max(entry['backend_calls'])),
+            'sample_errors': entry['errors'][:3],
+        }
+    return summary
+
+
+def print_report(summary: Dict, wall_seconds: float):
+    """Affiche le rapport dans le terminal"""
+    print()
+    print("=" * 88)
+    print(f"{'Parcours':<14}{'Runs':>6}{'Err.':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'max ms':>10}{'Appels moy.':>13}{'max':>6}")
+    print("-" * 88)
+    for flow, s in summary.items():
+        print(f"{flow:<14}{s['runs']:>6}{s['errors']:>6}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}"
+              f"{s['max_ms']:>10}{s['backend_calls_avg']:>13}{s['backend_calls_max']:>6}")
+    print("=" * 88)
+    print(f"⏱️  Durée totale : {wall_seconds:.1f}s")
+    for flow, s in summary.items():
+        for error in s['sample_errors']:
+            print(f"❌ [{flow}] {error}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Test de charge des parcours clients")
+    parser.add_argument('--users', type=int, default=4, help="Utilisateurs virtuels simultanés")
+    parser.add_argument('--iterations', type=int, default=10, help="Parcours par utilisateur")
+    parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+    parser.add_argument('--allow-writes', action='store_true',
+                        help="Soumet réellement les commandes (base de test uniquement !)")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Timeout par rerun (s)")
+    parser.add_argument('--json', type=Path, help="Écrit le résumé dans un fichier JSON")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    from dotenv import load_dotenv
+    load_dotenv()
+    from supabase import create_client
+
+    url, key = os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_KEY')
+    if not url or not key:
+        raise SystemExit("❌ SUPABASE_URL et SUPABASE_KEY sont requis")
+
+    # Un client par utilisateur virtuel, comme une session Streamlit réelle
+    def client_factory():
+        return create_client(url, key)
+
+    ctx = {'allow_writes': args.allow_writes}
+    if 'checkout' in args.flows:
+        response = (client_factory().table('products').select('id, name, price, stock')
+                    .gt('stock', 0).limit(200).execute())
+        ctx['catalog'] = response.data or []
+
+    results = defaultdict(lambda: {'latencies_ms': [], 'backend_calls': [], 'errors': []})
+    lock = threading.Lock()
+
+    print(f"🚀 {args.users} utilisateurs × {args.iterations} parcours ({', '.join(args.flows)})")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [
+            pool.submit(_virtual_user, user_id, args.flows, args.iterations, client_factory,
+                        ctx, args.timeout, results, lock)
+            for user_id in range(args.users)
+        ]
+        for future in futures:
+            future.result()
+    wall_seconds = time.perf_counter() - started
+
+    summary = summarize(results)
+    print_report(summary, wall_seconds)
+
+    if args.json:
+        args.json.write_text(json.dumps({
+            'users': args.users,
+            'iterations': args.iterations,
+            'wall_seconds': round(wall_seconds, 2),
+            'flows': summary
+        }, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"📄 Résumé écrit dans {args.json}")
+
+
+if __name__ == "__main__":
+    main()
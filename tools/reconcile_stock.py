@@ -0,0 +1,61 @@
+"""
+Réconciliation du stock avec le journal des mouvements - Sensations by Arda J
+
+Recalcule products.stock comme somme de inventory_ledger et corrige les écarts
+(voir supabase/migrations/20261019110000_inventory_ledger.sql). Sur un projet
+sans pg_cron, à lancer périodiquement (cron système ou --every).
+
+Usage :
+    python -m tools.reconcile_stock
+    python -m tools.reconcile_stock --every 900
+"""
+
+import argparse
+import os
+import time
+from typing import List, Optional
+
+
+def reconcile_once(client) -> int:
+    """Lance une réconciliation et affiche les écarts corrigés"""
+    from models.inventory import Inventory
+
+    drift = Inventory.reconcile(client)
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S')
+    if not drift:
+        print(f"✅ {stamp} Stock conforme au journal")
+    for row in drift:
+        print(f"⚠️ {stamp} Produit #{row['product_id']} : stock {row['stock_before']} -> {row['stock_after']}")
+    return len(drift)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Réconcilie products.stock avec le journal inventory_ledger")
+    parser.add_argument('--every', type=int, default=0,
+                        help="Relance toutes les N secondes (0 : une seule fois)")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from supabase import create_client
+    load_dotenv()
+
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+    if not url or not key:
+        raise SystemExit("⚠️ SUPABASE_URL et SUPABASE_SERVICE_KEY (ou SUPABASE_KEY) requis")
+    client = create_client(url, key)
+
+    while True:
+        try:
+            reconcile_once(client)
+        except Exception as e:
+            print(f"❌ Réconciliation en échec: {str(e)}")
+            if not args.every:
+                raise SystemExit(1)
+        if not args.every:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Estampilles de version des données pour les caches Streamlit
+
+Chaque écriture passant par les modèles incrémente la version de son périmètre
+('products', 'orders'). Les fonctions en cache reçoivent cette version en
+argument : une écriture locale invalide immédiatement leurs entrées, et la
+tranche de temps (DATA_VERSION_TTL) borne la fraîcheur des écritures faites
+par un autre processus.
+
+Quand le flux de modifications (config/change_feed.py) est actif, les écritures
+distantes incrémentent aussi les versions : la tranche de temps passe alors à
+DATA_VERSION_TTL_LIVE, bien plus longue, et ne sert plus que de garde-fou.
+"""
+
+import os
+import threading
+import time
+
+_lock = threading.Lock()
+_versions = {}
+_live = threading.Event()
+
+# Durée (secondes) au-delà de laquelle une version est de toute façon renouvelée
+DATA_VERSION_TTL = int(os.getenv('DATA_VERSION_TTL', '300'))
+# Même durée quand le flux de modifications est connecté
+DATA_VERSION_TTL_LIVE = int(os.getenv('DATA_VERSION_TTL_LIVE', '3600'))
+
+
+def bump_data_version(*scopes: str):
+    """
+    Signale une modification des données
+
+    Args:
+        scopes: Périmètres modifiés ('products', 'orders')
+    """
+    with _lock:
+        for scope in scopes:
+            _versions[scope] = _versions.get(scope, 0) + 1
+
+
+def set_live_invalidation(active: bool):
+    """
+    Indique si les écritures distantes sont signalées par le flux de modifications
+
+    Args:
+        active: True quand le flux est connecté, False s'il est coupé
+    """
+    if active:
+        _live.set()
+    else:
+        _live.clear()
+
+
+def get_data_version(scope: str, ttl: int = None) -> str:
+    """
+    Retourne l'estampille courante d'un périmètre, à passer aux fonctions en cache
+
+    Args:
+        scope: Périmètre ('products', 'orders')
+        ttl: Durée de la tranche de temps (DATA_VERSION_TTL ou DATA_VERSION_TTL_LIVE par défaut)
+
+    Returns:
+        Estampille "<compteur>:<tranche>"
+    """
+    ttl = ttl or (DATA_VERSION_TTL_LIVE if _live.is_set() else DATA_VERSION_TTL)
+    return f"{_versions.get(scope, 0)}:{int(time.time() // ttl)}"
@@ -0,0 +1,174 @@
+"""
+Panier de la session
+
+Les lignes sont des objets à __slots__ et le panier tient à jour son total et
+son nombre d'articles à chaque ajout, modification ou retrait : get_cart_total
+et get_cart_count (utils/session.py) ne reparcourent plus le panier, quel que
+soit le nombre d'appels par rerun.
+
+Le panier reste utilisable comme le dict d'origine {product_id (str): ligne}
+en lecture (cart.items(), cart[pid]['quantity'], len(cart)...) ; les
+modifications passent par ses méthodes. Chaque modification lui donne une
+nouvelle version, unique dans le processus, utilisable comme clé de cache.
+"""
+
+import itertools
+from typing import Dict, Iterator, Optional, Tuple
+
+# Versions uniques dans le processus : deux paniers distincts n'ont jamais la même
+_versions = itertools.count(1)
+
+
+class CartLine:
+    """
+    Ligne du panier
+
+    Accès par attribut (line.quantity) ou façon dict en lecture
+    (line['quantity'], line.get('image')), comme les lignes d'origine.
+    """
+
+    __slots__ = ('product_id', 'name', 'price', 'quantity', 'image', 'stock')
+
+    def __init__(self, product_id: int, name: str, price: float, quantity: int,
+                 image: str = '', stock: int = 0):
+        self.product_id = product_id
+        self.name = name
+        self.price = price
+        self.quantity = quantity
+        self.image = image or ''
+        self.stock = stock
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"CartLine(product_id={self.product_id!r}, quantity={self.quantity!r})"
+
+
+class Cart:
+    """Panier : lignes par ID produit (str), total et nombre d'articles incrémentaux"""
+
+    __slots__ = ('_lines', 'total', 'count', 'version')
+
+    def __init__(self, lines: Optional[Dict[str, Dict]] = None):
+        self._lines: Dict[str, CartLine] = {}
+        self.total = 0
+        self.count = 0
+        self.version = next(_versions)
+        for product_id, line in (lines or {}).items():
+            self.add(product_id, line['name'], line['price'], line['quantity'],
+                     line.get('image', ''), line.get('stock', 0))
+
+    @classmethod
+    def coerce(cls, cart) -> 'Cart':
+        """Panier tel quel, ou construit depuis un dict {product_id: {name, price, quantity, ...}}"""
+        return cart if isinstance(cart, cls) else cls(cart)
+
+    # Lecture, comme le dict d'origine
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._lines)
+
+    def __contains__(self, product_id) -> bool:
+        return product_id in self._lines
+
+    def __getitem__(self, product_id: str) -> CartLine:
+        return self._lines[product_id]
+
+    def get(self, product_id: str, default=None) -> Optional[CartLine]:
+        return self._lines.get(product_id, default)
+
+    def keys(self):
+        return self._lines.keys()
+
+    def values(self):
+        return self._lines.values()
+
+    def items(self):
+        return self._lines.items()
+
+    # Modifications (total, nombre et version tenus à jour)
+
+    def _touch(self):
+        self.version = next(_versions)
+
+    def add(self, product_id, name: str, price: float, quantity: int, image: str = '', stock: int = 0):
+        """Ajoute une ligne, ou augmente la quantité d'une ligne existante (au prix donné)"""
+        product_id = str(product_id)
+        line = self._lines.get(product_id)
+        if line is None:
+            self._lines[product_id] = CartLine(int(product_id), name, price, quantity, image, stock)
+        else:
+            # Toute la ligne passe au prix courant : le total reste la somme des lignes
+            self.total += (price - line.price) * line.quantity
+            line.price = price
+            line.stock = stock
+            line.quantity += quantity
+        self.total += price * quantity
+        self.count += quantity
+        self._touch()
+
+    def set_quantity(self, product_id: str, quantity: int):
+        """Change la quantité d'une ligne (retirée si quantité <= 0)"""
+        line = self._lines[product_id]
+        if quantity <= 0:
+            self.remove(product_id)
+            return
+        self.total += line.price * (quantity - line.quantity)
+        self.count += quantity - line.quantity
+        line.quantity = quantity
+        self._touch()
+
+    def reprice(self, product_id: str, price: float, stock: int):
+        """Applique le prix et le stock courants d'un produit"""
+        line = self._lines[product_id]
+        if line.price == price and line.stock == stock:
+            return
+        self.total += (price - line.price) * line.quantity
+        line.price = price
+        line.stock = stock
+        self._touch()
+
+    def remove(self, product_id: str):
+        line = self._lines.pop(product_id, None)
+        if line is None:
+            return
+        self.total -= line.price * line.quantity
+        self.count -= line.quantity
+        self._touch()
+
+    def clear(self):
+        self._lines.clear()
+        self.total = 0
+        self.count = 0
+        self._touch()
+
+    # Sérialisation
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """Forme dict d'origine (JSON du stockage serveur, utils/cart_store.py)"""
+        return {product_id: line.to_dict() for product_id, line in self._lines.items()}
+
+    def __getstate__(self) -> Tuple:
+        # Une ligne = un tuple dans l'ordre des __slots__ de CartLine
+        return tuple(tuple(getattr(line, slot) for slot in CartLine.__slots__) for line in self._lines.values())
+
+    def __setstate__(self, state: Tuple):
+        self.__init__()
+        for product_id, name, price, quantity, image, stock in state:
+            self.add(product_id, name, price, quantity, image, stock)
+
+    def __repr__(self) -> str:
+        return f"Cart(lines={len(self._lines)}, count={self.count}, total={self.total!r})"
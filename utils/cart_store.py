@@ -0,0 +1,185 @@
+"""
+Stockage serveur des paniers
+
+Le panier de la session (st.session_state.cart) est recopié dans un magasin
+identifié par le jeton du panier (voir utils/session.get_cart_token) : il est
+partagé entre les répliques, se retrouve par un lien de reprise et permet
+d'analyser les paniers abandonnés. Le jeton donne accès au panier : hors du
+magasin, seule son empreinte (cart_token_digest) est enregistrée ou exposée.
+
+Les écritures sont différées : un ajout au panier ne fait que déposer l'état
+du panier dans un tampon, qu'un thread vide par lots toutes les
+CART_FLUSH_INTERVAL secondes (une seule écriture par panier et par lot, quel
+que soit le nombre de clics).
+
+Magasins (CART_STORE) :
+    memory    Dictionnaire du processus (par défaut ; ne survit pas au redémarrage)
+    sqlite    Fichier CART_STORE_PATH (une seule machine)
+    supabase  Table carts via les RPC save_carts / load_cart
+              (supabase/migrations/20261019150000_carts.sql)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import streamlit as st
+
+CART_STORE = os.getenv('CART_STORE', 'memory')
+CART_STORE_PATH = os.getenv('CART_STORE_PATH', 'data/carts.sqlite3')
+CART_FLUSH_INTERVAL = float(os.getenv('CART_FLUSH_INTERVAL', '2'))
+
+
+def cart_token_digest(token: str) -> str:
+    """Empreinte md5 du jeton de panier (journal d'événements, réservations)"""
+    return hashlib.md5(token.encode()).hexdigest()
+
+
+class MemoryCartStore:
+    """Paniers en mémoire du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._carts: Dict[str, Dict] = {}
+
+    def load(self, token: str) -> Optional[Dict]:
+        with self._lock:
+            cart = self._carts.get(token)
+            return json.loads(cart) if cart is not None else None
+
+    def save_many(self, carts: Dict[str, Dict]):
+        with self._lock:
+            for token, cart in carts.items():
+                self._carts[token] = json.dumps(cart)
+
+
+class SQLiteCartStore:
+    """Paniers dans un fichier SQLite"""
+
+    def __init__(self, path: str = CART_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS carts ("
+                "token TEXT PRIMARY KEY, items TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def load(self, token: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT items FROM carts WHERE token = ?", (token,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_many(self, carts: Dict[str, Dict]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO carts (token, items, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(token) DO UPDATE SET items = excluded.items, updated_at = excluded.updated_at",
+                [(token, json.dumps(cart), now) for token, cart in carts.items()]
+            )
+
+
+class SupabaseCartStore:
+    """Paniers dans la table carts de Supabase (une RPC par lot)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def load(self, token: str) -> Optional[Dict]:
+        response = self.client.rpc('load_cart', {'p_token': token}).execute()
+        return response.data or None
+
+    def save_many(self, carts: Dict[str, Dict]):
+        self.client.rpc('save_carts', {
+            'p_carts': [{'token': token, 'items': cart} for token, cart in carts.items()]
+        }).execute()
+
+
+class CartWriter:
+    """Tampon d'écriture des paniers, vidé par lots par un thread d'arrière-plan"""
+
+    def __init__(self, store, interval: float = CART_FLUSH_INTERVAL):
+        self.store = store
+        self.interval = interval
+        self.flushes = 0
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="cart-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def schedule(self, token: str, cart: Dict):
+        """Dépose l'état du panier, forme dict (remplace l'état en attente du même panier)"""
+        with self._lock:
+            self._pending[token] = cart
+        self._wake.set()
+
+    def load(self, token: str) -> Optional[Dict]:
+        """Panier du jeton : état en attente s'il y en a un, sinon celui du magasin"""
+        with self._lock:
+            pending = self._pending.get(token)
+        if pending is not None:
+            return {pid: dict(item) for pid, item in pending.items()}
+        try:
+            return self.store.load(token)
+        except Exception as e:
+            print(f"⚠️ Erreur lors du chargement du panier: {str(e)}")
+            return None
+
+    def flush(self):
+        """Écrit les paniers en attente en un lot (remis en attente si l'écriture échoue)"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            self.store.save_many(batch)
+            self.flushes += 1
+        except Exception as e:
+            print(f"⚠️ Erreur lors de l'enregistrement des paniers: {str(e)}")
+            with self._lock:
+                for token, cart in batch.items():
+                    self._pending.setdefault(token, cart)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Regrouper les clics arrivés pendant l'intervalle
+            time.sleep(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+def _build_store():
+    if CART_STORE == 'sqlite':
+        return SQLiteCartStore()
+    if CART_STORE == 'supabase':
+        from supabase import create_client
+        url = os.getenv('SUPABASE_URL')
+        key = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+        if url and key:
+            return SupabaseCartStore(create_client(url, key))
+        print("⚠️ SUPABASE_URL / SUPABASE_KEY manquants, paniers en mémoire")
+    return MemoryCartStore()
+
+
+@st.cache_resource(show_spinner=False)
+def get_cart_writer() -> CartWriter:
+    """
+    Tampon d'écriture des paniers du processus (créé une seule fois)
+
+    Returns:
+        CartWriter sur le magasin choisi par CART_STORE
+    """
+    return CartWriter(_build_store())
@@ -0,0 +1,103 @@
+"""
+Représentation compacte du catalogue partagé
+
+Les lignes PostgREST (`*, product_images(*)`) sont converties une seule fois
+par version du catalogue en enregistrements à __slots__ : pas de dict par
+produit, types internés (une seule chaîne "Femme" pour tout le catalogue) et
+images rangées dans une table annexe. La recherche par ID est en O(1).
+"""
+
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class ProductRecord:
+    """
+    Produit du catalogue en lecture seule
+
+    Accès par attribut (record.name) ou façon dict (record['name'],
+    record.get('name')) pour rester compatible avec le code écrit pour les
+    lignes PostgREST. Les images sont dans CatalogStore.images().
+    """
+
+    __slots__ = ('id', 'name', 'type', 'description', 'price', 'stock', 'created_at')
+
+    def __init__(self, row: Dict):
+        self.id = row['id']
+        self.name = row.get('name') or ""
+        self.type = sys.intern(row.get('type') or "Autre")
+        self.description = row.get('description') or ""
+        self.price = row.get('price') or 0
+        self.stock = row.get('stock') or 0
+        self.created_at = row.get('created_at')
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self) -> str:
+        return f"ProductRecord(id={self.id!r}, name={self.name!r})"
+
+
+# Image du catalogue : (id de l'image, url)
+ImageRef = Tuple[int, str]
+
+
+class CatalogStore:
+    """Catalogue en mémoire : enregistrements ordonnés, index par ID, table des images"""
+
+    __slots__ = ('_records', '_positions', '_images')
+
+    def __init__(self, rows: Iterable[Dict]):
+        self._records: List[ProductRecord] = []
+        self._positions: Dict[int, int] = {}
+        # Table annexe parallèle à _records (tuple vide partagé si aucune image)
+        self._images: List[Tuple[ImageRef, ...]] = []
+
+        for row in rows:
+            self._positions[row['id']] = len(self._records)
+            self._records.append(ProductRecord(row))
+            self._images.append(tuple(
+                (image['id'], image['url']) for image in row.get('product_images') or ()
+            ))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[ProductRecord]:
+        return iter(self._records)
+
+    def __contains__(self, product_id: int) -> bool:
+        return product_id in self._positions
+
+    def get(self, product_id: int) -> Optional[ProductRecord]:
+        """Produit par ID (None si absent du catalogue)"""
+        position = self._positions.get(product_id)
+        return None if position is None else self._records[position]
+
+    def images(self, product_id: int) -> Tuple[ImageRef, ...]:
+        """Images (id, url) d'un produit, dans l'ordre de la base"""
+        position = self._positions.get(product_id)
+        return () if position is None else self._images[position]
+
+    def image_url(self, product_id: int, default: str = None) -> Optional[str]:
+        """URL de l'image principale d'un produit"""
+        images = self.images(product_id)
+        return images[0][1] if images else default
+
+    def to_row(self, product_id: int) -> Optional[Dict]:
+        """Ligne au format PostgREST (`*, product_images(*)`), pour le code qui attend des dicts"""
+        record = self.get(product_id)
+        if record is None:
+            return None
+        row = {field: getattr(record, field) for field in ProductRecord.__slots__}
+        row['product_images'] = [
+            {'id': image_id, 'product_id': product_id, 'url': url}
+            for image_id, url in self.images(product_id)
+        ]
+        return row
@@ -0,0 +1,249 @@
+"""
+Construction en cache des graphiques Plotly de la page Analytics
+
+Les données et les figures sont mises en cache par période et par estampille
+de version des commandes : un rerun déclenché par un widget sans rapport
+réutilise les figures existantes au lieu de tout recalculer. Les longues
+séries sont sous-échantillonnées (LTTB) pour borner le nombre de points
+envoyés au navigateur.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from models.analytics import Analytics
+
+# Nombre maximal de points par courbe envoyés au navigateur
+MAX_CHART_POINTS = 120
+
+STATUS_CONFIG = {
+    'en_cours': {'label': 'En cours', 'color': '#3b82f6'},
+    'livree': {'label': 'Livrées', 'color': '#10b981'},
+    'annulee': {'label': 'Annulées', 'color': '#ef4444'}
+}
+
+
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Sous-échantillonnage Largest-Triangle-Three-Buckets
+
+    Conserve la forme visuelle d'une série (pics et creux) avec `threshold` points.
+    Les abscisses sont supposées régulières (une valeur par jour).
+
+    Args:
+        y: Valeurs de la série
+        threshold: Nombre de points à conserver
+
+    Returns:
+        Indices des points retenus (croissants, premier et dernier inclus)
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bucket_size = (n - 2) / (threshold - 2)
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        start = int(np.floor(i * bucket_size)) + 1
+        end = int(np.floor((i + 1) * bucket_size)) + 1
+
+        # Point moyen du bucket suivant
+        next_start = end
+        next_end = min(int(np.floor((i + 2) * bucket_size)) + 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Point du bucket courant formant le plus grand triangle avec a et le point moyen
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_sales_evolution(period: int, data_version: str) -> pd.DataFrame:
+    """Évolution des ventes (en cache par période et version des commandes)"""
+    return Analytics.get_sales_evolution(period)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_status_stats(data_version: str) -> Dict:
+    """Répartition des commandes par statut (en cache par version des commandes)"""
+    return Analytics.get_orders_by_status_stats()
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_top_products(period: int, data_version: str, limit: int = 10) -> List[Dict]:
+    """Top produits vendus (en cache par période et version des commandes)"""
+    return Analytics.get_top_products(limit=limit, days=period)
+
+
+# st.cache_resource : la figure est partagée telle quelle, sans copie pickle à chaque rerun
+@st.cache_resource(show_spinner=False, max_entries=16)
+def build_sales_figure(period: int, data_version: str) -> go.Figure:
+    """
+    Courbe chiffre d'affaires + nombre de commandes
+
+    Au-delà de MAX_CHART_POINTS jours, chaque courbe est sous-échantillonnée par LTTB.
+    """
+    sales_data = load_sales_evolution(period, data_version)
+    x = sales_data['jour'] if 'jour' in sales_data else sales_data['date']
+
+    revenue_idx = lttb_indices(sales_data['chiffre_affaires'].to_numpy(), MAX_CHART_POINTS)
+    count_idx = lttb_indices(sales_data['nb_commandes'].to_numpy(), MAX_CHART_POINTS)
+    marker_size = 8 if len(revenue_idx) <= 31 else 4
+
+    fig = go.Figure()
+
+    # Ligne du chiffre d'affaires
+    fig.add_trace(go.Scatter(
+        x=x.iloc[revenue_idx],
+        y=sales_data['chiffre_affaires'].iloc[revenue_idx],
+        mode='lines+markers',
+        name='Chiffre d\'affaires (FCFA)',
+        line=dict(color='#3b82f6', width=3),
+        marker=dict(size=marker_size)
+    ))
+
+    # Ligne du nombre de commandes (axe secondaire)
+    fig.add_trace(go.Scatter(
+        x=x.iloc[count_idx],
+        y=sales_data['nb_commandes'].iloc[count_idx],
+        mode='lines+markers',
+        name='Nombre de commandes',
+        line=dict(color='#10b981', width=3),
+        marker=dict(size=marker_size),
+        yaxis='y2'
+    ))
+
+    fig.update_layout(
+        xaxis_title="Date",
+        xaxis=dict(tickformat='%d/%m'),
+        yaxis_title="Chiffre d'affaires (FCFA)",
+        yaxis2=dict(
+            title="Nombre de commandes",
+            overlaying='y',
+            side='right'
+        ),
+        hovermode='x unified',
+        height=400,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+    return fig
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_status_donut(data_version: str):
+    """Donut des statuts de commandes, ou None s'il n'y a aucune commande"""
+    status_stats = load_status_stats(data_version)
+
+    labels = []
+    values = []
+    colors = []
+    for status, count in status_stats.items():
+        if count > 0:
+            labels.append(STATUS_CONFIG[status]['label'])
+            values.append(count)
+            colors.append(STATUS_CONFIG[status]['color'])
+
+    if not values:
+        return None
+
+    fig_donut = go.Figure(data=[go.Pie(
+        labels=labels,
+        values=values,
+        hole=0.5,
+        marker=dict(colors=colors)
+    )])
+
+    fig_donut.update_layout(
+        height=400,
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.1,
+            xanchor="center",
+            x=0.5
+        )
+    )
+    return fig_donut
+
+
+def top_products_table(top_products: List[Dict]) -> pd.DataFrame:
+    """DataFrame d'affichage des top produits (index à partir de 1)"""
+    df_top = pd.DataFrame(top_products)
+    df_top = df_top.rename(columns={
+        'product_name': 'Produit',
+        'total_quantity': 'Quantité Vendue'
+    })
+    df_top.index = df_top.index + 1  # Commencer à 1
+    return df_top
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def build_top_products_bar(period: int, data_version: str):
+    """Barres horizontales des 10 produits les plus vendus, ou None sans ventes"""
+    top_products = load_top_products(period, data_version)
+    if not top_products:
+        return None
+
+    fig_bar = px.bar(
+        top_products_table(top_products),
+        x='Quantité Vendue',
+        y='Produit',
+        orientation='h',
+        text='Quantité Vendue',
+        color='Quantité Vendue',
+        color_continuous_scale='Blues'
+    )
+
+    fig_bar.update_layout(
+        height=400,
+        showlegend=False,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+
+    fig_bar.update_traces(textposition='outside')
+    return fig_bar
+
+
+# Les événements n'ont pas d'estampille de version : tunnel recalculé au plus chaque minute
+FUNNEL_CACHE_TTL = 60
+
+
+@st.cache_data(show_spinner=False, max_entries=8, ttl=FUNNEL_CACHE_TTL)
+def load_funnel(period: int) -> Dict:
+    return Analytics.get_funnel(period)
+
+
+def build_funnel_figure(funnel: Dict) -> go.Figure:
+    """Entonnoir des sessions par étape du parcours"""
+    steps = funnel['steps']
+    fig = go.Figure(go.Funnel(
+        y=steps['Étape'],
+        x=steps['Sessions'],
+        textinfo="value+percent initial",
+        marker=dict(color=['#D4AF37', '#C9A227', '#3b82f6', '#6366f1', '#10b981'])
+    ))
+    fig.update_layout(height=400, margin=dict(l=10, r=10, t=10, b=10))
+    return fig
@@ -3,9 +3,15 @@ Helpers pour l'affichage amélioré des produits - VERSION CORRIGÉE
 Sensations by Arda J
 """
 
+import math
+import os
 import streamlit as st
 from utils.formatters import format_price
 
+# Taille des pages de la grille produits (boutique et admin)
+CATALOG_PAGE_SIZE = int(os.getenv('CATALOG_PAGE_SIZE', '20'))
+ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', '24'))
+
 def display_product_card(product, image_url, product_id):
     """
     Affiche une carte produit avec PRIX FCFA ULTRA VISIBLE
@@ -378,4 +384,65 @@ def display_no_products_message():
             Essayez d'autres critères de recherche ou parcourez toute notre collection
         </p>
     </div>
-    """, unsafe_allow_html=True)
\ No newline at end of file
+    """, unsafe_allow_html=True)
+
+
+def get_current_page(key: str, total_items: int, page_size: int, reset_on=None) -> int:
+    """
+    Retourne la page courante (à partir de 0) d'une liste paginée
+    
+    Args:
+        key: Clé de session de la pagination
+        total_items: Nombre total d'éléments (requête de comptage)
+        page_size: Nombre d'éléments par page
+        reset_on: Valeur des filtres ; revient à la première page quand elle change
+    
+    Returns:
+        Numéro de page, ramené dans les bornes si le catalogue a rétréci
+    """
+    filters_key = f"{key}_filters"
+    if st.session_state.get(filters_key) != reset_on:
+        st.session_state[filters_key] = reset_on
+        st.session_state[key] = 0
+    
+    total_pages = max(1, math.ceil(total_items / page_size))
+    st.session_state[key] = min(st.session_state.get(key, 0), total_pages - 1)
+    return st.session_state[key]
+
+
+def _set_page(key: str, page: int):
+    st.session_state[key] = page
+
+
+def display_pagination(key: str, total_items: int, page_size: int):
+    """
+    Affiche la navigation ◀ Page x / y ▶ d'une liste paginée
+    
+    Args:
+        key: Clé de session de la pagination (même clé que get_current_page)
+        total_items: Nombre total d'éléments (requête de comptage)
+        page_size: Nombre d'éléments par page
+    """
+    total_pages = max(1, math.ceil(total_items / page_size))
+    page = st.session_state.get(key, 0)
+    if total_pages <= 1:
+        return
+    
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    
+    with col_prev:
+        st.button("◀ Précédent", key=f"{key}_prev", use_container_width=True,
+                  disabled=page <= 0, on_click=_set_page, args=(key, page - 1))
+    
+    with col_info:
+        first = page * page_size + 1
+        last = min((page + 1) * page_size, total_items)
+        st.markdown(
+            f"<p style='text-align: center; margin: 0.5rem 0;'>Page {page + 1} / {total_pages} "
+            f"<span style='opacity: 0.7;'>({first}-{last} sur {total_items})</span></p>",
+            unsafe_allow_html=True
+        )
+    
+    with col_next:
+        st.button("Suivant ▶", key=f"{key}_next", use_container_width=True,
+                  disabled=page >= total_pages - 1, on_click=_set_page, args=(key, page + 1))
@@ -0,0 +1,264 @@
+"""
+Journal d'événements du parcours client (tunnel de conversion, paniers abandonnés)
+
+track_event() ne fait qu'ajouter un tuple dans un tampon circulaire du
+processus (collections.deque bornée, sans verrou ni E/S) ; un thread le vide
+par lots toutes les EVENT_FLUSH_INTERVAL secondes vers le puits choisi. Si le
+tampon est plein (puits indisponible), les événements les plus anciens sont
+perdus plutôt que de ralentir la page.
+
+Puits (EVENT_SINK) :
+    sqlite    Fichier EVENT_SQLITE_PATH (par défaut)
+    parquet   Un fichier par lot dans EVENT_PARQUET_DIR (nécessite pyarrow)
+    supabase  Table events (supabase/migrations/20261019160000_events.sql)
+    off       Aucun enregistrement
+
+Un événement : (horodatage, session, nom, product_id, valeur, propriétés JSON).
+La session est l'empreinte du jeton du panier (utils/cart_store.cart_token_digest,
+la même que pour les réservations) : le jeton, qui donne accès au panier, n'est
+pas enregistré.
+"""
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from utils.cart_store import cart_token_digest
+
+EVENT_SINK = os.getenv('EVENT_SINK', 'sqlite')
+EVENT_SQLITE_PATH = os.getenv('EVENT_SQLITE_PATH', 'data/events.sqlite3')
+EVENT_PARQUET_DIR = os.getenv('EVENT_PARQUET_DIR', 'data/events')
+EVENT_FLUSH_INTERVAL = float(os.getenv('EVENT_FLUSH_INTERVAL', '5'))
+EVENT_BUFFER_SIZE = int(os.getenv('EVENT_BUFFER_SIZE', '10000'))
+
+EVENT_COLUMNS = ['ts', 'session', 'name', 'product_id', 'value', 'props']
+
+Event = Tuple[float, str, str, Optional[int], Optional[float], Optional[str]]
+
+
+class SQLiteEventSink:
+    """Événements dans un fichier SQLite"""
+
+    def __init__(self, path: str = EVENT_SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS events ("
+                "ts REAL NOT NULL, session TEXT NOT NULL, name TEXT NOT NULL, "
+                "product_id INTEGER, value REAL, props TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS events_ts_idx ON events (ts)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def write(self, events: List[Event]):
+        with self._connect() as conn:
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", events)
+
+    def read(self, since: float) -> pd.DataFrame:
+        with self._connect() as conn:
+            return pd.read_sql_query("SELECT * FROM events WHERE ts >= ?", conn, params=(since,))
+
+
+class ParquetEventSink:
+    """Événements en fichiers Parquet (un par lot), relus d'un bloc"""
+
+    def __init__(self, directory: str = EVENT_PARQUET_DIR):
+        import pyarrow  # noqa: F401 (échoue tôt si pyarrow manque)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, events: List[Event]):
+        frame = pd.DataFrame.from_records(events, columns=EVENT_COLUMNS)
+        frame.to_parquet(self.directory / f"events-{time.time_ns()}.parquet", index=False)
+
+    def read(self, since: float) -> pd.DataFrame:
+        # Le nom du fichier porte l'heure d'écriture du lot : les lots écrits avant since sont ignorés
+        files = [f for f in sorted(self.directory.glob("events-*.parquet"))
+                 if int(f.stem.split('-')[1]) >= since * 1e9]
+        if not files:
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        frame = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+        return frame[frame['ts'] >= since]
+
+
+class SupabaseEventSink:
+    """Événements dans la table events de Supabase (une insertion par lot)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def write(self, events: List[Event]):
+        self.client.table('events').insert([
+            {
+                'created_at': datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                'session': session,
+                'name': name,
+                'product_id': product_id,
+                'value': value,
+                'props': json.loads(props) if props else None,
+            }
+            for ts, session, name, product_id, value, props in events
+        ]).execute()
+
+    def read(self, since: float) -> pd.DataFrame:
+        # Lecture avec le client de la session : réservée aux administrateurs (RLS)
+        from config.supabase_client import get_supabase
+        client = get_supabase()
+        since_iso = datetime.fromtimestamp(since, timezone.utc).isoformat()
+        rows, page_size = [], 1000
+        while True:
+            response = (client.table('events')
+                        .select('created_at, session, name, product_id, value, props')
+                        .gte('created_at', since_iso)
+                        .order('id')
+                        .range(len(rows), len(rows) + page_size - 1)
+                        .execute())
+            rows.extend(response.data or [])
+            if len(response.data or []) < page_size:
+                break
+        frame = pd.DataFrame(rows, columns=['created_at', 'session', 'name', 'product_id', 'value', 'props'])
+        frame['ts'] = (pd.to_datetime(frame['created_at'], utc=True) - pd.Timestamp(0, tz='UTC')).dt.total_seconds()
+        # Même forme que les autres puits : propriétés en texte JSON
+        frame['props'] = frame['props'].map(lambda props: json.dumps(props) if props is not None else None)
+        return frame.drop(columns='created_at')
+
+
+class EventPipeline:
+    """Tampon circulaire d'événements, vidé par lots par un thread d'arrière-plan"""
+
+    def __init__(self, sink, interval: float = EVENT_FLUSH_INTERVAL, capacity: int = EVENT_BUFFER_SIZE):
+        self.sink = sink
+        self.interval = interval
+        self.written = 0
+        self._buffer = deque(maxlen=capacity)
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="event-pipeline", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def track(self, event: Event):
+        """Ajoute un événement (deque.append : atomique, sans attente)"""
+        self._buffer.append(event)
+
+    def flush(self):
+        """
+        Écrit les événements en attente en un lot
+
+        Si l'écriture échoue, le lot est remis en tête du tampon dans la place
+        restante : comme pour le tampon circulaire, ce sont les plus anciens
+        événements qui sont perdus.
+        """
+        with self._flush_lock:
+            batch = []
+            while True:
+                try:
+                    batch.append(self._buffer.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return
+            try:
+                self.sink.write(batch)
+                self.written += len(batch)
+            except Exception as e:
+                print(f"⚠️ Erreur lors de l'enregistrement des événements: {str(e)}")
+                # extendleft sur un tampon plein évincerait les événements arrivés pendant l'écriture
+                free = self._buffer.maxlen - len(self._buffer)
+                if free < len(batch):
+                    print(f"⚠️ {len(batch) - free} événement(s) perdu(s) (tampon plein)")
+                    batch = batch[len(batch) - free:] if free > 0 else []
+                self._buffer.extendleft(reversed(batch))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+def _build_sink():
+    try:
+        if EVENT_SINK == 'sqlite':
+            return SQLiteEventSink()
+        if EVENT_SINK == 'parquet':
+            return ParquetEventSink()
+        if EVENT_SINK == 'supabase':
+            from supabase import create_client
+            url = os.getenv('SUPABASE_URL')
+            key = os.getenv('SUPABASE_SERVICE_KEY') or os.getenv('SUPABASE_KEY')
+            if url and key:
+                return SupabaseEventSink(create_client(url, key))
+            print("⚠️ SUPABASE_URL / SUPABASE_KEY manquants, événements non enregistrés")
+    except ImportError as e:
+        print(f"⚠️ Puits d'événements '{EVENT_SINK}' indisponible ({str(e)}), événements non enregistrés")
+    return None
+
+
+@st.cache_resource(show_spinner=False)
+def get_event_pipeline() -> Optional[EventPipeline]:
+    """
+    Pipeline d'événements du processus (créé une seule fois)
+
+    Returns:
+        EventPipeline sur le puits choisi par EVENT_SINK, ou None s'il est désactivé
+    """
+    sink = _build_sink()
+    return EventPipeline(sink) if sink is not None else None
+
+
+def track_event(name: str, product_id: int = None, value: float = None, **props):
+    """
+    Enregistre un événement du parcours de la session courante
+
+    Args:
+        name: Nom de l'événement (voir FUNNEL_STEPS dans models/analytics.py)
+        product_id: Produit concerné
+        value: Montant ou quantité
+        **props: Détails (sérialisés en JSON)
+    """
+    pipeline = get_event_pipeline()
+    if pipeline is None:
+        return
+    token = st.session_state.get('cart_token')
+    session = cart_token_digest(token) if token else 'anonyme'
+    pipeline.track((
+        time.time(), session, name,
+        int(product_id) if product_id is not None else None,
+        float(value) if value is not None else None,
+        json.dumps(props, ensure_ascii=False) if props else None,
+    ))
+
+
+def track_visit(page: str):
+    """Enregistre la visite (une fois par session, quelle que soit la page d'arrivée)"""
+    if not st.session_state.get('visit_tracked'):
+        st.session_state.visit_tracked = True
+        track_event('visit', page=page)
+
+
+def read_events(since: float) -> pd.DataFrame:
+    """
+    Événements enregistrés depuis un horodatage (en attente d'écriture exclus)
+
+    Args:
+        since: Horodatage Unix de début
+
+    Returns:
+        DataFrame (ts, session, name, product_id, value, ...), vide si aucun puits
+    """
+    pipeline = get_event_pipeline()
+    if pipeline is None:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pipeline.sink.read(since)
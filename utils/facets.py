@@ -0,0 +1,156 @@
+"""
+Moteur de facettes du catalogue
+
+Pour chaque valeur de facette (type, tranche de prix, disponibilité,
+nouveauté), un bitset (entier Python, un bit par produit) est précalculé sur
+le catalogue en cache. Un filtre combiné est une suite de OR (valeurs d'une
+même facette) et de AND (entre facettes) ; les compteurs affichés à côté de
+chaque option sont des popcounts (int.bit_count). Aucun accès base de données.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# Tranches de prix en FCFA : (libellé, minimum inclus, maximum exclu)
+PRICE_BANDS = [
+    ("< 15 000", 0, 15_000),
+    ("15 000 - 30 000", 15_000, 30_000),
+    ("30 000 - 60 000", 30_000, 60_000),
+    ("≥ 60 000", 60_000, float('inf')),
+]
+
+# Même seuil que format_stock_badge
+LOW_STOCK_THRESHOLD = 5
+STOCK_STATUSES = ["En stock", "Stock faible", "Rupture"]
+
+NEW_ARRIVAL_DAYS = 30
+NEW_ARRIVAL = "Nouveautés"
+
+FACETS = {
+    'type': "Type",
+    'price': "Prix (FCFA)",
+    'stock': "Disponibilité",
+    'new': "Nouveautés",
+}
+
+
+def _price_band(price: float) -> str:
+    for label, low, high in PRICE_BANDS:
+        if low <= price < high:
+            return label
+    return PRICE_BANDS[-1][0]
+
+
+def _stock_status(stock: int) -> str:
+    if stock <= 0:
+        return "Rupture"
+    if stock <= LOW_STOCK_THRESHOLD:
+        return "Stock faible"
+    return "En stock"
+
+
+class FacetIndex:
+    """Bitsets des facettes sur une liste de produits (ordre du catalogue conservé)"""
+
+    def __init__(self, products: Iterable[Dict], now: datetime = None):
+        now = now or datetime.now(timezone.utc)
+        new_since = now - timedelta(days=NEW_ARRIVAL_DAYS)
+
+        self._ids: List[int] = []
+        self._positions: Dict[int, int] = {}
+        self._bitsets: Dict[str, Dict[str, int]] = {facet: {} for facet in FACETS}
+
+        for position, product in enumerate(products):
+            self._ids.append(product['id'])
+            self._positions[product['id']] = position
+            bit = 1 << position
+
+            values = {
+                'type': product.get('type') or "Autre",
+                'price': _price_band(product.get('price') or 0),
+                'stock': _stock_status(product.get('stock') or 0),
+            }
+            created_at = product.get('created_at')
+            if created_at and pd.to_datetime(created_at, utc=True) >= new_since:
+                values['new'] = NEW_ARRIVAL
+
+            for facet, value in values.items():
+                bitsets = self._bitsets[facet]
+                bitsets[value] = bitsets.get(value, 0) | bit
+
+        self._all = (1 << len(self._ids)) - 1
+
+    def options(self, facet: str) -> List[str]:
+        """Valeurs possibles d'une facette, dans un ordre d'affichage stable"""
+        if facet == 'price':
+            return [label for label, _, _ in PRICE_BANDS]
+        if facet == 'stock':
+            return list(STOCK_STATUSES)
+        if facet == 'new':
+            return [NEW_ARRIVAL]
+        return sorted(self._bitsets[facet])
+
+    def _facet_mask(self, facet: str, values: Iterable[str]) -> int:
+        """OR des valeurs sélectionnées d'une facette (tout le catalogue si aucune)"""
+        values = list(values or [])
+        if not values:
+            return self._all
+        mask = 0
+        for value in values:
+            mask |= self._bitsets[facet].get(value, 0)
+        return mask
+
+    def mask_for_ids(self, product_ids: Iterable[int]) -> int:
+        """Bitset d'une liste d'IDs (ex: résultats de recherche)"""
+        mask = 0
+        for product_id in product_ids:
+            position = self._positions.get(product_id)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def mask(self, selection: Dict[str, List[str]], base: Optional[int] = None) -> int:
+        """
+        Bitset des produits satisfaisant toutes les facettes sélectionnées
+
+        Args:
+            selection: {facette: [valeurs]} (OR dans une facette, AND entre facettes)
+            base: Restriction préalable (ex: mask_for_ids des résultats de recherche)
+        """
+        mask = self._all if base is None else base
+        for facet, values in selection.items():
+            mask &= self._facet_mask(facet, values)
+        return mask
+
+    def counts(self, selection: Dict[str, List[str]], base: Optional[int] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Nombre de produits par option, en tenant compte des autres facettes
+
+        Pour une facette donnée, sa propre sélection est ignorée : le compteur
+        indique combien de produits on obtiendrait en cochant aussi l'option.
+        """
+        counts = {}
+        for facet in FACETS:
+            others = {f: v for f, v in selection.items() if f != facet}
+            mask = self.mask(others, base)
+            counts[facet] = {
+                value: (mask & self._bitsets[facet].get(value, 0)).bit_count()
+                for value in self.options(facet)
+            }
+        return counts
+
+    def ids(self, mask: int) -> List[int]:
+        """IDs des produits d'un bitset, dans l'ordre du catalogue"""
+        ids = []
+        while mask:
+            low = mask & -mask
+            ids.append(self._ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+    def contains(self, mask: int, product_id: int) -> bool:
+        """Le produit fait-il partie du bitset ?"""
+        position = self._positions.get(product_id)
+        return position is not None and bool(mask >> position & 1)
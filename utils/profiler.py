@@ -0,0 +1,171 @@
+"""
+Profiler de rerun pour les pages admin
+
+Chronomètre les sections d'une exécution de page (chargement des données,
+transformations pandas, construction des figures Plotly, rendu des widgets)
+et affiche une cascade dans la barre latérale.
+
+Activation : variable d'environnement PROFILE_RERUNS=1, ou interrupteur
+« ⏱️ Profiler » dans la barre latérale des pages admin.
+Option : sauvegarde cProfile (ou pyinstrument si installé) dans PROFILE_DIR.
+"""
+
+import cProfile
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+import streamlit as st
+
+from config.instrumentation import get_rerun_stats, payload_size_enabled
+
+# Couleur de chaque catégorie de section dans la cascade
+SECTION_KINDS = {
+    'fetch': {'label': 'Données', 'color': '#3b82f6'},
+    'transform': {'label': 'Pandas', 'color': '#f59e0b'},
+    'figure': {'label': 'Figures', 'color': '#8b5cf6'},
+    'render': {'label': 'Rendu', 'color': '#10b981'},
+}
+
+PROFILE_DIR = Path(os.getenv('PROFILE_DIR', 'profiles'))
+
+
+def _env_enabled() -> bool:
+    return os.getenv('PROFILE_RERUNS', '0') in ('1', 'true', 'True')
+
+
+class RerunProfiler:
+    """Mesure les sections d'un rerun ; ne fait rien si le profiling est désactivé"""
+
+    def __init__(self, page: str, enabled: bool, dump: bool = False):
+        self.page = page
+        self.enabled = enabled
+        self.sections: List[dict] = []
+        self._started = time.perf_counter()
+        self._profile = None
+        self._pyinstrument = None
+
+        if enabled and dump:
+            try:
+                from pyinstrument import Profiler
+                self._pyinstrument = Profiler()
+                self._pyinstrument.start()
+            except ImportError:
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+
+    @contextmanager
+    def section(self, name: str, kind: str = 'render'):
+        """
+        Chronomètre un bloc de code
+
+        Args:
+            name: Libellé affiché dans la cascade
+            kind: fetch, transform, figure ou render
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.sections.append({
+                'name': name,
+                'kind': kind,
+                'start': start - self._started,
+                'duration': end - start
+            })
+
+    def _dump(self) -> Optional[Path]:
+        """Écrit le profil détaillé sur disque et retourne son chemin"""
+        if self._profile is None and self._pyinstrument is None:
+            return None
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+            path = PROFILE_DIR / f"{self.page}_{stamp}.html"
+            path.write_text(self._pyinstrument.output_html(), encoding='utf-8')
+            self._pyinstrument = None
+        else:
+            self._profile.disable()
+            path = PROFILE_DIR / f"{self.page}_{stamp}.prof"
+            self._profile.dump_stats(str(path))
+            self._profile = None
+        return path
+
+    def render_sidebar(self):
+        """Termine la mesure et affiche la cascade dans la barre latérale"""
+        if not self.enabled:
+            return
+
+        total = time.perf_counter() - self._started
+        dump_path = self._dump()
+        queries = get_rerun_stats()
+
+        rows_html = []
+        for s in self.sections:
+            left = 100 * s['start'] / total if total else 0
+            width = max(100 * s['duration'] / total, 0.5) if total else 0
+            color = SECTION_KINDS.get(s['kind'], SECTION_KINDS['render'])['color']
+            rows_html.append(f"""
+            <div style="font-size: 0.75rem; margin: 0.15rem 0;">
+                <div style="display: flex; justify-content: space-between;">
+                    <span>{s['name']}</span><span>{s['duration'] * 1000:.0f} ms</span>
+                </div>
+                <div style="position: relative; height: 8px; background: rgba(128, 128, 128, 0.15); border-radius: 4px;">
+                    <div style="position: absolute; left: {left:.2f}%; width: {width:.2f}%; height: 8px; background: {color}; border-radius: 4px;"></div>
+                </div>
+            </div>""")
+
+        unattributed = total - sum(s['duration'] for s in self.sections)
+        by_kind = {}
+        for s in self.sections:
+            by_kind[s['kind']] = by_kind.get(s['kind'], 0) + s['duration']
+        legend = " • ".join(
+            f"<span style='color: {SECTION_KINDS[k]['color']};'>■</span> {SECTION_KINDS[k]['label']} {v * 1000:.0f} ms"
+            for k, v in by_kind.items() if k in SECTION_KINDS
+        )
+
+        with st.sidebar:
+            st.markdown(f"#### ⏱️ Rerun : {total * 1000:.0f} ms")
+            st.markdown("".join(rows_html), unsafe_allow_html=True)
+            st.markdown(f"<div style='font-size: 0.75rem; opacity: 0.8;'>{legend} • non attribué {unattributed * 1000:.0f} ms</div>",
+                        unsafe_allow_html=True)
+            size = f" • {queries['bytes'] / 1024:.0f} Ko" if payload_size_enabled() else ""
+            st.caption(
+                f"🗄️ {queries['calls']} requête(s) Supabase • {queries['seconds'] * 1000:.0f} ms • "
+                f"{queries['rows']} ligne(s){size}"
+            )
+            for shape, count in queries['repeated'].items():
+                st.warning(f"🔁 {count}× {shape}")
+            if dump_path:
+                st.caption(f"💾 Profil enregistré : `{dump_path}`")
+
+
+def start_profiling(page: str) -> RerunProfiler:
+    """
+    Crée le profiler du rerun pour une page admin
+
+    Affiche l'interrupteur dans la barre latérale (sauf si PROFILE_RERUNS=1 l'impose)
+    et démarre la mesure.
+    """
+    enabled = _env_enabled()
+    dump = False
+
+    if not enabled:
+        enabled = st.sidebar.toggle("⏱️ Profiler", key="profiler_enabled",
+                                    help="Chronomètre chaque section du rerun")
+    if enabled:
+        dump = st.sidebar.checkbox("💾 Sauvegarder le profil détaillé", key="profiler_dump",
+                                   help=f"cProfile (ou pyinstrument si installé) dans {PROFILE_DIR}/")
+
+    return RerunProfiler(page, enabled, dump)
@@ -0,0 +1,205 @@
+"""
+Index de recherche plein texte en mémoire
+
+Index inversé (terme -> {produit: poids}) sur le nom et la description des
+produits, utilisé quand la RPC search_products n'est pas disponible
+(SEARCH_BACKEND=local ou migration non appliquée). Même comportement que la
+version SQL : insensible aux accents et à la casse, préfixes acceptés
+("parf" trouve "parfum"), tous les termes doivent correspondre, résultats
+classés par pertinence.
+"""
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List
+
+# Poids des champs (équivalent des setweight 'A' / 'B' côté SQL)
+FIELD_WEIGHTS = {'name': 2.0, 'description': 1.0}
+
+STOPWORDS = {
+    'a', 'au', 'aux', 'avec', 'ce', 'ces', 'd', 'dans', 'de', 'des', 'du', 'elle', 'en', 'et',
+    'eux', 'il', 'je', 'l', 'la', 'le', 'les', 'leur', 'lui', 'ma', 'mais', 'me', 'mes', 'mon',
+    'ne', 'nos', 'notre', 'nous', 'on', 'ou', 'par', 'pas', 'pour', 'qu', 'que', 'qui', 's',
+    'sa', 'se', 'ses', 'son', 'sur', 't', 'ta', 'te', 'tes', 'ton', 'tu', 'un', 'une', 'vos',
+    'votre', 'vous',
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents ("Éau" -> "eau")"""
+    decomposed = unicodedata.normalize('NFKD', text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _stem(token: str) -> str:
+    """Racinisation minimale : pluriels en -s / -x"""
+    if len(token) > 3 and token[-1] in 'sx':
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Découpe un texte en termes normalisés (sans mots vides)"""
+    return [_stem(t) for t in _TOKEN_RE.findall(normalize(text)) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """Index inversé des produits, construit une fois par version du catalogue"""
+
+    def __init__(self, products: Iterable[Dict]):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_count = 0
+
+        for product in products:
+            self._doc_count += 1
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(product.get(field) or ""):
+                    postings = self._postings.setdefault(token, {})
+                    postings[product['id']] = postings.get(product['id'], 0.0) + weight
+
+        # Vocabulaire trié pour l'expansion des préfixes par recherche dichotomique
+        self._vocabulary = sorted(self._postings)
+
+    def _expand(self, term: str) -> List[str]:
+        """Termes de l'index commençant par `term`"""
+        start = bisect_left(self._vocabulary, term)
+        matches = []
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches.append(token)
+        return matches
+
+    def search(self, query: str) -> List[int]:
+        """
+        Recherche les produits correspondant à tous les termes de la requête
+
+        Args:
+            query: Texte saisi
+
+        Returns:
+            IDs des produits, du plus pertinent au moins pertinent
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Dict[int, float] = None
+        for term in terms:
+            term_scores: Dict[int, float] = {}
+            for token in self._expand(term):
+                postings = self._postings[token]
+                idf = math.log(1 + self._doc_count / len(postings))
+                # Un préfixe pèse un peu moins qu'un mot complet
+                exactness = 1.0 if token == term else 0.8
+                for product_id, weight in postings.items():
+                    score = weight * idf * exactness
+                    if score > term_scores.get(product_id, 0.0):
+                        term_scores[product_id] = score
+
+            if scores is None:
+                scores = term_scores
+            else:
+                # Intersection : chaque terme doit correspondre
+                scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+            if not scores:
+                return []
+
+        return sorted(scores, key=lambda pid: (-scores[pid], pid))
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Suggester:
+    """
+    Suggestions de saisie sur les noms de produits et les notes olfactives
+
+    - Préfixes : chaque nom est indexé à partir de chacun de ses mots ("ebe"
+      propose "Essence Bois d'Ébène"), recherche dichotomique dans une liste triée.
+    - Trigrammes : complète avec des suggestions tolérantes aux fautes de frappe
+      ("vanile" -> "vanille") quand les préfixes ne suffisent pas.
+    """
+
+    # Longueur minimale d'un mot de description proposé comme note
+    MIN_NOTE_LENGTH = 4
+
+    def __init__(self, products: Iterable[Dict]):
+        labels: Dict[str, str] = {}
+        notes: Dict[str, Dict[str, int]] = {}
+
+        for product in products:
+            name = (product.get('name') or "").strip()
+            if name:
+                labels.setdefault(normalize(name), name)
+            for word in re.findall(r"[^\W\d_]+", product.get('description') or ""):
+                key = normalize(word)
+                if len(key) >= self.MIN_NOTE_LENGTH and key not in STOPWORDS:
+                    forms = notes.setdefault(key, {})
+                    forms[word.lower()] = forms.get(word.lower(), 0) + 1
+
+        # Forme la plus fréquente de chaque note ("boisées" plutôt que "BOISÉES")
+        for key, forms in notes.items():
+            labels.setdefault(key, max(forms, key=forms.get))
+
+        self._labels = list(labels.values())
+        # Clés réduites aux mots séparés par un espace ("bois d'ebene" -> "bois d ebene")
+        keys = [" ".join(_TOKEN_RE.findall(key)) for key in labels]
+
+        # (clé à partir d'un début de mot, indice du libellé)
+        self._prefix_keys = sorted(
+            (key[m.start():], i)
+            for i, key in enumerate(keys)
+            for m in _TOKEN_RE.finditer(key)
+        )
+        self._trigram_index: Dict[str, List[int]] = {}
+        self._trigram_counts = []
+        for i, key in enumerate(keys):
+            grams = _trigrams(key)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_index.setdefault(gram, []).append(i)
+
+    def suggest(self, query: str, limit: int = 8) -> List[str]:
+        """
+        Suggestions pour un début de saisie
+
+        Args:
+            query: Texte en cours de saisie
+            limit: Nombre maximal de suggestions
+
+        Returns:
+            Libellés proposés (préfixes d'abord, puis correspondances approchées)
+        """
+        text = " ".join(_TOKEN_RE.findall(normalize(query)))
+        if len(text) < 2:
+            return []
+
+        results: List[int] = []
+        start = bisect_left(self._prefix_keys, (text, -1))
+        for key, i in self._prefix_keys[start:]:
+            if not key.startswith(text) or len(results) >= limit:
+                break
+            if i not in results:
+                results.append(i)
+
+        if len(results) < limit and len(text) >= 3:
+            grams = _trigrams(text)
+            shared: Dict[int, int] = {}
+            for gram in grams:
+                for i in self._trigram_index.get(gram, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            # Similarité de Dice entre les ensembles de trigrammes
+            scored = sorted(
+                ((2 * n / (len(grams) + self._trigram_counts[i]), i) for i, n in shared.items() if i not in results),
+                reverse=True
+            )
+            results += [i for score, i in scored[:limit - len(results)] if score >= 0.4]
+
+        return [self._labels[i] for i in results]
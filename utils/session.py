@@ -2,15 +2,33 @@
 Gestion de la session Streamlit et du panier
 """
 
+import os
+import re
+import time
+import uuid
 import streamlit as st
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from utils.cart import Cart
+from utils.cart_store import get_cart_writer
+from utils.formatters import format_price
+
+# Format du jeton de panier, et paramètre d'URL du lien de reprise
+_CART_TOKEN_RE = re.compile(r'^[0-9a-f]{32}$')
+CART_RESUME_PARAM = 'cart'
+
+# Durée (secondes) pendant laquelle les prix et stocks rafraîchis du panier sont réutilisés
+CART_REFRESH_TTL = int(os.getenv('CART_REFRESH_TTL', '30'))
 
 def init_session_state():
     """Initialise les variables de session nécessaires"""
     
-    # Panier
+    # Panier (rechargé depuis le stockage serveur au premier affichage de la session)
     if 'cart' not in st.session_state:
-        st.session_state.cart = {}
+        st.session_state.cart = Cart(get_cart_writer().load(get_cart_token()))
+    else:
+        get_cart_token()
+        get_cart()
     
     # Authentification admin
     if 'authenticated' not in st.session_state:
@@ -33,46 +51,100 @@ def init_session_state():
     if 'flash_type' not in st.session_state:
         st.session_state.flash_type = "info"
 
+def get_cart_token() -> str:
+    """
+    Identifiant du panier de la session (stockage serveur, réservations de stock)
+    
+    Le jeton est le seul accès au panier enregistré et à ses réservations : il
+    n'est jamais recopié dans l'URL des pages, qu'un lien partagé partagerait.
+    Une nouvelle session le reprend d'un lien de reprise (get_cart_resume_link),
+    dont le paramètre est aussitôt retiré de l'URL.
+    
+    Returns:
+        Jeton aléatoire, stable pour la session
+    """
+    token = st.query_params.get(CART_RESUME_PARAM)
+    if token is not None:
+        del st.query_params[CART_RESUME_PARAM]
+        if 'cart_token' not in st.session_state and _CART_TOKEN_RE.match(token):
+            st.session_state.cart_token = token
+    if 'cart_token' not in st.session_state:
+        st.session_state.cart_token = uuid.uuid4().hex
+    return st.session_state.cart_token
+
+def get_cart_resume_link() -> str:
+    """
+    Lien de reprise du panier (relatif à la page), à ne pas partager
+    
+    Returns:
+        Requête ?cart=<jeton>
+    """
+    return f"?{CART_RESUME_PARAM}={get_cart_token()}"
+
+def save_cart():
+    """Programme l'enregistrement du panier (écriture différée et groupée, voir utils/cart_store)"""
+    get_cart_writer().schedule(get_cart_token(), get_cart().to_dict())
+
+def get_checkout_key() -> str:
+    """
+    Clé d'idempotence du formulaire de checkout
+    
+    Stable tant que la commande n'est pas passée : un double clic ou un nouvel
+    essai renvoie la même commande. Renouvelée par rotate_checkout_key().
+    
+    Returns:
+        Jeton aléatoire
+    """
+    if 'checkout_key' not in st.session_state:
+        st.session_state.checkout_key = uuid.uuid4().hex
+    return st.session_state.checkout_key
+
+def rotate_checkout_key():
+    """Renouvelle la clé d'idempotence (commande passée : la suivante est distincte)"""
+    st.session_state.checkout_key = uuid.uuid4().hex
+
+def get_cart() -> Cart:
+    """
+    Panier de la session
+    
+    Un panier affecté sous forme de dict (outils de test de charge, ancien
+    état) est converti une fois en Cart.
+    
+    Returns:
+        Le Cart de st.session_state.cart
+    """
+    cart = st.session_state.get('cart')
+    if not isinstance(cart, Cart):
+        cart = st.session_state.cart = Cart.coerce(cart or {})
+    return cart
+
 def add_to_cart(product_id: int, product_data: Dict[str, Any], quantity: int = 1) -> bool:
     """
     Ajoute un produit au panier
     
     Args:
         product_id: ID du produit
-        product_data: Données du produit (name, price, image, stock)
+        product_data: Données du produit (name, price, image, stock disponible)
         quantity: Quantité à ajouter
     
     Returns:
         True si ajout réussi, False sinon
     """
-    if 'cart' not in st.session_state:
-        st.session_state.cart = {}
+    cart = get_cart()
     
     # Vérifier le stock
     if quantity > product_data['stock']:
         return False
     
-    # Si le produit est déjà dans le panier
-    if str(product_id) in st.session_state.cart:
-        current_qty = st.session_state.cart[str(product_id)]['quantity']
-        new_qty = current_qty + quantity
-        
-        # Vérifier que la nouvelle quantité ne dépasse pas le stock
-        if new_qty > product_data['stock']:
-            return False
-        
-        st.session_state.cart[str(product_id)]['quantity'] = new_qty
-    else:
-        # Ajouter le produit au panier
-        st.session_state.cart[str(product_id)] = {
-            'product_id': product_id,
-            'name': product_data['name'],
-            'price': product_data['price'],
-            'quantity': quantity,
-            'image': product_data.get('image', ''),
-            'stock': product_data['stock']
-        }
+    # Vérifier que la nouvelle quantité ne dépasse pas le stock
+    line = cart.get(str(product_id))
+    if line is not None and line.quantity + quantity > product_data['stock']:
+        return False
+    
+    cart.add(product_id, product_data['name'], product_data['price'], quantity,
+             product_data.get('image', ''), product_data['stock'])
     
+    save_cart()
     return True
 
 def update_cart_quantity(product_id: str, quantity: int) -> bool:
@@ -86,21 +158,18 @@ def update_cart_quantity(product_id: str, quantity: int) -> bool:
     Returns:
         True si mise à jour réussie, False sinon
     """
-    if 'cart' not in st.session_state:
-        return False
+    cart = get_cart()
     
-    if product_id not in st.session_state.cart:
+    if product_id not in cart:
         return False
     
     # Vérifier le stock
-    if quantity > st.session_state.cart[product_id]['stock']:
+    if quantity > cart[product_id].stock:
         return False
     
-    if quantity <= 0:
-        # Supprimer du panier si quantité = 0
-        remove_from_cart(product_id)
-    else:
-        st.session_state.cart[product_id]['quantity'] = quantity
+    # Quantité 0 : la ligne est retirée
+    cart.set_quantity(product_id, quantity)
+    save_cart()
     
     return True
 
@@ -111,43 +180,88 @@ def remove_from_cart(product_id: str):
     Args:
         product_id: ID du produit (string)
     """
-    if 'cart' not in st.session_state:
-        return
+    cart = get_cart()
     
-    if product_id in st.session_state.cart:
-        del st.session_state.cart[product_id]
+    if product_id in cart:
+        cart.remove(product_id)
+        save_cart()
 
 def clear_cart():
     """Vide complètement le panier"""
-    st.session_state.cart = {}
+    get_cart().clear()
+    save_cart()
+
+def refresh_cart(force: bool = False) -> List[str]:
+    """
+    Remet à jour les prix et stocks du panier (copiés à l'ajout) en une requête
+    
+    Mémorisé CART_REFRESH_TTL secondes pour le même ensemble de produits :
+    les reruns de la page ne refont pas la requête. Les lignes dont le produit
+    n'existe plus ou est épuisé sont retirées, les quantités ramenées au stock
+    disponible (stock - réservations des autres paniers).
+    
+    Args:
+        force: Ignorer la mémorisation
+    
+    Returns:
+        Changements à signaler au client (vide si rien n'a changé)
+    """
+    from models.product import Product
+    from models.reservation import Reservation
+    
+    cart = get_cart()
+    product_ids = tuple(sorted(int(pid) for pid in cart))
+    last = st.session_state.get('cart_refresh')
+    if not product_ids or (not force and last and last[0] == product_ids
+                           and time.time() - last[1] < CART_REFRESH_TTL):
+        return []
+    
+    current = Product.get_price_stock(list(product_ids))
+    if current is None:
+        # Erreur de lecture (déjà signalée) : garder les valeurs du panier ; un
+        # résultat vide veut dire, lui, que tous les produits ont été supprimés
+        return []
+    available = Reservation.get_available_stock(
+        {pid: row['stock'] for pid, row in current.items()}, get_cart_token())
+    
+    changes = []
+    for product_id, line in list(cart.items()):
+        row = current.get(int(product_id))
+        stock = available.get(int(product_id), 0)
+        if row is None or stock <= 0:
+            cart.remove(product_id)
+            changes.append(f"{line.name} n'est plus disponible et a été retiré du panier")
+            continue
+        
+        if row['price'] != line.price:
+            changes.append(f"Le prix de {line.name} est passé de {format_price(line.price)} à {format_price(row['price'])}")
+        cart.reprice(product_id, row['price'], stock)
+        if line.quantity > stock:
+            changes.append(f"{line.name} : quantité ramenée à {stock} (stock disponible)")
+            cart.set_quantity(product_id, stock)
+    
+    st.session_state.cart_refresh = (tuple(sorted(int(pid) for pid in cart)), time.time())
+    if changes:
+        save_cart()
+    return changes
 
 def get_cart_total() -> float:
     """
-    Calcule le total du panier
+    Total du panier (tenu à jour par le Cart, sans parcours)
     
     Returns:
         Montant total du panier
     """
-    if 'cart' not in st.session_state:
-        return 0
-    
-    total = sum(
-        item['price'] * item['quantity'] 
-        for item in st.session_state.cart.values()
-    )
-    return total
+    return get_cart().total
 
 def get_cart_count() -> int:
     """
-    Retourne le nombre total d'articles dans le panier
+    Nombre total d'articles dans le panier (tenu à jour par le Cart, sans parcours)
     
     Returns:
         Nombre total d'articles
     """
-    if 'cart' not in st.session_state:
-        return 0
-    
-    return sum(item['quantity'] for item in st.session_state.cart.values())
+    return get_cart().count
 
 def set_flash_message(message: str, message_type: str = "info"):
     """
@@ -0,0 +1,118 @@
+"""
+Publication des assets via le service de fichiers statiques de Streamlit
+
+Les images de assets/ sont copiées (redimensionnées et optimisées) dans static/
+sous un nom contenant le hash de leur contenu, avec une variante WebP.
+Streamlit les sert à l'adresse app/static/<fichier> (server.enableStaticServing) :
+le navigateur les met en cache au lieu de recevoir l'image en base64 dans le
+HTML de chaque rerun, et un nouveau contenu donne une nouvelle URL.
+
+Le dossier static/ est généré au démarrage (ignoré par git).
+"""
+
+import hashlib
+import io
+from pathlib import Path
+from typing import Dict, Optional
+
+import streamlit as st
+
+ROOT = Path(__file__).resolve().parent.parent
+ASSETS_DIR = ROOT / "assets"
+# Streamlit sert le dossier static/ situé à côté du script principal (app.py)
+STATIC_DIR = ROOT / "static"
+STATIC_URL = "app/static"
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+
+def content_hash(data: bytes) -> str:
+    """Hash court du contenu, utilisé dans les noms de fichiers"""
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def publish_bytes(stem: str, ext: str, data: bytes) -> str:
+    """
+    Écrit un fichier statique nommé d'après son contenu et retourne son URL
+
+    Les anciennes versions du même fichier (autre hash) sont supprimées.
+
+    Args:
+        stem: Nom de base (ex: 'logo')
+        ext: Extension sans point (ex: 'webp')
+        data: Contenu du fichier
+
+    Returns:
+        URL relative servie par Streamlit (app/static/<stem>.<hash>.<ext>)
+    """
+    STATIC_DIR.mkdir(exist_ok=True)
+    filename = f"{stem}.{content_hash(data)}.{ext}"
+    path = STATIC_DIR / filename
+
+    if not path.exists():
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    for old in STATIC_DIR.glob(f"{stem}.*.{ext}"):
+        if old.name != filename:
+            old.unlink(missing_ok=True)
+
+    return f"{STATIC_URL}/{filename}"
+
+
+def _encode(image, fmt: str, max_width: Optional[int]) -> bytes:
+    """Redimensionne (sans agrandir) puis encode une image Pillow"""
+    if max_width and image.width > max_width:
+        height = round(image.height * max_width / image.width)
+        image = image.resize((max_width, height))
+
+    buffer = io.BytesIO()
+    if fmt == 'WEBP':
+        image.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=6)
+    else:
+        image.convert('RGB').save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+@st.cache_resource(show_spinner=False)
+def publish_image(filename: str, max_width: Optional[int] = None) -> Optional[Dict]:
+    """
+    Publie une image de assets/ (une seule fois par processus)
+
+    Args:
+        filename: Nom du fichier dans assets/
+        max_width: Largeur maximale des variantes (pixels)
+
+    Returns:
+        Dict {url, webp_url} ou None si l'image est absente ou le dossier
+        static/ non inscriptible (l'appelant repasse alors en base64)
+    """
+    path = ASSETS_DIR / filename
+    if not path.exists():
+        return None
+
+    stem = path.stem
+    raw = path.read_bytes()
+
+    try:
+        try:
+            from PIL import Image
+            with Image.open(io.BytesIO(raw)) as image:
+                image.load()
+                if image.format == 'JPEG':
+                    # On garde l'original s'il est déjà plus léger que le ré-encodage
+                    jpeg = _encode(image, 'JPEG', max_width)
+                    url = publish_bytes(stem, 'jpg', jpeg if len(jpeg) < len(raw) else raw)
+                else:
+                    url = publish_bytes(stem, path.suffix.lstrip('.'), raw)
+                webp_url = publish_bytes(stem, 'webp', _encode(image, 'WEBP', max_width))
+        except ImportError:
+            url = publish_bytes(stem, path.suffix.lstrip('.'), raw)
+            webp_url = None
+    except OSError as e:
+        print(f"⚠️ Publication statique impossible pour {filename}: {e}")
+        return None
+
+    return {'url': url, 'webp_url': webp_url}
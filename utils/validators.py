@@ -1,14 +1,51 @@
 """
 Fonctions de validation des données
+
+Téléphone et email du checkout : validation locale, déterministe et mise en
+cache par saisie. Les métadonnées phonenumbers ne sont chargées que pour les
+pays de PHONE_REGIONS, et la vérification DNS de l'email n'est jamais faite
+pendant la validation du formulaire (voir check_email_deliverability_async).
 """
 
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from email_validator import validate_email, EmailNotValidError
-import phonenumbers
+
+# Pays acceptés pour le téléphone ; le premier sert pour les numéros sans indicatif
+PHONE_REGIONS = tuple(
+    region.strip().upper()
+    for region in os.getenv('PHONE_REGIONS', 'GA,CI,SN,BJ,CM,FR').split(',')
+    if region.strip()
+)
+
+# Vérification DNS de l'email après la commande : 'async' ou 'off'
+EMAIL_DELIVERABILITY_CHECK = os.getenv('EMAIL_DELIVERABILITY_CHECK', 'async')
+
+# Taille des caches de validation (saisies distinctes)
+VALIDATION_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=1)
+def _phonenumbers():
+    """Importe phonenumbers et charge les métadonnées des seuls pays de PHONE_REGIONS"""
+    import phonenumbers
+    from phonenumbers.phonemetadata import PhoneMetadata
+    for region in PHONE_REGIONS:
+        PhoneMetadata.metadata_for_region(region)
+    return phonenumbers
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _check_email(email: str) -> tuple[bool, str]:
+    try:
+        validate_email(email, check_deliverability=False)
+        return True, ""
+    except EmailNotValidError:
+        return False, "Format d'email invalide"
 
 def validate_email_address(email: str) -> tuple[bool, str]:
     """
-    Valide une adresse email
+    Valide une adresse email (syntaxe seulement, sans requête DNS)
     
     Args:
         email: Adresse email à valider
@@ -19,15 +56,62 @@ def validate_email_address(email: str) -> tuple[bool, str]:
     if not email or email.strip() == "":
         return False, "L'email est requis"
     
+    return _check_email(email.strip())
+
+_deliverability_pool = None
+
+def _check_deliverability(email: str):
     try:
-        validate_email(email)
-        return True, ""
+        validate_email(email, check_deliverability=True)
     except EmailNotValidError as e:
-        return False, "Format d'email invalide"
+        print(f"⚠️ Email potentiellement non délivrable ({email}): {str(e)}")
+    except Exception as e:
+        print(f"⚠️ Vérification de l'email impossible ({email}): {str(e)}")
+
+def check_email_deliverability_async(email: str):
+    """
+    Vérifie en arrière-plan que le domaine de l'email reçoit du courrier (DNS)
+    
+    Appelée après la commande : le résultat est seulement journalisé, la
+    commande n'attend pas la réponse DNS.
+    
+    Args:
+        email: Adresse email (déjà validée syntaxiquement)
+    """
+    global _deliverability_pool
+    if EMAIL_DELIVERABILITY_CHECK != 'async' or not email:
+        return
+    if _deliverability_pool is None:
+        _deliverability_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-check")
+    _deliverability_pool.submit(_check_deliverability, email.strip())
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _check_phone(phone: str) -> tuple[bool, str]:
+    phonenumbers = _phonenumbers()
+    
+    # Numéro sans indicatif : essayé dans l'ordre de PHONE_REGIONS
+    regions = PHONE_REGIONS if not phone.startswith(('+', '00')) else PHONE_REGIONS[:1]
+    for region in regions:
+        try:
+            parsed = phonenumbers.parse(phone, region)
+        except phonenumbers.NumberParseException:
+            return False, "Format de téléphone invalide"
+        
+        # Pays hors de PHONE_REGIONS : refusé sans charger ses métadonnées
+        number_region = phonenumbers.region_code_for_country_code(parsed.country_code)
+        if number_region not in PHONE_REGIONS:
+            if phone.startswith(('+', '00')):
+                return False, "Indicatif téléphonique non pris en charge"
+            continue
+        
+        if phonenumbers.is_valid_number_for_region(parsed, number_region):
+            return True, ""
+    
+    return False, "Numéro de téléphone invalide"
 
 def validate_phone(phone: str) -> tuple[bool, str]:
     """
-    Valide un numéro de téléphone
+    Valide un numéro de téléphone des pays de PHONE_REGIONS
     
     Args:
         phone: Numéro de téléphone à valider
@@ -38,15 +122,7 @@ def validate_phone(phone: str) -> tuple[bool, str]:
     if not phone or phone.strip() == "":
         return False, "Le numéro de téléphone est requis"
     
-    try:
-        # Parser le numéro (assume France par défaut)
-        parsed = phonenumbers.parse(phone, "FR")
-        if phonenumbers.is_valid_number(parsed):
-            return True, ""
-        else:
-            return False, "Numéro de téléphone invalide"
-    except phonenumbers.NumberParseException:
-        return False, "Format de téléphone invalide"
+    return _check_phone(phone.strip())
 
 def validate_name(name: str, field_name: str = "Nom") -> tuple[bool, str]:
     """